@@ -7,4 +7,55 @@ class Settings:
     DATABASE_URL: str = os.getenv("DATABASE_URL", "")
     SECRET_KEY: str = os.getenv("SECRET_KEY", "")
     ALGORITHM: str = os.getenv("ALGORITHM", "")
+
+    # async engine za Socket.IO handlere (prazno = DATABASE_URL s async psycopg driverom)
+    ASYNC_DATABASE_URL: str = os.getenv("ASYNC_DATABASE_URL", "")
+    ASYNC_DB_POOL_SIZE: int = int(os.getenv("ASYNC_DB_POOL_SIZE", "10"))
+    ASYNC_DB_MAX_OVERFLOW: int = int(os.getenv("ASYNC_DB_MAX_OVERFLOW", "20"))
+
+    # updatePlayers po sobi najvise jednom u intervalu (triggeri unutar intervala se spajaju)
+    PLAYERS_BROADCAST_INTERVAL_MS: float = float(os.getenv("PLAYERS_BROADCAST_INTERVAL_MS", "500"))
+
+    # stanje igara u memoriji (GameStateStore): soba koja nije dirana TTL sekundi se brise
+    GAME_STATE_TTL_S: float = float(os.getenv("GAME_STATE_TTL_S", "7200"))
+    GAME_STATE_SWEEP_S: float = float(os.getenv("GAME_STATE_SWEEP_S", "60"))
+
+    # micro-batching predikcija (finish_round burstovi)
+    PREDICT_BATCH_MAX_SIZE: int = int(os.getenv("PREDICT_BATCH_MAX_SIZE", "64"))
+    PREDICT_BATCH_MAX_WAIT_MS: float = float(os.getenv("PREDICT_BATCH_MAX_WAIT_MS", "5"))
+
+    # cache predikcija (0 = iskljucen); radi samo uz kvantizaciju (korak > 0)
+    PREDICT_CACHE_SIZE: int = int(os.getenv("PREDICT_CACHE_SIZE", "4096"))
+    PREDICT_CACHE_TTL_S: float = float(os.getenv("PREDICT_CACHE_TTL_S", "300"))
+    PREDICT_CACHE_ACC_STEP: float = float(os.getenv("PREDICT_CACHE_ACC_STEP", "0"))
+    PREDICT_CACHE_TIME_STEP: float = float(os.getenv("PREDICT_CACHE_TIME_STEP", "0"))
+
+    # mini-batch online ucenje (feedback)
+    FEEDBACK_BATCH_SIZE: int = int(os.getenv("FEEDBACK_BATCH_SIZE", "16"))
+    FEEDBACK_BATCH_MAX_AGE_MS: float = float(os.getenv("FEEDBACK_BATCH_MAX_AGE_MS", "2000"))
+    # fsync feedback loga nakon svakog zapisa (sigurnije kod pada sustava, sporije)
+    FEEDBACK_LOG_FSYNC: bool = os.getenv("FEEDBACK_LOG_FSYNC", "0") == "1"
+
+    # checkpointi modela (model/model_output/checkpoints)
+    CHECKPOINT_EVERY_UPDATES: int = int(os.getenv("CHECKPOINT_EVERY_UPDATES", "10"))
+    CHECKPOINT_INTERVAL_S: float = float(os.getenv("CHECKPOINT_INTERVAL_S", "60"))
+    CHECKPOINT_KEEP: int = int(os.getenv("CHECKPOINT_KEEP", "5"))
+
+    # direktorij s modelom (default backend/model/model_output)
+    MODEL_DIR: str = os.getenv("MODEL_DIR", "")
+
+    # "process" - uci zaseban learner proces, "inline" - uci jedan od web workera
+    LEARNER_MODE: str = os.getenv("LEARNER_MODE", "process")
+    # vise uvicorn workera: jedan learner, ostali mu salju feedback i citaju model_params.npy
+    MODEL_REFRESH_MS: float = float(os.getenv("MODEL_REFRESH_MS", "1000"))
+    LEARNER_ADDRESS: str = os.getenv("LEARNER_ADDRESS", "")
+    LEARNER_RETRY_S: float = float(os.getenv("LEARNER_RETRY_S", "5"))
+
+    # shadow model: kandidat (model_params.npy ili direktorij) koji se ocjenjuje na live
+    # rundama bez utjecaja na preporuke (prazno = iskljuceno)
+    SHADOW_MODEL_PATH: str = os.getenv("SHADOW_MODEL_PATH", "")
+    SHADOW_QUEUE_SIZE: int = int(os.getenv("SHADOW_QUEUE_SIZE", "1024"))
+    SHADOW_BATCH_MAX_SIZE: int = int(os.getenv("SHADOW_BATCH_MAX_SIZE", "256"))
+    SHADOW_BATCH_MAX_WAIT_MS: float = float(os.getenv("SHADOW_BATCH_MAX_WAIT_MS", "50"))
+    SHADOW_LOG_PATH: str = os.getenv("SHADOW_LOG_PATH", "")
 settings = Settings()
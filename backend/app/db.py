@@ -1,4 +1,6 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from .config import settings
 
@@ -6,6 +8,31 @@ engine = create_engine(settings.DATABASE_URL, echo=True, future=True)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+
+def async_database_url(url: str) -> str:
+    """postgresql:// i postgresql+psycopg:// -> async psycopg 3 driver (isti paket kao sync)."""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "postgresql" and parsed.get_driver_name() in ("psycopg2", "psycopg"):
+        parsed = parsed.set(drivername="postgresql+psycopg_async")
+    elif parsed.get_backend_name() == "sqlite" and parsed.get_driver_name() == "pysqlite":
+        # lokalni testovi/benchmarki (treba aiosqlite)
+        parsed = parsed.set(drivername="sqlite+aiosqlite")
+    return parsed.render_as_string(hide_password=False)
+
+
+# Async engine za Socket.IO handlere: upiti ne blokiraju event loop pa jedan
+# spori upit ne zaustavlja sve spojene ucenike. REST rute i skripte koriste sync engine.
+async_engine = create_async_engine(
+    async_database_url(settings.ASYNC_DATABASE_URL or settings.DATABASE_URL),
+    pool_size=settings.ASYNC_DB_POOL_SIZE,
+    max_overflow=settings.ASYNC_DB_MAX_OVERFLOW,
+    pool_pre_ping=True,
+)
+# expire_on_commit=False: nakon commita se atributi ne smiju lijeno ucitavati (nema I/O izvan await)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
 # Dependency za FastAPI
 def get_db():
     db = SessionLocal()
@@ -0,0 +1,51 @@
+"""
+Zaseban learner proces: `python -m app.learner`
+
+Drzi sklearn model, prima feedback od web workera (LearnerServer), pise
+feedback log i checkpointe te nakon svakog updatea izvozi model_params.npy
+koji web workeri citaju. Web workeri ga sami pokrecu (LEARNER_MODE=process),
+a moze se pokrenuti i rucno / kao servis.
+"""
+import argparse
+import os
+import signal
+import threading
+import time
+
+from app.routers import ml_feedback
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--parent", type=int, default=None,
+                        help="PID web workera koji je pokrenuo proces; izlazi kad on nestane")
+    parser.add_argument("--lock_wait", type=float, default=2.0,
+                        help="koliko sekundi pokusavati uzeti learner lock prije izlaska")
+    args = parser.parse_args()
+
+    # workeri provjeravaju je li lock slobodan tako da ga nakratko uzmu (lock_is_free),
+    # pa jedan neuspjeli pokusaj ne znaci da learner vec radi
+    deadline = time.monotonic() + args.lock_wait
+    while not ml_feedback.learner_role.try_acquire():
+        if time.monotonic() >= deadline:
+            # learner vec radi (pokrenuo ga je drugi worker)
+            return
+        time.sleep(0.05)
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+    ml_feedback.become_learner()
+    print(f"Learner process {os.getpid()} ready (model version {ml_feedback.model_state.snapshot.version})")
+
+    try:
+        while not stop.wait(1.0):
+            if args.parent is not None and os.getppid() != args.parent:
+                break
+    finally:
+        ml_feedback.shutdown()
+
+
+if __name__ == "__main__":
+    main()
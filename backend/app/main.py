@@ -1,3 +1,5 @@
+from contextlib import asynccontextmanager
+
 import socketio
 from fastapi import FastAPI
 import os
@@ -10,6 +12,7 @@ from .routers.game_router import router as game_router
 from .routers.topics_router import router as topics_router
 from .routers.stats_router import router as stats_router
 from .routers.override_router import router as override_router
+from .services.shadow_model import shadow_evaluator
 
 FRONTEND_URL = os.getenv("FRONTEND_URL")
 
@@ -22,7 +25,17 @@ sio = socketio.AsyncServer(
     ],
 )
 
-fastapi_app = FastAPI(title="SmartMath API", version="0.1.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    ml_feedback.start_learning()
+    yield
+    # primijeni feedback koji jos ceka u redu i spremi zadnje stanje modela
+    ml_feedback.shutdown()
+    shadow_evaluator.close()
+
+
+fastapi_app = FastAPI(title="SmartMath API", version="0.1.0", lifespan=lifespan)
 
 fastapi_app.add_middleware(
     CORSMiddleware,
@@ -17,6 +17,7 @@ class Recommendation(Base):
     round_index = Column(Integer)
     true_label = Column(Integer)
     labeled_at = Column(TIMESTAMP(timezone=True))
+    model_version = Column(Integer)  # verzija snapshota modela koji je dao preporuku
 
     __table_args__ = (
         CheckConstraint("rec IN ('up','same','down')", name="rec_check"),
@@ -1,7 +1,41 @@
 from fastapi import APIRouter
 
+from app.routers.ml_feedback import (
+    feedback_log, feedback_queue, learner_client, learner_ready, learner_server,
+    learner_supervisor,
+)
+from app.routers.ml_predict import prediction_cache
+from app.services import model_state
+from app.services.game_state import game_state
+from app.services.player_broadcast import player_broadcaster
+from app.services.roster import roster_tracker
+from app.services.prediction_batcher import prediction_batcher
+from app.services.shadow_model import shadow_evaluator
+
 router = APIRouter()
 
 @router.get("", summary="Health check")
 def health():
     return {"status": "ok - primjer routera"}
+
+
+@router.get("/metrics", summary="Runtime metrike (ML inference)")
+def metrics():
+    return {
+        "prediction_batcher": prediction_batcher.stats(),
+        "prediction_cache": prediction_cache.stats(),
+        "feedback_queue": feedback_queue.stats(),
+        "model": {"version": model_state.snapshot.version},
+        "checkpoints": model_state.checkpoints.stats(),
+        "feedback_log": feedback_log.stats(),
+        "shadow": shadow_evaluator.stats(),
+        "player_broadcast": player_broadcaster.stats(),
+        "roster": roster_tracker.stats(),
+        "game_state": game_state.stats(),
+        "learner": {
+            "is_learner": learner_ready.is_set(),
+            "server": learner_server.stats(),
+            "client": learner_client.stats(),
+            "supervisor": learner_supervisor.stats(),
+        },
+    }
@@ -1,8 +1,22 @@
+import sys
+import threading
+
+import numpy as np
 import pandas as pd
 from fastapi import APIRouter
 from pydantic import BaseModel
 
-from app.services.model_state import model, scaler, lock, maybe_persist
+from app.config import settings
+from app.services import model_state
+from app.services.checkpoint import list_checkpoints
+from app.services.feedback_log import FeedbackLog, sample_values
+from app.services.feedback_queue import FeedbackQueue
+from app.services.learner_link import (
+    LearnerClient, LearnerRole, LearnerServer, LearnerSupervisor, parse_address,
+)
+from app.services.model_state import lock, load_learner, maybe_persist, publish_snapshot
+
+FEATURES = ["accuracy", "avg_time", "hints_used"]
 
 router = APIRouter()
 
@@ -21,26 +35,156 @@ def feedback(data: FeedbackRequest):
 
 
 def feedback_function(data: FeedbackRequest):
-    X = pd.DataFrame([{
-        "accuracy": data.accuracy,
-        "avg_time": data.avg_time,
-        "hints_used": data.hints_used
-    }])
+    if learner_ready.is_set():
+        # primjer se zapisuje u log i ide u red, model se uci u mini-batchevima (vidi learn_batch)
+        feedback_queue.submit(data)
+    else:
+        # uci drugi worker (learner), ovaj mu samo prosljeduje primjer
+        learner_client.send(sample_values(data))
+    return {"status": "queued"}
+
+
+def learn_batch(samples: list[FeedbackRequest], log: bool = True):
+    """Nauci batch primjera. Poziva se pod model_state.lock (FeedbackQueue ga drzi)."""
+    X = pd.DataFrame(
+        np.array(
+            [[s.accuracy, s.avg_time, s.hints_used] for s in samples],
+            dtype=np.float64,
+        ),
+        columns=FEATURES,
+    )
+    y = np.array([s.true_label for s in samples], dtype=int)
+    w = np.array([s.sample_weight for s in samples], dtype=np.float64)
+
+    model, scaler = load_learner()
+
+    # partial_fit scalera radi running update mean/var za cijeli batch odjednom
+    scaler.partial_fit(X)
+    X_scaled = scaler.transform(X)
+
+    model.partial_fit(X_scaled, y, sample_weight=w)
+    publish_snapshot()
+
+    if log:
+        feedback_log.append_batch(model_state.snapshot.version, len(samples))
+
+    maybe_persist()
+
+
+feedback_log = FeedbackLog(model_state.FEEDBACK_LOG_DIR, fsync=settings.FEEDBACK_LOG_FSYNC)
+
+feedback_queue = FeedbackQueue(
+    learn_batch,
+    batch_size=settings.FEEDBACK_BATCH_SIZE,
+    max_age_ms=settings.FEEDBACK_BATCH_MAX_AGE_MS,
+    lock=lock,
+    log=feedback_log,
+)
+
+
+def _on_checkpoint(version):
+    feedback_queue.rotate_log(version)
+    kept = list_checkpoints(model_state.CHECKPOINT_DIR)
+    if kept:
+        feedback_log.prune(kept[0][0])
+
 
-    # zakljucavamo thread dok se model uci na novom primjeru (zbog mogucih race conditiona)
+def _decode(values):
+    accuracy, avg_time, hints_used, true_label, sample_weight = values
+    return FeedbackRequest(
+        accuracy=accuracy,
+        avg_time=avg_time,
+        hints_used=hints_used,
+        true_label=true_label,
+        sample_weight=sample_weight,
+    )
+
+
+def _recover():
+    """
+    Vrati model u stanje prije gasenja/pada: na ucitani checkpoint primijeni
+    batcheve iz feedback loga istim redom, a primjere koji nisu stigli biti
+    nauceni vrati u red.
+    """
     with lock:
-        scaler.partial_fit(X)
-        X_scaled = scaler.transform(X)
+        # replay krece od ucitanog checkpointa (najnoviji ispravan checkpoint
+        # trenutnog modela iz train_model.py); stariji segmenti se preskacu
+        load_learner()
+        start = model_state.snapshot.version
+        batches, leftovers = feedback_log.replay(start)
+
+        for version, values in batches:
+            learn_batch([_decode(v) for v in values], log=False)
+            if model_state.snapshot.version != version:
+                print(f"Feedback log replay version mismatch: {model_state.snapshot.version} != {version}")
+
+        if not batches and not leftovers:
+            feedback_log.open(start)
+            return
+
+        print(f"Feedback log replay: {len(batches)} batches, {len(leftovers)} pending samples")
+        feedback_queue.requeue([_decode(v) for v in leftovers])
+        # novi segment od trenutne verzije, u njega se prepisuju primjeri koji cekaju
+        feedback_queue.rotate_log(model_state.snapshot.version)
+
+    # checkpoint da se isti log ne replaya kod svakog pokretanja
+    model_state.checkpoints.write_now()
+
+
+_authkey = (settings.SECRET_KEY or "smartmath-learner").encode()
+_address = parse_address(settings.LEARNER_ADDRESS, model_state.MODEL_DIR / "learner.sock")
+
+learner_role = LearnerRole(model_state.MODEL_DIR / "learner.lock", retry_s=settings.LEARNER_RETRY_S)
+learner_server = LearnerServer(_address, _authkey, lambda values: feedback_queue.submit(_decode(values)))
+learner_client = LearnerClient(_address, _authkey)
+learner_ready = threading.Event()
+learner_supervisor = LearnerSupervisor(
+    model_state.MODEL_DIR / "learner.lock",
+    [sys.executable, "-m", "app.learner"],
+    cwd=model_state.BACKEND_DIR,
+    retry_s=settings.LEARNER_RETRY_S,
+)
+
+
+def become_learner():
+    """Ovaj proces preuzima ucenje (poziva se tek kad drzi learner lock)."""
+    model_state.is_learner = True
+    _recover()
+    learner_server.start()
+    learner_ready.set()
+    # primjeri koje je ovaj worker skupio dok learner nije bio dostupan
+    for values in learner_client.drain():
+        feedback_queue.submit(_decode(values))
+
+
+def start_learning(mode: str = settings.LEARNER_MODE):
+    """
+    mode="process": model uci zaseban learner proces, web workeri mu samo salju
+    feedback pa ucenje nikad ne konkurira event loopu za GIL.
+    mode="inline": uci jedan od web workera (onaj koji uzme learner lock).
+    """
+    if mode == "process":
+        learner_supervisor.start()
+        return
+
+    learner_role.on_promote = become_learner
+    if learner_role.try_acquire():
+        become_learner()
+    else:
+        learner_role.watch()
+
 
-        model.partial_fit(
-            X_scaled,
-            [data.true_label],
-            sample_weight=[data.sample_weight]
-        )
+def shutdown():
+    """Primijeni sve sto ceka, spremi zadnji checkpoint i pusti learner lock."""
+    learner_supervisor.stop()
+    learner_server.stop()
+    feedback_queue.stop()
+    model_state.checkpoints.stop()
+    feedback_log.close()
+    learner_role.release()
 
-        maybe_persist()
 
-    return {"status": "learned"}
+model_state.capture_hooks.append(_on_checkpoint)
 
 
 def derive_true_label(prev_round, next_round, eps=0.1):
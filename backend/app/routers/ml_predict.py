@@ -1,8 +1,12 @@
 from fastapi import APIRouter
 from pydantic import BaseModel
-import pandas as pd
+import numpy as np
 
-from app.services.model_state import model, scaler
+from app.config import settings
+from app.services import model_state
+from app.services.prediction_cache import PredictionCache
+
+FEATURES = ["accuracy", "avg_time", "hints_used"]
 
 
 class DifficultyRequest(BaseModel):
@@ -13,31 +17,94 @@ class DifficultyRequest(BaseModel):
 class DifficultyResponse(BaseModel):
     label: int
     probabilities: dict
+    model_version: int
+
+class DifficultyBatchRequest(BaseModel):
+    items: list[DifficultyRequest]
+
+class DifficultyBatchResponse(BaseModel):
+    results: list[DifficultyResponse]
 
 router = APIRouter()
 
+prediction_cache = PredictionCache(
+    maxsize=settings.PREDICT_CACHE_SIZE,
+    ttl_s=settings.PREDICT_CACHE_TTL_S,
+    acc_step=settings.PREDICT_CACHE_ACC_STEP,
+    time_step=settings.PREDICT_CACHE_TIME_STEP,
+)
+
 # endpoint za predikciju
 @router.post("/predict", response_model=DifficultyResponse)
 def predict_difficulty(data: DifficultyRequest):
     return predict_function(data)
-   
+
+# endpoint za predikciju vise redaka odjednom (npr. cijeli razred nakon runde)
+@router.post("/predict-batch", response_model=DifficultyBatchResponse)
+def predict_difficulty_batch(data: DifficultyBatchRequest):
+    X = features_to_array(data.items)
+    labels, proba, snapshot = predict_batch_function(X)
+    return DifficultyBatchResponse(results=to_responses(labels, proba, snapshot))
+
+
 def predict_function(data: DifficultyRequest):
-     # preracunavamo u ispravan format
-    X = pd.DataFrame([{
-        "accuracy": data.accuracy,
-        "avg_time": data.avg_time,
-        "hints_used": data.hints_used
-    }])
+    labels, proba, snapshot = predict_batch_function(features_to_array([data]))
+    return to_responses(labels, proba, snapshot)[0]
+
+
+def features_to_array(items):
+    """Pretvara listu DifficultyRequest objekata u (N, 3) float matricu."""
+    return np.array(
+        [[d.accuracy, d.avg_time, d.hints_used] for d in items],
+        dtype=np.float64,
+    ).reshape(-1, len(FEATURES))
+
+
+def predict_batch_function(X: np.ndarray):
+    """
+    Predikcija za N redaka odjednom.
+    X je (N, 3) matrica s kolonama redom kao u FEATURES.
+    Vraca (labels, probabilities, snapshot) gdje je labels (N,), probabilities
+    (N, n_classes), a snapshot verzija modela koja je dala predikciju.
+    """
+    X = np.asarray(X, dtype=np.float64).reshape(-1, len(FEATURES))
+
+    # jedno citanje reference - cijeli batch ide kroz isti (nepromjenjivi) snapshot
+    model_state.refresh_snapshot()
+    snapshot = model_state.snapshot
+
+    if not prediction_cache.enabled or X.shape[0] == 0:
+        labels, proba = snapshot.predict(X)
+        return labels, proba, snapshot
+
+    # predvidja se na tocnim znacajkama, kljucevi (opcionalno kvantizirani) sluze samo za lookup
+    keys = prediction_cache.keys(X)
+    cached = prediction_cache.lookup(keys, snapshot.version)
+    miss = [i for i, c in enumerate(cached) if c is None]
+
+    labels = np.empty(X.shape[0], dtype=snapshot.classes.dtype)
+    proba = np.empty((X.shape[0], len(snapshot.classes)))
 
-    # skaliranje
-    X_scaled = scaler.transform(X)
+    if miss:
+        miss_labels, miss_proba = snapshot.predict(X[miss])
+        labels[miss] = miss_labels
+        proba[miss] = miss_proba
+        prediction_cache.store(keys[miss], miss_labels, miss_proba, snapshot.version)
 
-    # predikcija
-    label = int(model.predict(X_scaled)[0])
+    for i, c in enumerate(cached):
+        if c is not None:
+            labels[i], proba[i] = c
 
-    # vjerojatnosti svake labele
-    proba = model.predict_proba(X_scaled)[0]
-    prob_dict = {int(c): float(p) for c, p in zip(model.classes_, proba)}
+    return labels, proba, snapshot
 
-    return DifficultyResponse(label=label, probabilities=prob_dict)
 
+def to_responses(labels, proba, snapshot):
+    classes = [int(c) for c in snapshot.classes]
+    return [
+        DifficultyResponse(
+            label=int(label),
+            probabilities={c: float(p) for c, p in zip(classes, row)},
+            model_version=snapshot.version,
+        )
+        for label, row in zip(labels, proba)
+    ]
@@ -1,7 +1,8 @@
 from jose import JWTError, jwt
+from sqlalchemy import select
 
 from ..config import settings
-from ..db import SessionLocal
+from ..db import AsyncSessionLocal
 from ..models.users import User
 
 
@@ -25,5 +26,5 @@ async def authenticate_socket_with_token(token: str):
     except JWTError:
         return None
 
-    db = SessionLocal()
-    return db.query(User).filter(User.id == user_id).first()
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(select(User).where(User.id == user_id).limit(1))
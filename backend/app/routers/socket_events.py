@@ -1,14 +1,13 @@
 import asyncio
 import datetime
-from functools import partial
 import random
 import uuid
 
 from app.main import sio
-from sqlalchemy import case, desc, func
-from sqlalchemy.orm import Session
+from sqlalchemy import case, desc, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..db import SessionLocal
+from ..db import AsyncSessionLocal
 from ..models.attempts import Attempt
 from ..models.game import Game
 from ..models.game_players import GamePlayers
@@ -18,30 +17,38 @@ from ..models.recommendations import Recommendation
 from ..models.rounds import Round
 from ..models.student_stats import StudentStats
 from ..models.users import User
+from ..services.difficulty import DIFFICULTY_DISTRIBUTION, next_difficulty
+from ..services.game_state import game_state
+from ..services.player_broadcast import player_broadcaster
+from ..services.roster import roster_tracker
+from ..services.prediction_batcher import prediction_batcher
+from ..services.shadow_model import shadow_evaluator
 from .ml_feedback import FeedbackRequest, derive_true_label, feedback_function
-from .ml_predict import DifficultyRequest, predict_function
+from .ml_predict import DifficultyRequest
 from .socket_auth import authenticate_socket_with_token
 
-questions = {}
+# startGame: najvise toliko nasumicnih pitanja po tezini za cijelu sobu, svaki ucenik uzme svoj uzorak
+QUESTION_POOL_PER_TIER = 200
 
+# kraj igre ili istek TTL-a sobe brise i roster za playersDelta
+game_state.on_teardown(roster_tracker.forget)
 
-def _finish_game(db: Session, game: Game) -> None:
+
+async def _finish_game(db: AsyncSession, game: Game) -> None:
     """Mark game as finished and deactivate all active players."""
+    now = datetime.datetime.utcnow()
     game.status = "finished"
-    game.end_time = datetime.datetime.utcnow()
+    game.end_time = now
     db.add(game)
 
-    active_players = (
-        db.query(GamePlayers)
-        .filter(GamePlayers.game_id == game.id, GamePlayers.is_active.is_(True))
-        .all()
+    await db.execute(
+        update(GamePlayers)
+        .where(GamePlayers.game_id == game.id, GamePlayers.is_active.is_(True))
+        .values(is_active=False, left_at=now)
     )
-    for p in active_players:
-        p.is_active = False
-        p.left_at = datetime.datetime.utcnow()
-        db.add(p)
 
-    db.commit()
+    await db.commit()
+    game_state.drop(game.id)
 
 
 @sio.event
@@ -86,20 +93,19 @@ async def teacherJoin(sid, data):
         await sio.emit("error", {"message": "Unauthorized"}, to=sid)
         return
 
-    db = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as db:
         # Accept joining both lobby and started games (teacher page needs to reconnect after start).
         # Parse ids defensively because socket session stores them as strings.
         teacher_id = uuid.UUID(str(session["user_id"]))
         game_id = uuid.UUID(str(data["game_id"]))
 
-        game = (
-            db.query(Game)
-            .filter(
+        game = await db.scalar(
+            select(Game)
+            .where(
                 Game.id == game_id,
                 Game.teacher_id == teacher_id,
             )
-            .first()
+            .limit(1)
         )
 
         if not game:
@@ -111,13 +117,17 @@ async def teacherJoin(sid, data):
 
         await sio.enter_room(sid, str(game.id))
         # Store game_id for teacher so we can close the lobby if teacher disconnects.
-        mode = None
+        mode = roster = None
         if isinstance(data, dict):
             mode = data.get("mode")
+            roster = data.get("roster")
         await sio.save_session(sid, {**session, "game_id": str(game.id), "mode": mode})
+        room_state = game_state.room(game.id)
+        if room_state:
+            room_state.status = game.status
+        if roster == "delta":
+            await _subscribe_roster(sid, str(game.id))
         await emit_players(game.id)
-    finally:
-        db.close()
 
 
 # student join
@@ -129,12 +139,11 @@ async def handle_join_game(sid, data):
         await sio.emit("error", {"message": "Students only"}, to=sid)
         return
 
-    db = SessionLocal()
-    try:
-        game = (
-            db.query(Game)
-            .filter(Game.game_code == data["game_code"], Game.status == "lobby")
-            .first()
+    async with AsyncSessionLocal() as db:
+        game = await db.scalar(
+            select(Game)
+            .where(Game.game_code == data["game_code"], Game.status == "lobby")
+            .limit(1)
         )
 
         if not game:
@@ -143,14 +152,16 @@ async def handle_join_game(sid, data):
 
         user_id = session["user_id"]
 
-        user = db.query(User).filter(User.id == user_id, User.role == "student").first()
+        user = await db.scalar(
+            select(User).where(User.id == user_id, User.role == "student").limit(1)
+        )
 
         if not user:
             await sio.emit("error", {"message": "User not found"}, to=sid)
             return
 
-        player = (
-            db.query(GamePlayers).filter_by(game_id=game.id, user_id=user.id).first()
+        player = await db.scalar(
+            select(GamePlayers).filter_by(game_id=game.id, user_id=user.id).limit(1)
         )
 
         if player:
@@ -168,7 +179,10 @@ async def handle_join_game(sid, data):
                 )
             )
 
-        db.commit()
+        await db.commit()
+        game_state.join(game.id, user.id, sid)
+        # prvi join nakon restarta/TTL-a: ostali igraci sobe su samo u bazi
+        await game_state.ensure_hydrated(game.id, lambda: _load_active_players(db, game.id))
 
         # Store game_id on the socket session so we can cleanly handle disconnects
         await sio.save_session(
@@ -180,12 +194,12 @@ async def handle_join_game(sid, data):
         )
 
         await sio.enter_room(sid, str(game.id))
+        if data.get("roster") == "delta":
+            await _subscribe_roster(sid, str(game.id))
         await emit_players(game.id)
 
         # Ack to the joining student so the UI can stop "connecting" even if updatePlayers is delayed.
         await sio.emit("joinedGame", {"game_id": str(game.id)}, to=sid)
-    finally:
-        db.close()
 
 
 @sio.event
@@ -199,20 +213,27 @@ async def joinGame(sid, data):
 
 
 async def emit_players(game_id):
-    db = SessionLocal()
-    try:
+    """updatePlayers za sobu ide kroz player_broadcaster (najvise jednom po intervalu)."""
+    player_broadcaster.mark_dirty(game_id)
+
+
+async def _load_roster(room):
+    """(players, playersDetailed) za sobu: igraci sa statistikom, zadnja preporuka i zadnja runda."""
+    game_id = uuid.UUID(room)
+    async with AsyncSessionLocal() as db:
         rows = (
-            db.query(
-                User.id.label("user_id"),
-                User.username.label("username"),
-                User.current_difficulty.label("level"),
-                StudentStats.xp.label("xp"),
+            await db.execute(
+                select(
+                    User.id.label("user_id"),
+                    User.username.label("username"),
+                    User.current_difficulty.label("level"),
+                    StudentStats.xp.label("xp"),
+                )
+                .join(GamePlayers, GamePlayers.user_id == User.id)
+                .outerjoin(StudentStats, StudentStats.user_id == User.id)
+                .where(GamePlayers.game_id == game_id, GamePlayers.is_active.is_(True))
             )
-            .join(GamePlayers, GamePlayers.user_id == User.id)
-            .outerjoin(StudentStats, StudentStats.user_id == User.id)
-            .filter(GamePlayers.game_id == game_id, GamePlayers.is_active.is_(True))
-            .all()
-        )
+        ).all()
 
         players_simple = [r.username for r in rows]
 
@@ -222,21 +243,22 @@ async def emit_players(game_id):
         rec_map: dict[str, dict] = {}
         if user_ids:
             latest_recs = (
-                db.query(
-                    Recommendation.user_id.label("user_id"),
-                    Recommendation.rec.label("rec"),
-                    Recommendation.confidence.label("confidence"),
-                )
-                .outerjoin(Round, Round.id == Recommendation.round_id)
-                .filter(Recommendation.user_id.in_(user_ids))
-                .order_by(
-                    Recommendation.user_id,
-                    desc(Round.end_ts).nulls_last(),
-                    desc(Recommendation.id),
+                await db.execute(
+                    select(
+                        Recommendation.user_id.label("user_id"),
+                        Recommendation.rec.label("rec"),
+                        Recommendation.confidence.label("confidence"),
+                    )
+                    .outerjoin(Round, Round.id == Recommendation.round_id)
+                    .where(Recommendation.user_id.in_(user_ids))
+                    .order_by(
+                        Recommendation.user_id,
+                        desc(Round.end_ts).nulls_last(),
+                        desc(Recommendation.id),
+                    )
+                    .distinct(Recommendation.user_id)
                 )
-                .distinct(Recommendation.user_id)
-                .all()
-            )
+            ).all()
             for r in latest_recs:
                 rec_map[str(r.user_id)] = {
                     "last_recommendation": r.rec,
@@ -249,23 +271,24 @@ async def emit_players(game_id):
 
         if user_ids:
             last_rounds = (
-                db.query(
-                    Round.user_id.label("user_id"),
-                    Round.accuracy,
-                    Round.avg_time_secs,
-                    Round.hints,
-                    Recommendation.prev_difficulty,
-                )
-                .outerjoin(Recommendation, Recommendation.round_id == Round.id)
-                .filter(Round.user_id.in_(user_ids))
-                .order_by(
-                    Round.user_id,
-                    desc(Round.end_ts).nulls_last(),
-                    desc(Round.id),
+                await db.execute(
+                    select(
+                        Round.user_id.label("user_id"),
+                        Round.accuracy,
+                        Round.avg_time_secs,
+                        Round.hints,
+                        Recommendation.prev_difficulty,
+                    )
+                    .outerjoin(Recommendation, Recommendation.round_id == Round.id)
+                    .where(Round.user_id.in_(user_ids))
+                    .order_by(
+                        Round.user_id,
+                        desc(Round.end_ts).nulls_last(),
+                        desc(Round.id),
+                    )
+                    .distinct(Round.user_id)
                 )
-                .distinct(Round.user_id)
-                .all()
-            )
+            ).all()
 
             for r in last_rounds:
                 perf_map[str(r.user_id)] = {
@@ -293,19 +316,68 @@ async def emit_players(game_id):
             for r in rows
         ]
 
-        await sio.emit(
-            "updatePlayers",
-            {"players": players_simple, "playersDetailed": players_detailed},
-            room=str(game_id),
-        )
-    finally:
-        db.close()
+        return players_simple, players_detailed
+
+
+def _roster_room(room):
+    # socket.io soba klijenata koji primaju playersDelta umjesto updatePlayers
+    return f"{room}:roster"
+
+
+async def _emit_players_now(room):
+    players_simple, players_detailed = await _load_roster(room)
+    delta = roster_tracker.update(room, players_simple, players_detailed)
+    subscribers = roster_tracker.subscribers(room)
+
+    # stari klijenti dobivaju cijeli roster kao i prije
+    await sio.emit(
+        "updatePlayers",
+        {"players": players_simple, "playersDetailed": players_detailed},
+        room=room,
+        skip_sid=subscribers or None,
+    )
+    if delta and subscribers:
+        await sio.emit("playersDelta", delta, room=_roster_room(room))
+
+
+player_broadcaster.bind(_emit_players_now)
+
+
+async def _subscribe_roster(sid, room):
+    roster_tracker.subscribe(room, sid)
+    await sio.enter_room(sid, _roster_room(room))
+    if not roster_tracker.has_state(room):
+        players_simple, players_detailed = await _load_roster(room)
+        roster_tracker.update(room, players_simple, players_detailed)
+    await sio.emit("playersSnapshot", roster_tracker.snapshot(room), to=sid)
+
+
+@sio.event
+async def rosterSubscribe(sid, data=None):
+    """
+    Klijent prelazi na playersDelta protokol za igru iz svoje sesije (nakon
+    teacherJoin/joinGame) i dobiva puni playersSnapshot. Isto se salje kad
+    klijent uoci rupu u seq (rosterResync). teacherJoin/joinGame s
+    {"roster": "delta"} rade isto odmah nakon ulaska u igru (i na reconnectu).
+    """
+    session = await sio.get_session(sid)
+    room = session.get("game_id") if session else None
+    if not room:
+        await sio.emit("error", {"message": "Join a game first"}, to=sid)
+        return
+
+    await _subscribe_roster(sid, room)
+
+
+@sio.event
+async def rosterResync(sid, data=None):
+    return await rosterSubscribe(sid, data)
 
 
 @sio.event
 async def disconnect(sid):
-    db = SessionLocal()
-    try:
+    roster_tracker.unsubscribe(sid)
+    async with AsyncSessionLocal() as db:
         # IMPORTANT:
         # A teacher may "disconnect" simply by navigating from the lobby modal to the /teacher/game page,
         # which creates a new socket connection. Auto-closing the lobby here causes false "game finished"
@@ -326,23 +398,40 @@ async def disconnect(sid):
                 except Exception:
                     return
 
-                game = (
-                    db.query(Game)
-                    .filter(Game.id == game_id, Game.teacher_id == teacher_id)
-                    .first()
+                game = await db.scalar(
+                    select(Game)
+                    .where(Game.id == game_id, Game.teacher_id == teacher_id)
+                    .limit(1)
                 )
                 if game and game.status != "finished":
-                    _finish_game(db, game)
+                    await _finish_game(db, game)
                     await sio.emit(
                         "gameClosed", {"game_id": str(game.id)}, room=str(game.id)
                     )
             return
 
+        # Igrac poznat iz GameStateStorea: samo UPDATE, bez trazenja retka
+        left = game_state.leave(sid)
+        if left:
+            game_id, user_id = left
+            await db.execute(
+                update(GamePlayers)
+                .where(
+                    GamePlayers.game_id == uuid.UUID(game_id),
+                    GamePlayers.user_id == uuid.UUID(user_id),
+                    GamePlayers.is_active.is_(True),
+                )
+                .values(is_active=False, left_at=datetime.datetime.utcnow())
+            )
+            await db.commit()
+            await emit_players(game_id)
+            return
+
         # Prefer DB lookup by socket_id; fallback to session if needed
-        player = (
-            db.query(GamePlayers)
-            .filter(GamePlayers.socket_id == sid, GamePlayers.is_active.is_(True))
-            .first()
+        player = await db.scalar(
+            select(GamePlayers)
+            .where(GamePlayers.socket_id == sid, GamePlayers.is_active.is_(True))
+            .limit(1)
         )
 
         if not player:
@@ -351,14 +440,14 @@ async def disconnect(sid):
             if not user_id or not game_id:
                 return
 
-            player = (
-                db.query(GamePlayers)
-                .filter(
+            player = await db.scalar(
+                select(GamePlayers)
+                .where(
                     GamePlayers.user_id == user_id,
                     GamePlayers.game_id == game_id,
                     GamePlayers.is_active.is_(True),
                 )
-                .first()
+                .limit(1)
             )
 
             if not player:
@@ -366,11 +455,9 @@ async def disconnect(sid):
 
         player.is_active = False
         player.left_at = datetime.datetime.utcnow()
-        db.commit()
+        await db.commit()
 
         await emit_players(player.game_id)
-    finally:
-        db.close()
 
 
 @sio.event
@@ -384,26 +471,23 @@ async def closeLobby(sid, data):
     if not game_id_raw:
         return
 
-    db = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as db:
         try:
             game_id = uuid.UUID(str(game_id_raw))
             teacher_id = uuid.UUID(str(session["user_id"]))
         except Exception:
             return
 
-        game = (
-            db.query(Game)
-            .filter(Game.id == game_id, Game.teacher_id == teacher_id)
-            .first()
+        game = await db.scalar(
+            select(Game)
+            .where(Game.id == game_id, Game.teacher_id == teacher_id)
+            .limit(1)
         )
         if not game or game.status == "finished":
             return
 
-        _finish_game(db, game)
+        await _finish_game(db, game)
         await sio.emit("gameClosed", {"game_id": str(game.id)}, room=str(game.id))
-    finally:
-        db.close()
 
 
 @sio.event
@@ -419,26 +503,23 @@ async def endGame(sid, data):
     if not game_id_raw:
         return
 
-    db = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as db:
         try:
             game_id = uuid.UUID(str(game_id_raw))
             teacher_id = uuid.UUID(str(session["user_id"]))
         except Exception:
             return
 
-        game = (
-            db.query(Game)
-            .filter(Game.id == game_id, Game.teacher_id == teacher_id)
-            .first()
+        game = await db.scalar(
+            select(Game)
+            .where(Game.id == game_id, Game.teacher_id == teacher_id)
+            .limit(1)
         )
         if not game or game.status == "finished":
             return
 
-        _finish_game(db, game)
+        await _finish_game(db, game)
         await sio.emit("gameClosed", {"game_id": str(game.id)}, room=str(game.id))
-    finally:
-        db.close()
 
 
 async def get_socket_user(sid):
@@ -464,80 +545,119 @@ async def startGame(sid, data):
         await sio.emit("error", {"message": "Missing game_id or topic_id"}, to=sid)
         return
 
-    db = SessionLocal()
-    try:
-        game = (
-            db.query(Game)
-            .filter(
+    async with AsyncSessionLocal() as db:
+        game = await db.scalar(
+            select(Game)
+            .where(
                 Game.id == game_id,
                 Game.teacher_id == session["user_id"],
                 Game.status == "lobby",
             )
-            .first()
+            .limit(1)
         )
         if not game:
             await sio.emit("error", {"message": "Game not found"}, to=sid)
             return
-        game.status = "started"
-        db.add(game)
-        db.commit()
 
         room_key = str(game.id)
-        if room_key not in questions:
-            questions[room_key] = {}
-
-        active = (
-            db.query(GamePlayers)
-            .filter(GamePlayers.game_id == game.id, GamePlayers.is_active.is_(True))
-            .all()
-        )
-
-        for gp in active:
-            if not gp.socket_id:
-                continue
-
-            student = (
-                db.query(User)
-                .filter(User.id == gp.user_id, User.role == "student")
-                .first()
+        active = [p for p in await _active_players(db, game.id) if p.sid]
+
+        # svi ucenici jednim upitom
+        students = {}
+        if active:
+            rows = await db.scalars(
+                select(User)
+                .where(User.id.in_([uuid.UUID(p.user_id) for p in active]), User.role == "student")
             )
-            if not student:
-                continue
+            students = {str(u.id): u for u in rows.all()}
+        players = [p for p in active if p.user_id in students]
+
+        # pitanja se biraju jednom po sobi (po tezini koja treba bilo kojem uceniku)
+        tiers = {
+            difficulty: QUESTION_POOL_PER_TIER
+            for p in players
+            for difficulty in DIFFICULTY_DISTRIBUTION.get(students[p.user_id].current_difficulty, {})
+        }
+        pool = await load_question_pool(db, topic_id, tiers)
+        assignments = [
+            (p, uuid.uuid4(), pick_questions(pool, students[p.user_id].current_difficulty))
+            for p in players
+        ]
 
-            user_questions = generate_questions(
-                db, topic_id, student.current_difficulty
+        # status igre i sve runde u jednoj transakciji, runde jednim bulk insertom
+        game.status = "started"
+        db.add(game)
+        if assignments:
+            await db.execute(
+                insert(Round),
+                [
+                    {
+                        "id": round_id,
+                        "user_id": uuid.UUID(p.user_id),
+                        "game_id": game.id,
+                        "question_count": len(user_questions),
+                        "round_index": 0,
+                    }
+                    for p, round_id, user_questions in assignments
+                ],
             )
-
-            round_obj = Round(
-                user_id=student.id,
-                game_id=game.id,
-                question_count=len(user_questions),
-                round_index=0,
+        await db.commit()
+
+        room_state = game_state.room(game.id, create=True)
+        room_state.status = "started"
+        room_state.topic_id = str(topic_id)
+        for p, round_id, user_questions in assignments:
+            game_state.set_round(
+                game.id, p.user_id, round_id, 0, [q["question_id"] for q in user_questions]
             )
-            db.add(round_obj)
-            db.commit()
-            db.refresh(round_obj)
-
-            questions[room_key][gp.socket_id] = {
-                "user_id": str(student.id),
-                "question_ids": [q["question_id"] for q in user_questions],
-                "round_id": str(round_obj.id),
-            }
 
-            await sio.emit(
-                "receiveQuestions",
+        await _send_questions([
+            (
+                p.sid,
                 {
                     "questions": user_questions,
                     "game_id": str(game.id),
                     "topic_id": str(topic_id),
-                    "round_id": str(round_obj.id),
+                    "round_id": str(round_id),
                 },
-                to=gp.socket_id,
             )
+            for p, round_id, user_questions in assignments
+        ])
 
         await sio.emit("gameStarted", {"game_id": str(game.id)}, room=room_key)
-    finally:
-        db.close()
+
+
+async def _send_questions(messages, retries: int = 1):
+    """
+    receiveQuestions za [(sid, payload)] paralelno. Emit koji ne uspije se ponovi
+    (runda je vec u bazi, a bez pitanja ucenik ostaje zaglavljen); ako ne uspije
+    ni tada, greska se zapise.
+    """
+    for _ in range(retries + 1):
+        results = await asyncio.gather(
+            *(sio.emit("receiveQuestions", payload, to=to) for to, payload in messages),
+            return_exceptions=True,
+        )
+        failed = [(m, r) for m, r in zip(messages, results) if isinstance(r, Exception)]
+        if not failed:
+            return
+        messages = [m for m, _ in failed]
+    for (to, payload), error in failed:
+        print(f"receiveQuestions error (sid {to}, round {payload['round_id']}): {str(error)}")
+
+
+async def _active_players(db: AsyncSession, game_id):
+    """Aktivni igraci iz GameStateStorea; soba koja nije napunjena iz GamePlayers se prvo napuni."""
+    room = await game_state.ensure_hydrated(game_id, lambda: _load_active_players(db, game_id))
+    return room.active_players()
+
+
+async def _load_active_players(db: AsyncSession, game_id):
+    rows = await db.execute(
+        select(GamePlayers.user_id, GamePlayers.socket_id)
+        .where(GamePlayers.game_id == game_id, GamePlayers.is_active.is_(True))
+    )
+    return rows.all()
 
 
 @sio.event
@@ -555,19 +675,78 @@ async def endGameLegacy(sid, data):
     return
 
 
-DIFFICULTY_DISTRIBUTION = {
-    1: {1: 10},
-    2: {1: 3, 2: 5, 3: 2},
-    3: {2: 2, 3: 6, 4: 2},
-    4: {3: 2, 4: 6, 5: 2},
-    5: {4: 5, 5: 5},
-}
+def _question_item(q, num_answer):
+    item = {
+        "question_id": str(q.id),
+        "question": q.text,
+        "difficulty": q.difficulty,
+        "type": q.type,
+        "answer": {},
+    }
+
+    if q.type == "num":
+        if num_answer:
+            item["answer"] = {
+                "type": "numerical",
+                "correct_answer": num_answer.correct_answer,
+            }
+
+    """elif q.type == "mcq":
+        if mc_answer:
+            item["answer"] = {
+                "type": "multiple_choice",
+                "option_a": mc_answer.option_a,
+                "option_b": mc_answer.option_b,
+                "option_c": mc_answer.option_c,
+                "correct_answer": mc_answer.correct_answer,
+            }
+
+    elif q.type == "wri":
+        if wri_answer:
+            item["answer"] = {
+                "type": "written",
+                "correct_answer": wri_answer.correct_answer,
+            }"""
+
+    return item
 
 
-def generate_questions(db: Session, topic_id, current_difficulty: int, limit: int = 10):
+async def load_question_pool(db: AsyncSession, topic_id, tiers: dict[int, int]):
+    """
+    tezina -> itemi pitanja (s odgovorima) za receiveQuestions; najvise tiers[tezina]
+    nasumicnih pitanja po tezini. Jedan upit po tezini + jedan za sve odgovore.
+    """
     if not topic_id:
-        return []
+        return {}
+
+    rows_by_tier = {}
+    for difficulty, count in tiers.items():
+        rows_by_tier[difficulty] = (
+            await db.scalars(
+                select(Question)
+                .where(
+                    Question.topic_id == topic_id,
+                    Question.difficulty == difficulty,
+                )
+                .order_by(func.random())
+                .limit(count)
+            )
+        ).all()
+
+    num_ids = [q.id for rows in rows_by_tier.values() for q in rows if q.type == "num"]
+    num_answers = {}
+    if num_ids:
+        for ans in (await db.scalars(select(NumAnswer).where(NumAnswer.question_id.in_(num_ids)))).all():
+            num_answers.setdefault(ans.question_id, ans)
+
+    return {
+        difficulty: [_question_item(q, num_answers.get(q.id)) for q in rows]
+        for difficulty, rows in rows_by_tier.items()
+    }
+
 
+def pick_questions(pool, current_difficulty: int, limit: int = 10):
+    """Pitanja za ucenika iz bazena po DIFFICULTY_DISTRIBUTION njegove razine."""
     distribution = DIFFICULTY_DISTRIBUTION.get(current_difficulty)
     if not distribution:
         return []
@@ -575,63 +754,22 @@ def generate_questions(db: Session, topic_id, current_difficulty: int, limit: in
     selected_questions = []
     # radi samo ako imamo dovoljno pitanja u bazi
     for difficulty, count in distribution.items():
-        rows = (
-            db.query(Question)
-            .filter(
-                Question.topic_id == topic_id,
-                Question.difficulty == difficulty,
-            )
-            .order_by(func.random())
-            .limit(count)
-            .all()
-        )
-
-        selected_questions.extend(rows)
+        tier = pool.get(difficulty, [])
+        selected_questions.extend(random.sample(tier, min(count, len(tier))))
 
     # promijesaj da tezine pitanja ne idu redom
     random.shuffle(selected_questions)
 
-    result = []
-
-    for q in selected_questions[:limit]:
-        item = {
-            "question_id": str(q.id),
-            "question": q.text,
-            "difficulty": q.difficulty,
-            "type": q.type,
-            "answer": {},
-        }
-
-        if q.type == "num":
-            ans = db.query(NumAnswer).filter(NumAnswer.question_id == q.id).first()
-            if ans:
-                item["answer"] = {
-                    "type": "numerical",
-                    "correct_answer": ans.correct_answer,
-                }
-
-        """elif q.type == "mcq":
-            ans = db.query(McAnswer).filter(McAnswer.question_id == q.id).first()
-            if ans:
-                item["answer"] = {
-                    "type": "multiple_choice",
-                    "option_a": ans.option_a,
-                    "option_b": ans.option_b,
-                    "option_c": ans.option_c,
-                    "correct_answer": ans.correct_answer,
-                }
+    return selected_questions[:limit]
 
-        elif q.type == "wri":
-            ans = db.query(WriAnswer).filter(WriAnswer.question_id == q.id).first()
-            if ans:
-                item["answer"] = {
-                    "type": "written",
-                    "correct_answer": ans.correct_answer,
-                }"""
 
-        result.append(item)
+async def generate_questions(db: AsyncSession, topic_id, current_difficulty: int, limit: int = 10):
+    distribution = DIFFICULTY_DISTRIBUTION.get(current_difficulty)
+    if not topic_id or not distribution:
+        return []
 
-    return result
+    pool = await load_question_pool(db, topic_id, distribution)
+    return pick_questions(pool, current_difficulty, limit)
 
 
 # FRONTEND SALJE:
@@ -646,32 +784,30 @@ def generate_questions(db: Session, topic_id, current_difficulty: int, limit: in
 # EVENT ZA HANDLEANJE SVAKOG ODGOVORA NA PITANJE
 @sio.event
 async def submit_answer(sid, data):
-    db: Session = SessionLocal()
-    try:
-        session = await sio.get_session(sid)
-        if not session:
-            return
+    async with AsyncSessionLocal() as db:
+        try:
+            session = await sio.get_session(sid)
+            if not session:
+                return
 
-        user_id = session["user_id"]
+            user_id = session["user_id"]
 
-        attempt = Attempt(
-            user_id=user_id,
-            question_id=data["question_id"],
-            round_id=data["round_id"],
-            is_correct=data["is_correct"],
-            num_attempts=data.get("num_attempts", 1),
-            time_spent_secs=data.get("time_spent_secs", 0),
-            hints_used=data.get("hints_used", 0),
-        )
+            attempt = Attempt(
+                user_id=user_id,
+                question_id=data["question_id"],
+                round_id=data["round_id"],
+                is_correct=data["is_correct"],
+                num_attempts=data.get("num_attempts", 1),
+                time_spent_secs=data.get("time_spent_secs", 0),
+                hints_used=data.get("hints_used", 0),
+            )
 
-        db.add(attempt)
-        db.commit()
-    except Exception as e:
-        db.rollback()
-        await sio.emit("error", {"message": f"Database error {str(e)}"}, to=sid)
-        return
-    finally:
-        db.close()
+            db.add(attempt)
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            await sio.emit("error", {"message": f"Database error {str(e)}"}, to=sid)
+            return
 
 
 # dohvati novi batch pitanja
@@ -680,77 +816,73 @@ async def submit_answer(sid, data):
 # room_id = data["room_id"]
 @sio.event
 async def fetch_new_batch(sid, data):
-    db: Session = SessionLocal()
-    try:
-        session = await sio.get_session(sid)
-        if not session:
-            return
-
-        user_id = session["user_id"]
-        game_id = session.get("game_id")
-        topic_id = data["selectedTopic"]["topic_id"]
-        room_id = data["room_id"]
+    async with AsyncSessionLocal() as db:
+        try:
+            session = await sio.get_session(sid)
+            if not session:
+                return
 
-        student = db.query(User).filter((User.id == user_id)).first()
-        if not student:
-            await sio.emit("error", {"message": "User not found"}, to=sid)
-            return
+            user_id = session["user_id"]
+            game_id = session.get("game_id")
+            topic_id = data["selectedTopic"]["topic_id"]
 
-        current_difficulty = student.current_difficulty
-        user_questions = generate_questions(db, topic_id, current_difficulty)
+            student = await db.scalar(select(User).where(User.id == user_id).limit(1))
+            if not student:
+                await sio.emit("error", {"message": "User not found"}, to=sid)
+                return
 
-        last_round = (
-            db.query(Round)
-            .filter(Round.user_id == user_id, Round.game_id == game_id)
-            .order_by(Round.round_index.desc())
-            .first()
-        )
-        next_index = 0 if last_round is None else last_round.round_index + 1
-
-        # Create round
-        round_obj = Round(
-            user_id=user_id,
-            game_id=game_id,
-            question_count=len(user_questions),
-            round_index=next_index,
-        )
+            current_difficulty = student.current_difficulty
+            user_questions = await generate_questions(db, topic_id, current_difficulty)
+
+            player = game_state.player(game_id, user_id) if game_id else None
+            if player is not None and player.round_index >= 0:
+                next_index = player.round_index + 1
+            else:
+                last_round = await db.scalar(
+                    select(Round)
+                    .where(Round.user_id == user_id, Round.game_id == game_id)
+                    .order_by(Round.round_index.desc())
+                    .limit(1)
+                )
+                next_index = 0 if last_round is None else last_round.round_index + 1
 
-        db.add(round_obj)
-        db.commit()
-        db.refresh(round_obj)
+            # Create round
+            round_obj = Round(
+                user_id=user_id,
+                game_id=game_id,
+                question_count=len(user_questions),
+                round_index=next_index,
+            )
 
-        if room_id not in questions:
-            questions[room_id] = {}
+            db.add(round_obj)
+            await db.commit()
+            await db.refresh(round_obj)
 
-        questions[room_id][sid] = {
-            "user_id": str(user_id),
-            "question_ids": [q["question_id"] for q in user_questions],
-            "round_id": str(round_obj.id),
-        }
+            if game_id:
+                game_state.set_round(
+                    game_id, user_id, round_obj.id, next_index, [q["question_id"] for q in user_questions]
+                )
 
-        await sio.emit(
-            "receiveQuestions",
-            {
-                "questions": user_questions,
-                "game_id": str(game_id),
-                "topic_id": str(topic_id),
-                "round_id": str(round_obj.id),
-            },
-            to=sid,
-        )
-    except Exception as e:
-        db.rollback()
-        await sio.emit("error", {"message": f"Database error {str(e)}"}, to=sid)
-        return
-    finally:
-        db.close()
+            await sio.emit(
+                "receiveQuestions",
+                {
+                    "questions": user_questions,
+                    "game_id": str(game_id),
+                    "topic_id": str(topic_id),
+                    "round_id": str(round_obj.id),
+                },
+                to=sid,
+            )
+        except Exception as e:
+            await db.rollback()
+            await sio.emit("error", {"message": f"Database error {str(e)}"}, to=sid)
+            return
 
 
 # EVENT ZA GOTOVU RUNDU SVAKOG UCENIKA
 @sio.event
 async def finish_round(sid, data):
-    db = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as db:
         session = await sio.get_session(sid)
         if not session:
             return
@@ -764,33 +896,29 @@ async def finish_round(sid, data):
 
         game_id = session.get("game_id")
         if game_id:
-            try:
-                await emit_players(uuid.UUID(str(game_id)))
-            except Exception:
-                await emit_players(game_id)
-    finally:
-        db.close()
+            await emit_players(game_id)
 
 
-async def finalize_round(db: Session, round_id, user_id, xp):
-    student = db.query(User).filter((User.id == user_id)).first()
+async def finalize_round(db: AsyncSession, round_id, user_id, xp):
+    student = await db.scalar(select(User).where(User.id == user_id).limit(1))
 
     stats = (
-        db.query(
-            func.count(Attempt.id),
-            func.avg(Attempt.time_spent_secs),
-            func.sum(Attempt.hints_used),
-            #func.avg(1.0 / Attempt.num_attempts),
-            func.avg(case((Attempt.num_attempts == 1, 1),else_=0),)
+        await db.execute(
+            select(
+                func.count(Attempt.id),
+                func.avg(Attempt.time_spent_secs),
+                func.sum(Attempt.hints_used),
+                #func.avg(1.0 / Attempt.num_attempts),
+                func.avg(case((Attempt.num_attempts == 1, 1),else_=0),)
 
+            )
+            .where(Attempt.round_id == round_id)
         )
-        .filter(Attempt.round_id == round_id)
-        .one()
-    )
+    ).one()
 
     total, avg_time, hints, accuracy = stats
 
-    round_obj = db.query(Round).filter(Round.id == round_id).one()
+    round_obj = (await db.scalars(select(Round).where(Round.id == round_id))).one()
 
     round_obj.end_ts = func.now()
     round_obj.avg_time_secs = avg_time or 0
@@ -798,11 +926,11 @@ async def finalize_round(db: Session, round_id, user_id, xp):
     round_obj.accuracy = accuracy or 0
 
     db.add(round_obj)
-    db.commit()
-    db.refresh(round_obj)
+    await db.commit()
+    await db.refresh(round_obj)
 
-    # call model
-    diff_response = predict_function(
+    # call model (batched together with other rounds finishing at the same time)
+    diff_response = await prediction_batcher.predict(
         DifficultyRequest(
             accuracy=round_obj.accuracy,
             avg_time=round_obj.avg_time_secs,
@@ -810,25 +938,37 @@ async def finalize_round(db: Session, round_id, user_id, xp):
         )
     )
 
+    # kandidat dobiva istu rundu u pozadini (ne ceka se, pod opterecenjem se odbacuje)
+    shadow_evaluator.submit(
+        round_obj.id,
+        round_obj.accuracy,
+        round_obj.avg_time_secs,
+        round_obj.hints or 0,
+        diff_response.label,
+        diff_response.model_version,
+    )
+
     prev_round = (
-        db.query(Round)
-        .filter(
-            Round.user_id == user_id,
-            Round.round_index == round_obj.round_index - 1,
-            Round.game_id == round_obj.game_id
+        await db.scalars(
+            select(Round)
+            .where(
+                Round.user_id == user_id,
+                Round.round_index == round_obj.round_index - 1,
+                Round.game_id == round_obj.game_id
+            )
         )
-        .one_or_none()
-    )
+    ).one_or_none()
 
     if prev_round:
         prev_rec = (
-            db.query(Recommendation)
-            .filter(
-                Recommendation.round_id == prev_round.id,
-                Recommendation.true_label.is_(None),
+            await db.scalars(
+                select(Recommendation)
+                .where(
+                    Recommendation.round_id == prev_round.id,
+                    Recommendation.true_label.is_(None),
+                )
             )
-            .one_or_none()
-        )
+        ).one_or_none()
 
         if prev_rec:
             true_label = derive_true_label(prev_round, round_obj)
@@ -836,11 +976,11 @@ async def finalize_round(db: Session, round_id, user_id, xp):
             prev_rec.true_label = true_label
             prev_rec.labeled_at = datetime.datetime.now()
             db.add(prev_rec)
-            db.commit()
+            await db.commit()
 
-            try:
-                loop = asyncio.get_event_loop()
+            shadow_evaluator.record_outcome(prev_round.id, true_label)
 
+            try:
                 feedback_req = FeedbackRequest(
                     accuracy=prev_round.accuracy,
                     avg_time=prev_round.avg_time_secs,
@@ -849,30 +989,15 @@ async def finalize_round(db: Session, round_id, user_id, xp):
                     sample_weight=(5.0 * float(prev_rec.confidence)),
                 )
 
-                await loop.run_in_executor(
-                    None,
-                    partial(feedback_function, feedback_req)              
-                )
+                # predaja learneru (socket prema learner procesu ili WAL append + fsync)
+                # moze blokirati, pa ide u thread pool; ucenje je ionako u mini-batchu
+                await asyncio.to_thread(feedback_function, feedback_req)
             except Exception as e:
                 print(f'FEEDBACK ERROR: {str(e)}')
                 import traceback
                 traceback.print_exc()
 
-    # Defaults to avoid unbound new_diff/rec_text at edges
-    new_diff = student.current_difficulty
-    rec_text = "same"
-
-    if diff_response.label == 0:
-        rec_text = "down"
-        if student.current_difficulty > 1:
-            new_diff = student.current_difficulty - 1
-    elif diff_response.label == 1:
-        rec_text = "same"
-        new_diff = student.current_difficulty
-    elif diff_response.label == 2:
-        rec_text = "up"
-        if student.current_difficulty < 5:
-            new_diff = student.current_difficulty + 1
+    new_diff, rec_text = next_difficulty(student.current_difficulty, diff_response.label)
 
     # create new recommendation based on model prediction and apply it instantly
     recommendation = Recommendation(
@@ -883,22 +1008,23 @@ async def finalize_round(db: Session, round_id, user_id, xp):
         prev_difficulty=student.current_difficulty,
         new_difficulty=new_diff,
         round_index=round_obj.round_index,
+        model_version=diff_response.model_version,
     )
     db.add(recommendation)
 
     student.current_difficulty = new_diff
     db.add(student)
-    db.commit()
+    await db.commit()
 
     # student stats
     round_attempts = round_obj.question_count
     round_accuracy = float(round_obj.accuracy)
 
     stats = (
-        db.query(StudentStats)
-        .filter(StudentStats.user_id == round_obj.user_id)
-        .one_or_none()
-    )
+        await db.scalars(
+            select(StudentStats).where(StudentStats.user_id == round_obj.user_id)
+        )
+    ).one_or_none()
 
     if not stats:
         stats = StudentStats(
@@ -927,4 +1053,4 @@ async def finalize_round(db: Session, round_id, user_id, xp):
     stats.xp = xp_gained
 
     db.add(stats)
-    db.commit()
+    await db.commit()
@@ -0,0 +1,166 @@
+import os
+import re
+import threading
+import time
+from pathlib import Path
+
+import joblib
+
+CHECKPOINT_RE = re.compile(r"^checkpoint-(\d+)\.pkl$")
+
+
+def atomic_write(path: Path, write_fn, fsync: bool = True):
+    """
+    Zapisuje datoteku atomarno: temp datoteka u istom direktoriju -> fsync -> rename.
+    Ako proces padne usred pisanja, stara verzija ostaje netaknuta.
+    Bez fsync-a citatelji i dalje nikad ne vide napola zapisanu datoteku,
+    ali zapis ne mora prezivjeti pad sustava.
+    """
+    path = Path(path)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        write_fn(f)
+        f.flush()
+        if fsync:
+            os.fsync(f.fileno())
+    os.replace(tmp, path)
+    if fsync:
+        _fsync_dir(path.parent)
+
+
+def _fsync_dir(directory: Path):
+    # da rename prezivi pad sustava; na Windowsu direktorij se ne moze otvoriti
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def list_checkpoints(directory: Path):
+    """Vraca [(version, path)] sortirano od najstarijeg prema najnovijem."""
+    directory = Path(directory)
+    if not directory.is_dir():
+        return []
+    found = []
+    for p in directory.iterdir():
+        m = CHECKPOINT_RE.match(p.name)
+        if m:
+            found.append((int(m.group(1)), p))
+    return sorted(found)
+
+
+class CheckpointWriter:
+    """
+    Pozadinska dretva koja sprema checkpointe modela izvan hot patha.
+
+    Learner nakon svakog updatea samo pozove notify_update(). Checkpoint se
+    zapisuje kad se skupi every_updates updateova ili kad prode interval_s
+    sekundi od zadnjeg checkpointa (ako je bilo promjena). capture_fn vraca
+    (version, payload) i sam uzima lock modela samo na vrijeme kopiranja.
+    Cuva se zadnjih `keep` verzija.
+    """
+
+    def __init__(self, directory: Path, capture_fn, keep: int = 5,
+                 every_updates: int = 10, interval_s: float = 60.0):
+        self.directory = Path(directory)
+        self.capture_fn = capture_fn
+        self.keep = keep
+        self.every_updates = every_updates
+        self.interval_s = interval_s
+
+        self._dirty = 0
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopped = False
+        self._last_write = time.monotonic()
+
+        # metrike
+        self.written = 0
+        self.last_version = None
+        self.last_write_ms = 0.0
+        self.errors = 0
+
+    def notify_update(self):
+        with self._cond:
+            self._dirty += 1
+            self._ensure_thread()
+            # prvi update budi dretvu da krene mjeriti interval
+            if self._dirty == 1 or self._dirty >= self.every_updates:
+                self._cond.notify()
+
+    def stop(self):
+        """Zaustavi dretvu i zapisi zadnji checkpoint ako ima nespremljenih promjena."""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+        if self._dirty:
+            self.write_now()
+
+    def write_now(self):
+        with self._cond:
+            self._dirty = 0
+        start = time.perf_counter()
+        try:
+            version, payload = self.capture_fn()
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path = self.directory / f"checkpoint-{version:08d}.pkl"
+            atomic_write(path, lambda f: joblib.dump(payload, f))
+            self._prune()
+            self.written += 1
+            self.last_version = version
+        except Exception as e:
+            self.errors += 1
+            print(f"CHECKPOINT ERROR: {str(e)}")
+        finally:
+            self._last_write = time.monotonic()
+            self.last_write_ms = 1000.0 * (time.perf_counter() - start)
+
+    def _prune(self):
+        for _, path in list_checkpoints(self.directory)[:-self.keep]:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+    def _ensure_thread(self):
+        if self._thread is None and not self._stopped:
+            self._thread = threading.Thread(
+                target=self._run, name="checkpoint-writer", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopped:
+                    if self._dirty >= self.every_updates:
+                        break
+                    remaining = self.interval_s - (time.monotonic() - self._last_write)
+                    if self._dirty and remaining <= 0:
+                        break
+                    self._cond.wait(remaining if self._dirty else None)
+                if self._stopped:
+                    return
+            self.write_now()
+
+    def stats(self):
+        return {
+            "pending_updates": self._dirty,
+            "written": self.written,
+            "last_version": self.last_version,
+            "last_write_ms": self.last_write_ms,
+            "errors": self.errors,
+            "config": {
+                "keep": self.keep,
+                "every_updates": self.every_updates,
+                "interval_s": self.interval_s,
+            },
+        }
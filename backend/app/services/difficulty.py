@@ -0,0 +1,20 @@
+# koliko pitanja koje tezine dobiva ucenik na pojedinoj razini (10 pitanja po rundi)
+DIFFICULTY_DISTRIBUTION = {
+    1: {1: 10},
+    2: {1: 3, 2: 5, 3: 2},
+    3: {2: 2, 3: 6, 4: 2},
+    4: {3: 2, 4: 6, 5: 2},
+    5: {4: 5, 5: 5},
+}
+
+MIN_DIFFICULTY = 1
+MAX_DIFFICULTY = 5
+
+
+def next_difficulty(current: int, label: int):
+    """Nova razina i tekst preporuke za labelu modela (0 - dolje, 1 - isto, 2 - gore)."""
+    if label == 0:
+        return max(current - 1, MIN_DIFFICULTY), "down"
+    if label == 2:
+        return min(current + 1, MAX_DIFFICULTY), "up"
+    return current, "same"
@@ -0,0 +1,167 @@
+import json
+import os
+import re
+import threading
+from pathlib import Path
+
+from app.services.checkpoint import atomic_write
+
+SEGMENT_RE = re.compile(r"^wal-(\d+)\.jsonl$")
+
+
+class FeedbackLog:
+    """
+    Append-only log feedback primjera (JSON lines), podijeljen u segmente.
+
+    Segment wal-<V>.jsonl pocinje kad je model bio u verziji V (u tom trenutku
+    se sprema i checkpoint V) i sadrzi dvije vrste zapisa:
+      ["s", acc, avg_time, hints, label, weight] - primjer je primljen (submit)
+      ["b", version, n]                          - sljedecih n primljenih primjera
+                                                   nauceno je kao jedan batch,
+                                                   model je sada u verziji `version`
+    Iz checkpointa V i replaya segmenata od V nadalje dobiva se tocno isto
+    stanje modela; primjeri bez "b" zapisa nisu jos nauceni i vracaju se u red.
+    """
+
+    def __init__(self, directory: Path, fsync: bool = False):
+        self.directory = Path(directory)
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._file = None
+        self.segment_version = None
+
+        # metrike
+        self.appended = 0
+        self.bytes_written = 0
+
+    def segment_path(self, version: int) -> Path:
+        return self.directory / f"wal-{version:08d}.jsonl"
+
+    def list_segments(self):
+        """Vraca [(start_version, path)] sortirano po verziji."""
+        if not self.directory.is_dir():
+            return []
+        found = []
+        for p in self.directory.iterdir():
+            m = SEGMENT_RE.match(p.name)
+            if m:
+                found.append((int(m.group(1)), p))
+        return sorted(found)
+
+    def open(self, version: int):
+        """Nastavi pisati u segment koji pocinje u verziji `version`."""
+        with self._lock:
+            self._close()
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.segment_path(version), "ab")
+            self.segment_version = version
+
+    def rotate(self, version: int, pending):
+        """
+        Zapocni novi segment u verziji `version` (poziva se kod checkpointa).
+        Primjeri koji jos cekaju u redu prepisuju se na pocetak novog segmenta
+        pa stari segmenti vise nisu potrebni nakon sto checkpoint bude spremljen.
+        """
+        lines = b"".join(self._encode(["s", *sample_values(s)]) for s in pending)
+        with self._lock:
+            self._close()
+            self.directory.mkdir(parents=True, exist_ok=True)
+            atomic_write(self.segment_path(version), lambda f: f.write(lines))
+            self._file = open(self.segment_path(version), "ab")
+            self.segment_version = version
+
+    def append_sample(self, sample):
+        self._append(["s", *sample_values(sample)])
+
+    def append_batch(self, version: int, n: int):
+        self._append(["b", version, n])
+
+    def prune(self, min_version: int):
+        """Obrisi segmente koji pocinju prije `min_version` (najstariji cuvani checkpoint)."""
+        for start, path in self.list_segments():
+            if start < min_version and start != self.segment_version:
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+    def replay(self, from_version: int):
+        """
+        Procitaj segmente od checkpointa `from_version` nadalje.
+        Vraca (batches, leftovers): batches je lista (version, [sample_values])
+        redom kako su nauceni, leftovers su primjeri koji nisu bili nauceni.
+        """
+        batches = []
+        leftovers = []
+        version = from_version
+
+        for start, path in self.list_segments():
+            if start < from_version:
+                continue
+            if start != version:
+                print(f"Feedback log gap: expected segment {version}, found {start}")
+                break
+
+            pending = []
+            with open(path, "rb") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        # nedovrsen zadnji zapis (pad usred pisanja)
+                        break
+                    if rec[0] == "s":
+                        pending.append(rec[1:])
+                    elif rec[0] == "b":
+                        _, batch_version, n = rec
+                        batches.append((batch_version, pending[:n]))
+                        pending = pending[n:]
+                        version = batch_version
+            # primjeri koji su cekali na kraju segmenta prepisani su u sljedeci
+            leftovers = pending
+
+        return batches, leftovers
+
+    def _append(self, rec):
+        data = self._encode(rec)
+        with self._lock:
+            if self._file is None:
+                raise RuntimeError("Feedback log is not open")
+            self._file.write(data)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self.appended += 1
+            self.bytes_written += len(data)
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+    @staticmethod
+    def _encode(rec):
+        return (json.dumps(rec, separators=(",", ":")) + "\n").encode()
+
+    def stats(self):
+        return {
+            "segment_version": self.segment_version,
+            "segments": len(self.list_segments()),
+            "appended": self.appended,
+            "bytes_written": self.bytes_written,
+            "fsync": self.fsync,
+        }
+
+
+def sample_values(sample):
+    return [
+        float(sample.accuracy),
+        float(sample.avg_time),
+        int(sample.hints_used),
+        int(sample.true_label),
+        float(sample.sample_weight),
+    ]
@@ -0,0 +1,132 @@
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+
+
+class FeedbackQueue:
+    """
+    Skuplja feedback primjere i primjenjuje ih u mini-batchevima.
+    Batch se primjenjuje kad se skupi batch_size primjera ili kad najstariji
+    primjer u redu bude stariji od max_age_ms. Primjena se radi u zasebnoj
+    (daemon) dretvi pa submit() nikad ne ceka ucenje modela.
+
+    Ako je zadan `lock`, vadjenje batcha iz reda i primjena idu pod njim, pa
+    nitko tko drzi isti lock ne vidi primjere koji su izvadjeni a nisu nauceni.
+    Ako je zadan `log`, svaki primjer se zapisuje u njega prije nego udje u red.
+    """
+
+    def __init__(self, apply_fn, batch_size: int = 16, max_age_ms: float = 2000.0,
+                 lock=None, log=None):
+        self.apply_fn = apply_fn
+        self.batch_size = batch_size
+        self.max_age = max_age_ms / 1000.0
+        self.lock = lock if lock is not None else nullcontext()
+        self.log = log
+
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopped = False
+
+        # metrike
+        self.submitted = 0
+        self.applied = 0
+        self.batches = 0
+        self.errors = 0
+
+    def submit(self, sample):
+        with self._cond:
+            if self.log is not None:
+                self.log.append_sample(sample)
+            self._ensure_thread()
+            self._pending.append((sample, time.monotonic()))
+            self.submitted += 1
+            # prvi primjer budi dretvu da krene mjeriti max_age (inace spava bez timeouta)
+            if len(self._pending) == 1 or len(self._pending) >= self.batch_size:
+                self._cond.notify()
+
+    def requeue(self, samples):
+        """Vrati u red primjere koji su vec zapisani u log (recovery nakon pada)."""
+        with self._cond:
+            self._ensure_thread()
+            now = time.monotonic()
+            self._pending.extend((s, now) for s in samples)
+            self._cond.notify()
+
+    def rotate_log(self, version: int):
+        """Zapocni novi segment loga; primjeri koji cekaju prepisuju se u njega."""
+        with self._cond:
+            self.log.rotate(version, [s for s, _ in self._pending])
+
+    def flush(self):
+        """Odmah primijeni sve sto ceka u redu (npr. kod gasenja servera)."""
+        while self._apply_next(self.batch_size):
+            pass
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.flush()
+
+    def _ensure_thread(self):
+        if self._thread is None and not self._stopped:
+            self._thread = threading.Thread(
+                target=self._run, name="feedback-queue", daemon=True
+            )
+            self._thread.start()
+
+    def _drain(self, limit=None):
+        n = len(self._pending) if limit is None else min(limit, len(self._pending))
+        return [self._pending.popleft()[0] for _ in range(n)]
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopped:
+                    if len(self._pending) >= self.batch_size:
+                        break
+                    if self._pending:
+                        age = time.monotonic() - self._pending[0][1]
+                        if age >= self.max_age:
+                            break
+                        self._cond.wait(self.max_age - age)
+                    else:
+                        self._cond.wait()
+                if self._stopped:
+                    return
+            self._apply_next(self.batch_size)
+
+    def _apply_next(self, limit):
+        with self.lock:
+            with self._cond:
+                batch = self._drain(limit)
+            if not batch:
+                return False
+            try:
+                self.apply_fn(batch)
+                self.applied += len(batch)
+                self.batches += 1
+            except Exception as e:
+                self.errors += 1
+                print(f"FEEDBACK ERROR: {str(e)}")
+                import traceback
+                traceback.print_exc()
+        return True
+
+    def stats(self):
+        return {
+            "pending": len(self._pending),
+            "submitted": self.submitted,
+            "applied": self.applied,
+            "batches": self.batches,
+            "avg_batch_size": self.applied / self.batches if self.batches else 0.0,
+            "errors": self.errors,
+            "config": {
+                "batch_size": self.batch_size,
+                "max_age_ms": 1000.0 * self.max_age,
+            },
+        }
@@ -0,0 +1,211 @@
+import sys
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from app.config import settings
+
+
+@dataclass(slots=True)
+class PlayerState:
+    user_id: str
+    sid: str | None = None
+    active: bool = True
+    # trenutna runda (startGame / fetch_new_batch); round_index -1 = jos nema runde
+    round_id: str | None = None
+    round_index: int = -1
+    question_ids: tuple[str, ...] = ()
+
+
+@dataclass(slots=True)
+class RoomState:
+    game_id: str
+    status: str = "lobby"
+    topic_id: str | None = None
+    players: dict[str, PlayerState] = field(default_factory=dict)
+    last_seen: float = 0.0
+    # True kad su igraci napunjeni iz baze (GamePlayers); do tada soba moze imati
+    # samo dio igraca (npr. prvi ucenik koji se vratio nakon restarta)
+    hydrated: bool = False
+
+    def active_players(self):
+        return [p for p in self.players.values() if p.active]
+
+
+class GameStateStore:
+    """
+    Stanje igara u memoriji procesa: igraci sobe (socket, aktivnost) i njihova
+    trenutna runda. Handleri iz njega citaju aktivne igrace i round_index umjesto
+    ponovnih upita; baza (GamePlayers, Round) ostaje izvor istine. Lista igraca
+    sobe se koristi tek kad je soba napunjena iz baze (ensure_hydrated), jer
+    nakon restarta, TTL-a ili na drugom workeru join stvori sobu samo s jednim
+    igracem.
+
+    Soba se brise u _finish_game (drop) ili kad nije dirana ttl_s sekundi
+    (evict_idle, pokrece se usput najvise jednom u sweep_interval_s). Na oba
+    nacina se zovu on_teardown callbackovi.
+    """
+
+    def __init__(self, ttl_s: float = 7200.0, sweep_interval_s: float = 60.0):
+        self.ttl_s = ttl_s
+        self.sweep_interval_s = sweep_interval_s
+
+        # game_id -> RoomState, redom zadnjeg koristenja (najstarija prva)
+        self._rooms: OrderedDict[str, RoomState] = OrderedDict()
+        # sid -> (game_id, user_id)
+        self._sids: dict[str, tuple[str, str]] = {}
+        self._on_teardown = []
+        self._next_sweep = 0.0
+
+        # metrike
+        self.created = 0
+        self.dropped = 0
+        self.evicted = 0
+        self.hydrations = 0
+        self.hits = 0
+        self.misses = 0
+
+    def on_teardown(self, fn):
+        """fn(game_id) kad se soba makne (kraj igre ili TTL)."""
+        self._on_teardown.append(fn)
+
+    def room(self, game_id, create=False):
+        game_id = str(game_id)
+        now = time.monotonic()
+        if now >= self._next_sweep:
+            self.evict_idle(now)
+
+        room = self._rooms.get(game_id)
+        if room is None:
+            if not create:
+                self.misses += 1
+                return None
+            room = self._rooms[game_id] = RoomState(game_id)
+            self.created += 1
+        else:
+            self.hits += 1
+            self._rooms.move_to_end(game_id)
+        room.last_seen = now
+        return room
+
+    def player(self, game_id, user_id):
+        room = self.room(game_id)
+        return room.players.get(str(user_id)) if room else None
+
+    def join(self, game_id, user_id, sid):
+        room = self.room(game_id, create=True)
+        user_id = str(user_id)
+        player = room.players.get(user_id)
+        if player is None:
+            player = room.players[user_id] = PlayerState(user_id)
+        elif player.sid and player.sid != sid:
+            self._sids.pop(player.sid, None)
+        player.sid = sid
+        player.active = True
+        if sid:
+            self._sids[sid] = (room.game_id, user_id)
+        return player
+
+    def hydrate(self, game_id, players):
+        """
+        Napuni sobu aktivnim igracima iz baze: players je [(user_id, socket_id)].
+        Igraci koje soba vec zna ostaju kakvi jesu (njihovo stanje je novije).
+        """
+        room = self.room(game_id, create=True)
+        for user_id, sid in players:
+            if str(user_id) not in room.players:
+                self.join(game_id, user_id, sid)
+        room.hydrated = True
+        self.hydrations += 1
+        return room
+
+    async def ensure_hydrated(self, game_id, load_players):
+        """Soba s potpunom listom igraca; ako nije napunjena, igrace daje await load_players()."""
+        room = self.room(game_id)
+        if room is not None and room.hydrated:
+            return room
+        return self.hydrate(game_id, await load_players())
+
+    def leave(self, sid):
+        """Igrac socketa sid vise nije aktivan; vraca (game_id, user_id) ili None."""
+        key = self._sids.pop(sid, None)
+        if key is None:
+            return None
+        room = self.room(key[0])
+        player = room.players.get(key[1]) if room else None
+        if player is None:
+            return None
+        player.active = False
+        player.sid = None
+        return key
+
+    def set_round(self, game_id, user_id, round_id, round_index, question_ids):
+        room = self.room(game_id, create=True)
+        user_id = str(user_id)
+        player = room.players.get(user_id)
+        if player is None:
+            player = room.players[user_id] = PlayerState(user_id, active=False)
+        player.round_id = str(round_id)
+        player.round_index = int(round_index)
+        player.question_ids = tuple(question_ids)
+        return player
+
+    def drop(self, game_id):
+        """Kraj igre: makni sobu i sve njezine sockete."""
+        if self._remove(str(game_id)):
+            self.dropped += 1
+
+    def evict_idle(self, now=None):
+        now = time.monotonic() if now is None else now
+        self._next_sweep = now + self.sweep_interval_s
+        while self._rooms:
+            game_id, room = next(iter(self._rooms.items()))
+            if now - room.last_seen <= self.ttl_s:
+                break
+            self._remove(game_id)
+            self.evicted += 1
+
+    def _remove(self, game_id):
+        room = self._rooms.pop(game_id, None)
+        if room is None:
+            return False
+        for player in room.players.values():
+            if player.sid:
+                self._sids.pop(player.sid, None)
+        for fn in self._on_teardown:
+            try:
+                fn(game_id)
+            except Exception as e:
+                print(f"Game state teardown error ({game_id}): {str(e)}")
+        return True
+
+    def memory_bytes(self):
+        """Procjena memorije (sys.getsizeof zapisa, dictova i stringova)."""
+        size = sys.getsizeof(self._rooms) + sys.getsizeof(self._sids)
+        size += sum(sys.getsizeof(sid) + sys.getsizeof(key) for sid, key in self._sids.items())
+        for game_id, room in self._rooms.items():
+            size += sys.getsizeof(game_id) + sys.getsizeof(room) + sys.getsizeof(room.players)
+            for user_id, p in room.players.items():
+                size += sys.getsizeof(user_id) + sys.getsizeof(p) + sys.getsizeof(p.round_id or "")
+                size += sys.getsizeof(p.question_ids) + sum(sys.getsizeof(q) for q in p.question_ids)
+        return size
+
+    def stats(self):
+        players = sum(len(r.players) for r in self._rooms.values())
+        return {
+            "rooms": len(self._rooms),
+            "players": players,
+            "active_players": sum(len(r.active_players()) for r in self._rooms.values()),
+            "sockets": len(self._sids),
+            "memory_bytes": self.memory_bytes(),
+            "created": self.created,
+            "dropped": self.dropped,
+            "evicted": self.evicted,
+            "hydrations": self.hydrations,
+            "hits": self.hits,
+            "misses": self.misses,
+            "config": {"ttl_s": self.ttl_s, "sweep_interval_s": self.sweep_interval_s},
+        }
+
+
+game_state = GameStateStore(settings.GAME_STATE_TTL_S, settings.GAME_STATE_SWEEP_S)
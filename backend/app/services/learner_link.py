@@ -0,0 +1,254 @@
+"""
+Jedan learner za sve uvicorn workere.
+
+Worker koji prvi uzme learner.lock postaje learner: on jedini uci model,
+pise feedback log i checkpointe te nakon svakog updatea izvozi
+model_params.npy. Ostali workeri (followeri) salju feedback learneru preko
+lokalnog socketa i periodicki preuzimaju nove parametre iz model_params.npy.
+Ako learner nestane, followeri pokusavaju preuzeti lock.
+"""
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from multiprocessing.connection import Client, Listener
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+def acquire_lock(path):
+    """Pokusaj (bez cekanja) uzeti ekskluzivni lock; vraca otvorenu datoteku ili None."""
+    if fcntl is None:
+        # na Windowsu nema vise workera s dijeljenim stanjem - svaki proces je learner
+        return open(path, "a")
+    f = open(path, "a")
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return None
+    return f
+
+
+def lock_is_free(path):
+    """Provjeri (bez cekanja) drzi li itko lock - npr. je li learner proces ziv."""
+    f = acquire_lock(path)
+    if f is None:
+        return False
+    f.close()
+    return True
+
+
+def parse_address(value, default_path):
+    """'host:port' -> (host, port); prazno -> unix socket u model_output (ili TCP na Windowsu)."""
+    if value:
+        host, _, port = value.rpartition(":")
+        return (host or "127.0.0.1", int(port))
+    if sys.platform == "win32":
+        return ("127.0.0.1", 8765)
+    return str(default_path)
+
+
+class LearnerServer:
+    """Prima feedback primjere od ostalih workera i predaje ih on_sample callbacku."""
+
+    def __init__(self, address, authkey: bytes, on_sample):
+        self.address = address
+        self.authkey = authkey
+        self.on_sample = on_sample
+        self._listener = None
+
+        # metrike
+        self.connections = 0
+        self.received = 0
+        self.errors = 0
+
+    def start(self):
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            # ostatak od learnera koji je pao - lock drzimo mi pa je sigurno obrisati
+            os.unlink(self.address)
+        self._listener = Listener(self.address, authkey=self.authkey)
+        threading.Thread(target=self._accept, name="learner-server", daemon=True).start()
+
+    def stop(self):
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+
+    def _accept(self):
+        while self._listener is not None:
+            try:
+                conn = self._listener.accept()
+            except Exception:
+                if self._listener is None:
+                    return
+                continue
+            self.connections += 1
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        with conn:
+            while True:
+                try:
+                    data = conn.recv_bytes()
+                except (EOFError, OSError):
+                    return
+                self.received += 1
+                # los primjer (neispravan JSON, greska u on_sample) se odbaci,
+                # veza ostaje otvorena za sljedece
+                try:
+                    self.on_sample(json.loads(data))
+                except Exception as e:
+                    self.errors += 1
+                    print(f"Learner server: dropping sample: {str(e)}")
+
+    def stats(self):
+        return {"connections": self.connections, "received": self.received, "errors": self.errors}
+
+
+class LearnerClient:
+    """
+    Salje feedback primjere learneru. Ako learner nije dostupan, primjeri se
+    cuvaju u ogranicenom bufferu i salju kod sljedeceg uspjesnog spajanja.
+    """
+
+    def __init__(self, address, authkey: bytes, buffer_size: int = 10000):
+        self.address = address
+        self.authkey = authkey
+        self._conn = None
+        self._buffer = deque(maxlen=buffer_size)
+        self._lock = threading.Lock()
+
+        # metrike
+        self.sent = 0
+        self.dropped = 0
+
+    def send(self, values):
+        with self._lock:
+            if len(self._buffer) == self._buffer.maxlen:
+                self.dropped += 1
+            self._buffer.append(values)
+            self._flush()
+
+    def drain(self):
+        """Vrati i isprazni buffer (kad ovaj worker sam postane learner)."""
+        with self._lock:
+            pending = list(self._buffer)
+            self._buffer.clear()
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            return pending
+
+    def _flush(self):
+        try:
+            if self._conn is None:
+                self._conn = Client(self.address, authkey=self.authkey)
+            while self._buffer:
+                self._conn.send_bytes(json.dumps(self._buffer[0]).encode())
+                self._buffer.popleft()
+                self.sent += 1
+        except Exception:
+            if self._conn is not None:
+                self._conn.close()
+            self._conn = None
+
+    def stats(self):
+        return {"sent": self.sent, "buffered": len(self._buffer), "dropped": self.dropped}
+
+
+class LearnerRole:
+    """
+    Odlucuje je li ovaj proces learner. Follower u pozadini pokusava preuzeti
+    lock svakih retry_s sekundi; kad uspije poziva on_promote().
+    """
+
+    def __init__(self, lock_path, retry_s: float = 5.0):
+        self.lock_path = lock_path
+        self.retry_s = retry_s
+        self._lock_file = None
+        self.on_promote = None
+
+    @property
+    def is_learner(self):
+        return self._lock_file is not None
+
+    def try_acquire(self):
+        if self._lock_file is None:
+            self._lock_file = acquire_lock(self.lock_path)
+        return self.is_learner
+
+    def watch(self):
+        threading.Thread(target=self._watch, name="learner-watch", daemon=True).start()
+
+    def _watch(self):
+        while not self.try_acquire():
+            time.sleep(self.retry_s)
+        if self.on_promote is not None:
+            self.on_promote()
+
+    def release(self):
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+
+class LearnerSupervisor:
+    """
+    Pokrece zaseban learner proces (`python -m app.learner`) i pokrece novi
+    ako learner nestane. Vise workera moze istovremeno pokrenuti proces -
+    samo jedan dobije lock, ostali izlaze nakon kratkog cekanja na lock
+    (--lock_wait, jer ga _check drugih workera nakratko uzima).
+    """
+
+    def __init__(self, lock_path, command, cwd, retry_s: float = 5.0):
+        self.lock_path = lock_path
+        self.command = command
+        self.cwd = cwd
+        self.retry_s = retry_s
+        self._proc = None
+        self._stopped = threading.Event()
+
+        # metrike
+        self.spawned = 0
+
+    def start(self):
+        self._check()
+        threading.Thread(target=self._watch, name="learner-supervisor", daemon=True).start()
+
+    def stop(self, timeout: float = 10.0):
+        """Ugasi learner proces koji je pokrenuo ovaj worker (on sam sprema stanje)."""
+        self._stopped.set()
+        if self._proc is not None and self._proc.poll() is None:
+            self._proc.terminate()
+            try:
+                self._proc.wait(timeout)
+            except subprocess.TimeoutExpired:
+                self._proc.kill()
+
+    def _watch(self):
+        while not self._stopped.wait(self.retry_s):
+            self._check()
+
+    def _check(self):
+        if self._proc is not None and self._proc.poll() is None:
+            return
+        if not lock_is_free(self.lock_path):
+            return
+        self._proc = subprocess.Popen(
+            [*self.command, "--parent", str(os.getpid())], cwd=self.cwd
+        )
+        self.spawned += 1
+
+    def stats(self):
+        running = self._proc is not None and self._proc.poll() is None
+        return {
+            "spawned": self.spawned,
+            "child_pid": self._proc.pid if running else None,
+        }
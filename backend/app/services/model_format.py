@@ -0,0 +1,196 @@
+"""
+Kompaktni format parametara modela (model_params.npy).
+
+Jedan strukturirani .npy zapis s parametrima StandardScaler + SGDClassifier:
+srednje vrijednosti i skale znacajki, transponirani koeficijenti (spremni za
+X @ coef_t), intercepti i klase. Cita se s mmap_mode="r" pa svi procesi koji
+ga ucitaju dijele istu kopiju u page cacheu, bez picklea i bez scikit-learna.
+
+Uz njega model_base.json pamti koji model iz train_model.py (fingerprint
+model.pkl + scaler.pkl) je pocetak online ucenja i s kojom verzijom krece.
+
+Modul nema side effecta pri importu (za razliku od model_state) pa ga mogu
+koristiti i offline skripte u model/.
+"""
+import hashlib
+import json
+from pathlib import Path
+
+import numpy as np
+
+from app.services.checkpoint import atomic_write, list_checkpoints
+from app.services.feedback_log import FeedbackLog
+
+FORMAT_VERSION = 1
+
+PARAMS_FILE = "model_params.npy"
+BASE_FILE = "model_base.json"
+CHECKPOINT_SUBDIR = "checkpoints"
+FEEDBACK_LOG_SUBDIR = "feedback_log"
+
+
+class ModelSnapshot:
+    """
+    Nepromjenjiva kopija parametara StandardScaler + SGDClassifier(loss='log_loss').
+
+    Learner (feedback_function) mijenja sklearn objekte pod lock-om i nakon
+    svakog updatea objavi novi snapshot jednim pridruzivanjem reference, pa
+    citatelji nikad ne cekaju lock niti vide napola azuriran model.
+
+    Predikcija je cisti NumPy (bez sklearn validacije i pandasa) i daje iste
+    vjerojatnosti kao predict_proba (one-vs-rest sigmoid + normalizacija po retku).
+    """
+
+    __slots__ = ("version", "mean", "scale", "coef_t", "intercept", "classes")
+
+    def __init__(self, version: int, mean, scale, coef_t, intercept, classes):
+        self.version = version
+        self.mean = mean
+        self.scale = scale
+        # (n_features, n_classes) da je X @ coef_t direktno (N, n_classes)
+        self.coef_t = coef_t
+        self.intercept = intercept
+        self.classes = classes
+
+    @classmethod
+    def from_sklearn(cls, scaler, model, version: int):
+        classes = np.array(model.classes_)
+        classes.setflags(write=False)
+        return cls(
+            version,
+            _frozen(scaler.mean_),
+            _frozen(scaler.scale_),
+            _frozen(model.coef_.T),
+            _frozen(model.intercept_),
+            classes,
+        )
+
+    @classmethod
+    def from_params(cls, params):
+        """Iz load_params() - polja su read-only (mmap) pogledi, bez kopiranja."""
+        return cls(
+            params["version"],
+            params["mean"],
+            params["scale"],
+            params["coef_t"],
+            params["intercept"],
+            params["classes"],
+        )
+
+    def predict(self, X: np.ndarray):
+        scores = ((X - self.mean) / self.scale) @ self.coef_t + self.intercept
+
+        labels = self.classes[np.argmax(scores, axis=1)]
+
+        proba = 1.0 / (1.0 + np.exp(-scores))
+        proba /= proba.sum(axis=1, keepdims=True)
+
+        return labels, proba
+
+
+def _frozen(arr):
+    out = np.array(arr, dtype=np.float64, order="C")
+    out.setflags(write=False)
+    return out
+
+
+def params_dtype(n_features: int, n_classes: int):
+    # sva polja su 8-bajtna pa su poravnata i nakon .npy headera (64 B)
+    return np.dtype([
+        ("format_version", "<i8"),
+        ("version", "<i8"),
+        ("mean", "<f8", (n_features,)),
+        ("scale", "<f8", (n_features,)),
+        ("coef_t", "<f8", (n_features, n_classes)),
+        ("intercept", "<f8", (n_classes,)),
+        ("classes", "<i8", (n_classes,)),
+    ])
+
+
+def save_params(path, version, mean, scale, coef, intercept, classes, fsync: bool = True):
+    """Atomarno zapisi parametre; coef je u sklearn obliku (n_classes, n_features)."""
+    coef = np.asarray(coef, dtype=np.float64)
+    n_classes, n_features = coef.shape
+
+    rec = np.zeros((), dtype=params_dtype(n_features, n_classes))
+    rec["format_version"] = FORMAT_VERSION
+    rec["version"] = version
+    rec["mean"] = mean
+    rec["scale"] = scale
+    rec["coef_t"] = coef.T
+    rec["intercept"] = intercept
+    rec["classes"] = classes
+
+    atomic_write(path, lambda f: np.save(f, rec, allow_pickle=False), fsync=fsync)
+
+
+def load_params(path, mmap: bool = True):
+    """
+    Ucitaj parametre kao dict read-only polja (uz mmap su to pogledi na datoteku).
+    Baca ValueError ako je format nepoznat.
+    """
+    rec = np.load(path, mmap_mode="r" if mmap else None, allow_pickle=False)
+
+    if rec.dtype.names is None or "format_version" not in rec.dtype.names:
+        raise ValueError(f"{path} is not a model params file")
+    if int(rec["format_version"]) != FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported model params format {int(rec['format_version'])} (expected {FORMAT_VERSION})"
+        )
+
+    # np.asarray daje obican ndarray pogled na istu (mmap) memoriju, bez memmap overheada
+    params = {
+        name: np.asarray(rec[name])
+        for name in ("mean", "scale", "coef_t", "intercept", "classes")
+    }
+    for arr in params.values():
+        arr.setflags(write=False)
+    params["version"] = int(rec["version"])
+    return params
+
+
+def artifact_fingerprint(model_path, scaler_path):
+    """Skraceni sha256 sadrzaja model.pkl + scaler.pkl (identitet treniranog modela)."""
+    h = hashlib.sha256()
+    for path in (model_path, scaler_path):
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+    return h.hexdigest()[:16]
+
+
+def read_base(path):
+    """Sadrzaj model_base.json ({"version", "fingerprint"}) ili None ako ga nema."""
+    try:
+        with open(path, "rb") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except ValueError as e:
+        print(f"Ignoring {Path(path).name}: {str(e)}")
+        return None
+
+
+def write_base(path, version, fingerprint):
+    data = json.dumps({"version": int(version), "fingerprint": fingerprint}).encode()
+    atomic_write(path, lambda f: f.write(data))
+
+
+def next_version(model_dir):
+    """
+    Verzija veca od svih koje su vec koristene u model_dir (model_params.npy,
+    model_base.json, checkpointi, segmenti feedback loga). Novi model iz
+    train_model.py krece od nje pa ga workeri preuzmu (refresh_snapshot
+    prihvaca samo vece verzije), a stari checkpointi i log ga ne mogu pregaziti.
+    """
+    model_dir = Path(model_dir)
+    versions = [v for v, _ in list_checkpoints(model_dir / CHECKPOINT_SUBDIR)]
+    versions += [v for v, _ in FeedbackLog(model_dir / FEEDBACK_LOG_SUBDIR).list_segments()]
+    try:
+        versions.append(load_params(model_dir / PARAMS_FILE, mmap=False)["version"])
+    except (OSError, ValueError):
+        pass
+    base = read_base(model_dir / BASE_FILE)
+    if base is not None:
+        versions.append(int(base["version"]))
+    return max(versions, default=-1) + 1
@@ -1,23 +1,204 @@
+import copy
+import os
+import sys
+import time
 import joblib
 from pathlib import Path
 from threading import Lock
 
-MODEL_PATH = Path(__file__).resolve().parents[2] / "model" / "model_output" / "model.pkl"
-SCALER_PATH = Path(__file__).resolve().parents[2] / "model" / "model_output" / "scaler.pkl"
+from app.config import settings
+from app.services.checkpoint import CheckpointWriter, list_checkpoints
+from app.services.model_format import (
+    BASE_FILE,
+    CHECKPOINT_SUBDIR,
+    FEEDBACK_LOG_SUBDIR,
+    PARAMS_FILE,
+    ModelSnapshot,
+    artifact_fingerprint,
+    load_params,
+    next_version,
+    read_base,
+    save_params,
+    write_base,
+)
 
-model = joblib.load(MODEL_PATH)
-scaler = joblib.load(SCALER_PATH)
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+MODEL_DIR = Path(settings.MODEL_DIR) if settings.MODEL_DIR else BACKEND_DIR / "model" / "model_output"
+MODEL_PATH = MODEL_DIR / "model.pkl"
+SCALER_PATH = MODEL_DIR / "scaler.pkl"
+MODEL_PARAMS_PATH = MODEL_DIR / PARAMS_FILE
+BASE_PATH = MODEL_DIR / BASE_FILE
+CHECKPOINT_DIR = MODEL_DIR / CHECKPOINT_SUBDIR
+FEEDBACK_LOG_DIR = MODEL_DIR / FEEDBACK_LOG_SUBDIR
+
+
+def _load_base():
+    """
+    (fingerprint, version) pocetnog modela iz train_model.py. Verzija je iz
+    model_base.json ako odgovara model.pkl/scaler.pkl; ako su zamijenjeni bez
+    save_model, model dobiva novu verziju iznad svih dosadasnjih.
+    """
+    fingerprint = artifact_fingerprint(MODEL_PATH, SCALER_PATH)
+    base = read_base(BASE_PATH)
+    if base is not None and base.get("fingerprint") == fingerprint:
+        return fingerprint, int(base["version"])
+
+    # bez model_base.json (model_output prije fingerprinta) ostaje verzija 0
+    version = 0 if base is None else next_version(MODEL_DIR)
+    write_base(BASE_PATH, version, fingerprint)
+    return fingerprint, version
+
+
+def _load_latest():
+    """
+    Najnoviji ispravan checkpoint trenutnog modela iz train_model.py, a ako ga
+    nema sam taj model. Checkpointi uceni na drugom (starijem) modelu se
+    preskacu pa ih retrain u isti model_output zamjenjuje; s vremenom ih
+    CheckpointWriter izbaci (keep), a feedback log s njima.
+    """
+    fingerprint, base_version = _load_base()
+    for version, path in reversed(list_checkpoints(CHECKPOINT_DIR)):
+        if version < base_version:
+            break
+        try:
+            payload = joblib.load(path)
+        except Exception as e:
+            print(f"Skipping unreadable checkpoint {path.name}: {str(e)}")
+            continue
+        if payload.get("base", fingerprint) != fingerprint:
+            print(f"Skipping checkpoint {path.name} of a different base model")
+            continue
+        return payload["model"], payload["scaler"], version, fingerprint
+    return joblib.load(MODEL_PATH), joblib.load(SCALER_PATH), base_version, fingerprint
+
+
+# na Windowsu se datoteka koja je mmapirana ne moze zamijeniti (os.replace)
+_MMAP_PARAMS = sys.platform != "win32"
+
+
+def _load_params_snapshot():
+    """Snapshot iz model_params.npy, ili None ako ga nema / nije ispravan."""
+    try:
+        return ModelSnapshot.from_params(load_params(MODEL_PARAMS_PATH, mmap=_MMAP_PARAMS))
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Ignoring {MODEL_PARAMS_PATH.name}: {str(e)}")
+        return None
+
+
+# sklearn model i scaler trebaju samo za ucenje pa se ucitavaju tek kad zatrebaju
+# (vidi load_learner), predikcija radi iskljucivo sa snapshotom
+model = None
+scaler = None
+# fingerprint modela iz train_model.py na kojem se uci (sprema se u checkpointe)
+base_fingerprint = None
 
 lock = Lock()
 
-UPDATE_EVERY = 10
-_update_count = 0
+# True u procesu koji uci model (postavlja ml_feedback.become_learner)
+is_learner = False
 
 
-def maybe_persist():
-    global _update_count
-    _update_count += 1
+def load_learner():
+    """
+    Vrati (model, scaler) za ucenje, ucitane iz najnovijeg checkpointa.
+    Pozivati pod lock-om.
+    """
+    global model, scaler, snapshot, base_fingerprint
+    if model is None:
+        model, scaler, version, base_fingerprint = _load_latest()
+        if snapshot is None or snapshot.version != version:
+            snapshot = ModelSnapshot.from_sklearn(scaler, model, version)
+    return model, scaler
+
+
+snapshot = _load_params_snapshot()
+if snapshot is None:
+    load_learner()
+
+
+def publish_snapshot():
+    """
+    Objavi novi snapshot nakon promjene modela/scalera (pozivati unutar lock-a).
+    Parametri se izvoze i u model_params.npy da ih preuzmu ostali workeri.
+    """
+    global snapshot
+    snapshot = ModelSnapshot.from_sklearn(scaler, model, version=snapshot.version + 1)
+    save_params(
+        MODEL_PARAMS_PATH,
+        snapshot.version,
+        snapshot.mean,
+        snapshot.scale,
+        snapshot.coef_t.T,
+        snapshot.intercept,
+        snapshot.classes,
+        fsync=False,
+    )
 
-    if _update_count % UPDATE_EVERY == 0:
-        joblib.dump(model, MODEL_PATH)
-        joblib.dump(scaler, SCALER_PATH)
+
+_params_checked = 0.0
+_params_stat = None
+
+
+def refresh_snapshot():
+    """
+    Worker koji ne uci sam preuzima novije parametre iz model_params.npy.
+    Datoteka se provjerava najvise jednom u MODEL_REFRESH_MS pa je to i
+    najveca zastarjelost modela u odnosu na learnera.
+    """
+    global snapshot, _params_checked, _params_stat
+    if is_learner:
+        # ovaj proces uci - njegov snapshot je uvijek najnoviji
+        return
+
+    now = time.monotonic()
+    if now - _params_checked < settings.MODEL_REFRESH_MS / 1000.0:
+        return
+    _params_checked = now
+
+    try:
+        st = os.stat(MODEL_PARAMS_PATH)
+    except OSError:
+        return
+    key = (st.st_ino, st.st_mtime_ns, st.st_size)
+    if key == _params_stat:
+        return
+    _params_stat = key
+
+    snap = _load_params_snapshot()
+    if snap is not None and snap.version > snapshot.version:
+        snapshot = snap
+
+
+# pozivaju se pod lock-om u trenutku checkpointa s verzijom koja se sprema
+# (feedback log tu zapocinje novi segment)
+capture_hooks = []
+
+
+def _capture():
+    # kopija pod lock-om je jeftina (nekoliko malih polja), serijalizacija ide izvan lock-a
+    with lock:
+        load_learner()
+        for hook in capture_hooks:
+            hook(snapshot.version)
+        return snapshot.version, {
+            "model": copy.deepcopy(model),
+            "scaler": copy.deepcopy(scaler),
+            "version": snapshot.version,
+            "base": base_fingerprint,
+        }
+
+
+checkpoints = CheckpointWriter(
+    CHECKPOINT_DIR,
+    _capture,
+    keep=settings.CHECKPOINT_KEEP,
+    every_updates=settings.CHECKPOINT_EVERY_UPDATES,
+    interval_s=settings.CHECKPOINT_INTERVAL_S,
+)
+
+
+def maybe_persist():
+    # samo signal pozadinskom writeru, ne blokira learner
+    checkpoints.notify_update()
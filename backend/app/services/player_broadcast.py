@@ -0,0 +1,91 @@
+import asyncio
+
+from app.config import settings
+
+
+class _Room:
+    __slots__ = ("dirty", "task", "triggers")
+
+    def __init__(self):
+        self.dirty = False
+        self.task: asyncio.Task | None = None
+        self.triggers = 0
+
+
+class PlayerBroadcaster:
+    """
+    Spaja updatePlayers broadcaste po sobi (igri).
+
+    Join, disconnect i finish_round samo oznace sobu kao dirty (mark_dirty).
+    Prvi trigger se salje odmah, a svi triggeri koji stignu unutar intervala
+    nakon toga (ili dok se roster racuna) spoje se u jedan emit na kraju
+    intervala. Tako soba dobiva najvise jedan updatePlayers po intervalu, a
+    zadnje stanje uvijek stigne. Kad 30 ucenika zavrsi rundu unutar sekunde,
+    to su 2 racunanja rostera umjesto 30.
+    """
+
+    def __init__(self, interval_ms: float = 500.0):
+        self.interval = interval_ms / 1000.0
+        self._emit = None
+        self._rooms: dict[str, _Room] = {}
+
+        # metrike
+        self.triggers = 0
+        self.emits = 0
+        self.errors = 0
+        self.max_coalesced = 0
+        self.total_emit_time = 0.0
+
+    def bind(self, emit):
+        """emit(room) - coroutine koja izracuna i posalje roster sobe."""
+        self._emit = emit
+
+    def mark_dirty(self, room):
+        room = str(room)
+        self.triggers += 1
+        state = self._rooms.get(room)
+        if state is None:
+            state = self._rooms[room] = _Room()
+        state.dirty = True
+        state.triggers += 1
+        if state.task is None:
+            state.task = asyncio.get_running_loop().create_task(self._run(room, state))
+
+    async def _run(self, room, state):
+        loop = asyncio.get_running_loop()
+        try:
+            while state.dirty:
+                state.dirty = False
+                self.max_coalesced = max(self.max_coalesced, state.triggers)
+                state.triggers = 0
+
+                t0 = loop.time()
+                try:
+                    await self._emit(room)
+                    self.emits += 1
+                except Exception as e:
+                    self.errors += 1
+                    print(f"updatePlayers error ({room}): {str(e)}")
+                self.total_emit_time += loop.time() - t0
+
+                # triggeri do kraja intervala cekaju sljedeci emit
+                await asyncio.sleep(max(self.interval - (loop.time() - t0), 0.0))
+        finally:
+            state.task = None
+            if not state.dirty:
+                self._rooms.pop(room, None)
+
+    def stats(self):
+        return {
+            "triggers": self.triggers,
+            "emits": self.emits,
+            "saved": self.triggers - self.emits - self.errors - sum(s.triggers for s in self._rooms.values()),
+            "errors": self.errors,
+            "max_coalesced": self.max_coalesced,
+            "active_rooms": len(self._rooms),
+            "avg_emit_ms": 1000.0 * self.total_emit_time / (self.emits + self.errors) if self.emits + self.errors else 0.0,
+            "config": {"interval_ms": 1000.0 * self.interval},
+        }
+
+
+player_broadcaster = PlayerBroadcaster(settings.PLAYERS_BROADCAST_INTERVAL_MS)
@@ -0,0 +1,106 @@
+import asyncio
+import time
+
+import numpy as np
+
+from app.config import settings
+from app.routers.ml_predict import predict_batch_function, to_responses
+
+
+class PredictionBatcher:
+    """
+    Skuplja zahtjeve za predikciju iz istovremenih finalize_round poziva i
+    izvrsava ih kao jedan vektorizirani poziv modela.
+    Batch se salje kad se skupi max_batch_size zahtjeva ili prode max_wait_ms
+    od prvog zahtjeva u batchu.
+    """
+
+    def __init__(self, max_batch_size: int = 64, max_wait_ms: float = 5.0):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue: asyncio.Queue | None = None
+        self._worker: asyncio.Task | None = None
+
+        # metrike
+        self.batches = 0
+        self.items = 0
+        self.max_batch_seen = 0
+        self.total_wait = 0.0
+        self.max_wait_seen = 0.0
+
+    async def predict(self, data):
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait(
+            ([data.accuracy, data.avg_time, data.hints_used], future, time.perf_counter())
+        )
+        return await future
+
+    def _ensure_worker(self):
+        # queue i task vezemo uz loop koji se trenutno vrti (uvicorn ga kreira nakon importa)
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            self._execute(batch)
+
+    def _execute(self, batch):
+        now = time.perf_counter()
+        X = np.array([row for row, _, _ in batch], dtype=np.float64)
+
+        try:
+            labels, proba, snapshot = predict_batch_function(X)
+            results = to_responses(labels, proba, snapshot)
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future, enqueued_at), result in zip(batch, results):
+            waited = now - enqueued_at
+            self.total_wait += waited
+            self.max_wait_seen = max(self.max_wait_seen, waited)
+            if not future.done():
+                future.set_result(result)
+
+        self.batches += 1
+        self.items += len(batch)
+        self.max_batch_seen = max(self.max_batch_seen, len(batch))
+
+    def stats(self):
+        return {
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+            "max_batch_size": self.max_batch_seen,
+            "avg_wait_ms": 1000.0 * self.total_wait / self.items if self.items else 0.0,
+            "max_wait_ms": 1000.0 * self.max_wait_seen,
+            "config": {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": 1000.0 * self.max_wait,
+            },
+        }
+
+
+prediction_batcher = PredictionBatcher(
+    max_batch_size=settings.PREDICT_BATCH_MAX_SIZE,
+    max_wait_ms=settings.PREDICT_BATCH_MAX_WAIT_MS,
+)
@@ -0,0 +1,97 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+class PredictionCache:
+    """
+    LRU/TTL cache predikcija po znacajkama i verziji modela.
+
+    Kljuc su znacajke retka; s acc_step / time_step > 0 accuracy i avg_time se
+    za kljuc zaokruzuju na taj korak pa bliski retci dijele predikciju (opt-in,
+    mijenja posluzene preporuke). Sama predikcija se uvijek racuna na tocnim
+    znacajkama. Svaki zapis pamti verziju snapshota koji ga je izracunao i
+    vrijedi samo za nju; zapisi drugih verzija se ne brisu odjednom nego ih
+    zamijene novi ili ispadnu po LRU/TTL.
+
+    Bez kvantizacije je cache iskljucen: kljucevi bi bili tocni floatovi
+    accuracy/avg_time koji se prakticki nikad ne ponove, a lookup po retku pod
+    lockom je skuplji od same NumPy predikcije.
+    """
+
+    def __init__(self, maxsize: int = 4096, ttl_s: float = 300.0,
+                 acc_step: float = 0.0, time_step: float = 0.0):
+        self.maxsize = maxsize
+        self.ttl_s = ttl_s
+        steps = np.array([acc_step, time_step, 0.0])
+        # korak 0 = kljuc je tocna vrijednost (hints_used je ionako cijeli broj)
+        self._quantized = steps > 0
+        self._steps = np.where(self._quantized, steps, 1.0)
+
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+        # metrike
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self):
+        return self.maxsize > 0 and bool(self._quantized.any())
+
+    def keys(self, X: np.ndarray):
+        """Kljucevi cachea za retke X (kvantizirani samo za stupce s korakom > 0)."""
+        return np.where(self._quantized, np.rint(X / self._steps), X)
+
+    def lookup(self, keys, version: int):
+        """Vraca listu (label, proba_row) ili None za svaki kljuc."""
+        now = time.monotonic()
+        out = []
+        with self._lock:
+            for key in map(tuple, keys.tolist()):
+                entry = self._data.get(key)
+                if entry is not None and entry[1] == version and now - entry[0] <= self.ttl_s:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    out.append(entry[2])
+                else:
+                    if entry is not None and entry[1] != version:
+                        self.stale += 1
+                    self.misses += 1
+                    out.append(None)
+        return out
+
+    def store(self, keys, labels, proba, version: int):
+        now = time.monotonic()
+        with self._lock:
+            for key, label, row in zip(map(tuple, keys.tolist()), labels, proba):
+                entry = self._data.get(key)
+                if entry is not None and entry[1] > version:
+                    # u medjuvremenu je noviji model vec spremio svoju predikciju
+                    continue
+                self._data[key] = (now, version, (label, row))
+                self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            # promasaji jer je zapis izracunao drugi snapshot modela
+            "stale": self.stale,
+            "evictions": self.evictions,
+            "config": {
+                "quantized": bool(self._quantized.any()),
+                "ttl_s": self.ttl_s,
+            },
+        }
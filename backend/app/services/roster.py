@@ -0,0 +1,129 @@
+class _RosterState:
+    __slots__ = ("seq", "players", "entries")
+
+    def __init__(self):
+        self.seq = 0
+        self.players: list[str] = []
+        # user_id -> playersDetailed entry (s rankom)
+        self.entries: dict[str, dict] = {}
+
+
+class RosterTracker:
+    """
+    Verzionirani roster po sobi za playersDelta protokol.
+
+    Klijent koji posalje rosterSubscribe dobiva puni playersSnapshot (seq, players,
+    playersDetailed), a nakon toga samo playersDelta:
+        {"game_id", "seq", "changed": [entry, ...], "removed": [user_id, ...],
+         "ranks": {user_id: rank}}
+    changed sadrzi cijele entryje igraca kojima se promijenilo nesto osim ranka,
+    a ranks samo igrace kojima se promijenio samo rank. seq raste za 1 po deltai;
+    klijent ignorira seq <= svoj, a na rupu (seq > svoj + 1) trazi rosterResync.
+
+    Stari klijenti (bez rosterSubscribe) i dalje dobivaju cijeli updatePlayers.
+    Stanje je po procesu, kao i socket sobe.
+    """
+
+    def __init__(self):
+        self._rooms: dict[str, _RosterState] = {}
+        self._subscribers: dict[str, set[str]] = {}
+        self._sid_room: dict[str, str] = {}
+
+        # metrike
+        self.updates = 0
+        self.unchanged = 0
+        self.deltas = 0
+        self.snapshots = 0
+        self.entries_total = 0
+        self.entries_sent = 0
+        self.rank_only = 0
+
+    def subscribe(self, room, sid):
+        room = str(room)
+        self.unsubscribe(sid)
+        self._subscribers.setdefault(room, set()).add(sid)
+        self._sid_room[sid] = room
+
+    def unsubscribe(self, sid):
+        room = self._sid_room.pop(sid, None)
+        if room is None:
+            return
+        subs = self._subscribers.get(room)
+        if subs is not None:
+            subs.discard(sid)
+            if not subs:
+                del self._subscribers[room]
+
+    def subscribers(self, room):
+        return list(self._subscribers.get(str(room), ()))
+
+    def has_state(self, room):
+        return str(room) in self._rooms
+
+    def snapshot(self, room):
+        state = self._rooms.get(str(room))
+        if state is None:
+            return None
+        self.snapshots += 1
+        return {
+            "game_id": str(room),
+            "seq": state.seq,
+            "players": list(state.players),
+            "playersDetailed": list(state.entries.values()),
+        }
+
+    def update(self, room, players, players_detailed):
+        """Spremi novi roster sobe; vraca playersDelta ili None ako se nista nije promijenilo."""
+        room = str(room)
+        state = self._rooms.get(room)
+        if state is None:
+            state = self._rooms[room] = _RosterState()
+        self.updates += 1
+
+        entries = {p["user_id"]: p for p in players_detailed}
+        changed, ranks = [], {}
+        for user_id, entry in entries.items():
+            old = state.entries.get(user_id)
+            if old == entry:
+                continue
+            if old is not None and old["rank"] != entry["rank"] and {**old, "rank": entry["rank"]} == entry:
+                ranks[user_id] = entry["rank"]
+            else:
+                changed.append(entry)
+        removed = [user_id for user_id in state.entries if user_id not in entries]
+
+        state.players = list(players)
+        state.entries = entries
+        if not (changed or removed or ranks):
+            self.unchanged += 1
+            return None
+
+        state.seq += 1
+        self.deltas += 1
+        self.entries_total += len(entries)
+        self.entries_sent += len(changed)
+        self.rank_only += len(ranks)
+        return {"game_id": room, "seq": state.seq, "changed": changed, "removed": removed, "ranks": ranks}
+
+    def forget(self, room):
+        """Zavrsena igra: makni roster i pretplatnike sobe."""
+        room = str(room)
+        self._rooms.pop(room, None)
+        for sid in self._subscribers.pop(room, ()):
+            self._sid_room.pop(sid, None)
+
+    def stats(self):
+        return {
+            "rooms": len(self._rooms),
+            "subscribers": len(self._sid_room),
+            "updates": self.updates,
+            "unchanged": self.unchanged,
+            "deltas": self.deltas,
+            "snapshots": self.snapshots,
+            # udio entryja koji su poslani u deltama u odnosu na pune rostere
+            "entries_sent_ratio": self.entries_sent / self.entries_total if self.entries_total else None,
+            "rank_only": self.rank_only,
+        }
+
+
+roster_tracker = RosterTracker()
@@ -0,0 +1,232 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+from app.config import settings
+from app.services import model_state
+from app.services.model_format import ModelSnapshot, load_params
+
+
+class ShadowEvaluator:
+    """
+    Shadow model: kandidat (npr. iz retrain_from_db.py) dobiva iste runde kao
+    live model, ali njegove predikcije ne utjecu na preporuke.
+
+    finalize_round samo ubaci rundu u ograniceni red (submit) i nastavlja;
+    pozadinski task skuplja batcheve i ocjenjuje ih u threadu, pa kriticni put
+    ne ceka ni model ni pisanje loga. Kad je red pun, evaluacija se odbacuje
+    (dropped) umjesto da usporava igru.
+
+    Kad derive_true_label labelira prethodnu rundu (record_outcome), broji se
+    tocnost oba modela na istom primjeru. Obje predikcije s verzijama i ishodi
+    se zapisuju u JSON-lines log. Brojaci su po procesu (workeru).
+    """
+
+    def __init__(self, model_path: str = "", queue_size: int = 1024,
+                 max_batch_size: int = 256, max_wait_ms: float = 50.0,
+                 pending_max: int = 10000, log_path=None):
+        self.model_path = model_path
+        self.queue_size = queue_size
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.pending_max = pending_max
+        self.log_path = Path(log_path) if log_path else None
+
+        self.snapshot: ModelSnapshot | None = None
+        self.error: str | None = None
+        if model_path:
+            self.load(model_path)
+
+        self._queue: asyncio.Queue | None = None
+        self._worker: asyncio.Task | None = None
+        self._log = None
+
+        # runda -> (live labela, live verzija, shadow labela), ceka labelu iz sljedece runde
+        self._pending = OrderedDict()
+
+        # metrike
+        self.submitted = 0
+        self.scored = 0
+        self.batches = 0
+        self.dropped = 0
+        self.dropped_outcomes = 0
+        self.evicted = 0
+        self.outcomes = 0
+        self.outcomes_unmatched = 0
+        self.live_correct = 0
+        self.shadow_correct = 0
+        self.agree = 0
+        self.total_score_time = 0.0
+
+    @property
+    def enabled(self):
+        return self.snapshot is not None
+
+    def load(self, path):
+        """Ucitaj kandidata iz model_params.npy (ili direktorija koji ga sadrzi)."""
+        path = Path(path)
+        if path.is_dir():
+            path = path / "model_params.npy"
+        try:
+            self.snapshot = ModelSnapshot.from_params(load_params(path, mmap=False))
+            self.error = None
+        except Exception as e:
+            self.snapshot = None
+            self.error = str(e)
+            print(f"Shadow model disabled: {str(e)}")
+
+    def submit(self, round_id, accuracy, avg_time, hints_used, live_label, live_version):
+        """Ne blokira; vraca False ako je evaluacija odbacena."""
+        if not self.enabled:
+            return False
+        self.submitted += 1
+        row = [float(accuracy), float(avg_time), float(hints_used)]
+        if not self._put(("p", str(round_id), row, int(live_label), int(live_version))):
+            self.dropped += 1
+            return False
+        return True
+
+    def record_outcome(self, round_id, true_label):
+        """Pozvati kad derive_true_label labelira preporuku runde round_id."""
+        if not self.enabled:
+            return False
+        if not self._put(("o", str(round_id), int(true_label))):
+            self.dropped_outcomes += 1
+            return False
+        return True
+
+    def _put(self, item):
+        try:
+            self._ensure_worker()
+            self._queue.put_nowait(item)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    def _ensure_worker(self):
+        # queue i task vezemo uz loop koji se trenutno vrti (kao PredictionBatcher)
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                # predikcija i pisanje loga izvan event loopa
+                await asyncio.to_thread(self._execute, batch)
+            except Exception as e:
+                print(f"Shadow evaluation error: {str(e)}")
+
+    def _execute(self, batch):
+        t0 = time.perf_counter()
+        records = []
+
+        # predikcije i ishodi se obraduju redom kojim su stigli
+        preds = [item for item in batch if item[0] == "p"]
+        if preds:
+            X = np.array([item[2] for item in preds], dtype=np.float64)
+            shadow_labels, _ = self.snapshot.predict(X)
+            shadow_version = self.snapshot.version
+        labels = iter(shadow_labels.tolist() if preds else [])
+
+        for item in batch:
+            if item[0] == "p":
+                _, round_id, row, live_label, live_version = item
+                shadow_label = next(labels)
+                self._pending[round_id] = (live_label, live_version, shadow_label)
+                if len(self._pending) > self.pending_max:
+                    self._pending.popitem(last=False)
+                    self.evicted += 1
+                records.append({
+                    "type": "prediction", "round_id": round_id, "features": row,
+                    "live": {"label": live_label, "version": live_version},
+                    "shadow": {"label": shadow_label, "version": shadow_version},
+                })
+            else:
+                _, round_id, true_label = item
+                entry = self._pending.pop(round_id, None)
+                if entry is None:
+                    self.outcomes_unmatched += 1
+                    continue
+                live_label, live_version, shadow_label = entry
+                self.outcomes += 1
+                self.live_correct += live_label == true_label
+                self.shadow_correct += shadow_label == true_label
+                self.agree += live_label == shadow_label
+                records.append({
+                    "type": "outcome", "round_id": round_id, "true_label": true_label,
+                    "live": {"label": live_label, "version": live_version},
+                    "shadow": {"label": shadow_label, "version": self.snapshot.version},
+                })
+
+        self.scored += len(preds)
+        self.batches += 1
+        self.total_score_time += time.perf_counter() - t0
+        self._write(records)
+
+    def _write(self, records):
+        if not self.log_path or not records:
+            return
+        if self._log is None:
+            self.log_path.parent.mkdir(parents=True, exist_ok=True)
+            self._log = open(self.log_path, "a", encoding="utf-8")
+        self._log.write("".join(json.dumps(r) + "\n" for r in records))
+        self._log.flush()
+
+    def close(self):
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "model_path": self.model_path,
+            "version": self.snapshot.version if self.snapshot else None,
+            "error": self.error,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "submitted": self.submitted,
+            "scored": self.scored,
+            "batches": self.batches,
+            "dropped": self.dropped,
+            "dropped_outcomes": self.dropped_outcomes,
+            "pending": len(self._pending),
+            "evicted": self.evicted,
+            "outcomes": self.outcomes,
+            "outcomes_unmatched": self.outcomes_unmatched,
+            "live_accuracy": self.live_correct / self.outcomes if self.outcomes else None,
+            "shadow_accuracy": self.shadow_correct / self.outcomes if self.outcomes else None,
+            "agreement": self.agree / self.outcomes if self.outcomes else None,
+            "avg_batch_ms": 1000.0 * self.total_score_time / self.batches if self.batches else 0.0,
+            "config": {
+                "queue_size": self.queue_size,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": 1000.0 * self.max_wait,
+            },
+        }
+
+
+shadow_evaluator = ShadowEvaluator(
+    settings.SHADOW_MODEL_PATH,
+    queue_size=settings.SHADOW_QUEUE_SIZE,
+    max_batch_size=settings.SHADOW_BATCH_MAX_SIZE,
+    max_wait_ms=settings.SHADOW_BATCH_MAX_WAIT_MS,
+    log_path=settings.SHADOW_LOG_PATH or model_state.MODEL_DIR / "shadow_log.jsonl",
+)
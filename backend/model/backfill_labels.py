@@ -0,0 +1,274 @@
+"""
+Backfill labela preporuka i replay evaluator nad cijelom povijesti rundi.
+
+derive_true_label (ml_feedback) se online primijeni samo kad ucenik zavrsi
+sljedecu rundu, pa preporuke iz napustenih igara ili propustenih updatea
+ostaju bez labele. Ova skripta ucita sve runde poredane po
+(user_id, game_id, round_index) u NumPy polja (po rundi jedna, zadnja
+preporuka), labele izracuna vektorski (pomak za jedan redak), a zatim ih
+zapise u bazu u batchevima.
+
+Na istim poljima se moze replayati bilo koji kandidat (model_params.npy ili
+direktorij koji ga sadrzi) i dobiti tocnost i slaganje s preporukama koje su
+stvarno poslane.
+
+    python backfill_labels.py --dry_run
+    python backfill_labels.py --candidate model_output --candidate candidates/<kandidat>
+    python backfill_labels.py --save_history history.npz        # spremi povijest za kasnije
+    python backfill_labels.py --history history.npz --candidate ...
+"""
+import argparse
+import json
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+from sqlalchemy import Float, bindparam, cast, create_engine, func, select
+
+# backend/ na path da se mogu koristiti modeli baze i format modela iz app/
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from app.config import settings  # noqa: E402
+from app.models import Recommendation, Round  # noqa: E402
+from app.services.model_format import ModelSnapshot, load_params  # noqa: E402
+
+from train_model import CLASSES, metrics_from_confusion  # noqa: E402
+
+# Recommendation.rec -> labela koju je model dao (vidi finalize_round)
+REC_LABELS = {"down": 0, "same": 1, "up": 2}
+
+# UUID-ovi kao 16-bajtni void (S16 bi odrezao zavrsne nul-bajtove); nil UUID = nema
+ID_DTYPE = np.dtype("V16")
+NO_ID = np.void(bytes(16))
+
+
+def history_query():
+    return (
+        select(
+            Round.user_id,
+            Round.game_id,
+            Round.round_index,
+            cast(Round.accuracy, Float),
+            cast(func.coalesce(Round.avg_time_secs, 0), Float),
+            cast(func.coalesce(Round.hints, 0), Float),
+            Recommendation.id,
+            Recommendation.true_label,
+            Recommendation.rec,
+            Recommendation.model_version,
+        )
+        .outerjoin(Recommendation, Recommendation.round_id == Round.id)
+        # preporuke iste runde su zaredom, zadnja po id-u (vidi latest_recommendations)
+        .order_by(Round.user_id, Round.game_id, Round.round_index, Recommendation.id)
+    )
+
+
+def _ids(values):
+    raw = b"".join(v.bytes if v is not None else bytes(16) for v in values)
+    return np.frombuffer(raw, dtype=ID_DTYPE).copy()
+
+
+def _floats(values):
+    return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+
+
+def _ints(values, missing=-1):
+    return np.array([missing if v is None else v for v in values], dtype=np.int64)
+
+
+def load_history(engine, chunksize):
+    """Sve runde (s preporukom ako postoji) kao dict NumPy polja, streamano u chunkovima."""
+    parts = []
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=chunksize).execute(history_query())
+        for rows in result.partitions():
+            cols = list(zip(*rows))
+            parts.append({
+                "user_id": _ids(cols[0]),
+                "game_id": _ids(cols[1]),
+                "round_index": _ints(cols[2]),
+                "accuracy": _floats(cols[3]),
+                "avg_time": _floats(cols[4]),
+                "hints_used": _floats(cols[5]),
+                "rec_id": _ids(cols[6]),
+                "true_label": _ints(cols[7]),
+                "served_label": _ints([REC_LABELS.get(r) for r in cols[8]]),
+                "model_version": _ints(cols[9]),
+            })
+
+    if not parts:
+        return {}
+    return {key: np.concatenate([p[key] for p in parts]) for key in parts[0]}
+
+
+def latest_recommendations(history):
+    """
+    Jedan redak po rundi: outer join daje redak za svaku preporuku runde, a
+    ostaje samo zadnja po id-u (redci iste runde su poredani po id-u preporuke).
+    Inace bi dodatni redci pomaknuli labele na krive preporuke.
+    """
+    user, game, idx = history["user_id"], history["game_id"], history["round_index"]
+    last = np.ones(len(idx), dtype=bool)
+    last[:-1] = ~((user[1:] == user[:-1]) & (game[1:] == game[:-1]) & (idx[1:] == idx[:-1]))
+    if last.all():
+        return history
+    return {key: values[last] for key, values in history.items()}
+
+
+def derive_true_labels(history, eps=0.1):
+    """
+    Vektorska verzija derive_true_label: labela preporuke runde i je promjena
+    tocnosti izmedu runde i i sljedece runde istog ucenika u istoj igri.
+    Runde bez igre (game_id NULL) su kao online (Round.game_id == None je
+    IS NULL) jedna "igra" ucenika. Ocekuje jedan redak po rundi.
+    Vraca polje labela (-1 gdje sljedece runde nema).
+    """
+    user, game, idx, acc = history["user_id"], history["game_id"], history["round_index"], history["accuracy"]
+    labels = np.full(len(acc), -1, dtype=np.int64)
+    if len(acc) < 2:
+        return labels
+
+    nxt = (
+        (user[1:] == user[:-1])
+        & (game[1:] == game[:-1])
+        & (idx[1:] == idx[:-1] + 1)
+        & ~np.isnan(acc[1:])
+        & ~np.isnan(acc[:-1])
+    )
+    # tocnosti su u bazi Numeric; zaokruzivanje razlike uklanja float sum
+    # (npr. 0.8 - 0.7) pa granica eps radi isto kao s Decimalima
+    delta = np.round(acc[1:] - acc[:-1], 9)
+    labels[:-1] = np.where(delta > eps, 2, np.where(delta < -eps, 0, 1))
+    labels[:-1][~nxt] = -1
+    return labels
+
+
+def write_labels(engine, rec_ids, labels, batch_size):
+    """
+    Bulk UPDATE u batchevima (executemany). Dira samo preporuke koje su jos bez
+    labele, pa ne pregazi ono sto je u meduvremenu labelirao server.
+    """
+    table = Recommendation.__table__
+    stmt = (
+        table.update()
+        .where(table.c.id == bindparam("b_id"), table.c.true_label.is_(None))
+        .values(true_label=bindparam("b_label"), labeled_at=func.now())
+    )
+    written = 0
+    for start in range(0, len(rec_ids), batch_size):
+        params = [
+            {"b_id": uuid.UUID(bytes=rid.tobytes()), "b_label": int(label)}
+            for rid, label in zip(rec_ids[start:start + batch_size], labels[start:start + batch_size])
+        ]
+        with engine.begin() as conn:
+            result = conn.execute(stmt, params)
+            written += max(result.rowcount, 0)
+    return written
+
+
+def _confusion(y_true, y_pred):
+    conf = np.zeros((len(CLASSES), len(CLASSES)), dtype=np.int64)
+    np.add.at(conf, (np.searchsorted(CLASSES, y_true), np.searchsorted(CLASSES, y_pred)), 1)
+    return conf
+
+
+def load_candidate(path):
+    path = Path(path)
+    if path.is_dir():
+        path = path / "model_params.npy"
+    return ModelSnapshot.from_params(load_params(path, mmap=False))
+
+
+def replay(snapshot, history, labels, chunksize=1_000_000):
+    """Predikcije kandidata za sve labelirane runde; tocnost i slaganje s poslanim preporukama."""
+    mask = labels >= 0
+    X = np.column_stack([history["accuracy"][mask], history["avg_time"][mask], history["hints_used"][mask]])
+    y = labels[mask]
+    served = history["served_label"][mask]
+
+    t0 = time.perf_counter()
+    pred = np.concatenate([snapshot.predict(X[i:i + chunksize])[0] for i in range(0, len(X), chunksize)]) if len(X) else y
+    predict_s = time.perf_counter() - t0
+
+    has_served = served >= 0
+    return {
+        "version": snapshot.version,
+        "rows": int(len(y)),
+        "predict_s": predict_s,
+        "agreement_with_served": float((pred[has_served] == served[has_served]).mean()) if has_served.any() else None,
+        **metrics_from_confusion(_confusion(y, pred)),
+    }
+
+
+def main(args):
+    t0 = time.perf_counter()
+    if args.history:
+        with np.load(args.history) as f:
+            history = {key: f[key] for key in f.files}
+    else:
+        engine = create_engine(args.db_url, future=True)
+        history = load_history(engine, args.chunksize)
+    load_s = time.perf_counter() - t0
+    if not history:
+        raise SystemExit("No rounds in history")
+    rows = len(history["round_index"])
+    history = latest_recommendations(history)
+    if args.save_history:
+        np.savez(args.save_history, **history)
+
+    t0 = time.perf_counter()
+    derived = derive_true_labels(history, eps=args.eps)
+    derive_s = time.perf_counter() - t0
+
+    has_rec = history["rec_id"] != NO_ID
+    existing = history["true_label"]
+    to_write = has_rec & (existing < 0) & (derived >= 0)
+    both = has_rec & (existing >= 0) & (derived >= 0)
+
+    report = {
+        "rounds": int(len(derived)),
+        # starije preporuke runde koja ih ima vise (ne labeliraju se)
+        "duplicate_recommendations": rows - int(len(derived)),
+        "recommendations": int(has_rec.sum()),
+        "labeled_before": int((has_rec & (existing >= 0)).sum()),
+        "backfill": int(to_write.sum()),
+        # postojece labele koje se ne slazu s izracunatim (npr. promijenjena runda nakon labeliranja)
+        "label_mismatches": int((both & (existing != derived)).sum()),
+        "load_s": load_s,
+        "derive_s": derive_s,
+    }
+
+    if to_write.any() and not (args.dry_run or args.history):
+        t0 = time.perf_counter()
+        report["written"] = write_labels(engine, history["rec_id"][to_write], derived[to_write], args.batch_size)
+        report["write_s"] = time.perf_counter() - t0
+
+    # za evaluaciju: postojeca labela, a gdje je nema izracunata
+    labels = np.where(has_rec & (existing >= 0), existing, np.where(has_rec, derived, -1))
+
+    served_mask = (labels >= 0) & (history["served_label"] >= 0)
+    if served_mask.any():
+        report["served"] = metrics_from_confusion(_confusion(labels[served_mask], history["served_label"][served_mask]))
+
+    report["candidates"] = {str(c): replay(load_candidate(c), history, labels) for c in args.candidate}
+
+    text = json.dumps(report, indent=2)
+    if args.report:
+        with open(args.report, "w") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db_url", type=str, default=settings.DATABASE_URL)
+    parser.add_argument("--chunksize", type=int, default=50000)
+    parser.add_argument("--batch_size", type=int, default=5000, help="broj UPDATE-a po transakciji")
+    parser.add_argument("--eps", type=float, default=0.1, help="isti prag kao derive_true_label")
+    parser.add_argument("--dry_run", action="store_true", help="samo izracunaj, ne pisi u bazu")
+    parser.add_argument("--history", type=str, default=None, help="ucitaj povijest iz .npz umjesto iz baze (bez pisanja)")
+    parser.add_argument("--save_history", type=str, default=None)
+    parser.add_argument("--candidate", action="append", default=[], help="model_params.npy ili direktorij s njim (moze vise puta)")
+    parser.add_argument("--report", type=str, default=None, help="spremi izvjestaj kao JSON")
+    args = parser.parse_args()
+    main(args)
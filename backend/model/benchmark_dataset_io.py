@@ -0,0 +1,87 @@
+import argparse
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from dataset_io import read_bundle
+from generate_train_data import generate_chunks, write_csv_stream, write_npy_stream
+
+FEATURES = ['accuracy', 'avg_time', 'hints_used']
+
+
+def timed(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def load_csv(csv_path):
+    return pd.read_csv(csv_path)
+
+
+def load_csv_projected(csv_path):
+    return pd.read_csv(csv_path, usecols=FEATURES + ['label'])
+
+
+def load_npy_projected(npy_path):
+    # mmap + projekcija; np.array materijalizira stupce da usporedba bude postena
+    arrays = read_bundle(npy_path, FEATURES + ['label'])
+    return pd.DataFrame({c: np.array(a) for c, a in arrays.items()})
+
+
+def load_npy_features_only(npy_path):
+    # samo X za predikciju/evaluaciju, bez labela
+    arrays = read_bundle(npy_path, FEATURES)
+    return np.column_stack([arrays[c] for c in FEATURES])
+
+
+def main(args):
+    tmp = Path(tempfile.mkdtemp(prefix='smartmath-dataset-'))
+    try:
+        for n in args.rows:
+            csv_path = tmp / f'd{n}.csv'
+            npy_path = tmp / f'd{n}_npy'
+
+            t0 = time.perf_counter()
+            write_csv_stream(generate_chunks(n=n, seed=args.seed), csv_path)
+            t_write_csv = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            write_npy_stream(generate_chunks(n=n, seed=args.seed), npy_path, n)
+            t_write_npy = time.perf_counter() - t0
+
+            size_csv = csv_path.stat().st_size
+            size_npy = sum(p.stat().st_size for p in npy_path.iterdir())
+
+            print(f"\n{n:,} rows  (CSV {size_csv / 2**20:.0f} MB, npy bundle {size_npy / 2**20:.0f} MB)")
+            print(f"  write    csv {t_write_csv:8.2f} s   npy {t_write_npy:8.2f} s   (ukljucuje generiranje)")
+            t_csv = None
+            for name, fn, path in [
+                ('read_csv', load_csv, csv_path),
+                ('read_csv usecols', load_csv_projected, csv_path),
+                ('npy bundle (features+label)', load_npy_projected, npy_path),
+                ('npy bundle (features only)', load_npy_features_only, npy_path),
+            ]:
+                t = timed(lambda: fn(path), args.repeat)
+                t_csv = t_csv or t
+                print(f"  {name:30s} {t:8.3f} s   {t_csv / t:7.1f}x")
+
+            shutil.rmtree(npy_path)
+            csv_path.unlink()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000_000, 10_000_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,115 @@
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+MODEL_OUTPUT = Path(__file__).resolve().parent / "model_output"
+
+
+async def measure(mode, args):
+    from app.routers import ml_feedback
+    from app.routers.ml_feedback import FeedbackRequest, feedback_function
+
+    if mode != "none":
+        ml_feedback.start_learning(mode)
+        # pricekaj da se learner proces pokrene i ucita model
+        await asyncio.sleep(args.warmup)
+
+    rng = np.random.default_rng(args.seed)
+    lags = []
+    done = asyncio.Event()
+
+    async def ticker():
+        # koliko kasni event loop za zadani tick (ono sto osjete socket handleri)
+        loop = asyncio.get_running_loop()
+        while not done.is_set():
+            expected = loop.time() + args.tick_ms / 1000.0
+            await asyncio.sleep(args.tick_ms / 1000.0)
+            lags.append(1000.0 * (loop.time() - expected))
+
+    async def producer():
+        # "razred" od args.students ucenika koji zavrse rundu u isto vrijeme
+        end = time.monotonic() + args.duration
+        while time.monotonic() < end:
+            if mode != "none":
+                for _ in range(args.students):
+                    # isto kao finalize_round: predaja learneru ide u thread pool
+                    await asyncio.to_thread(feedback_function, FeedbackRequest(
+                        accuracy=float(rng.random()),
+                        avg_time=float(rng.uniform(1, 20)),
+                        hints_used=int(rng.integers(0, 5)),
+                        true_label=int(rng.integers(0, 3)),
+                        sample_weight=1.0,
+                    ))
+            await asyncio.sleep(args.burst_every)
+        done.set()
+
+    await asyncio.gather(ticker(), producer())
+    await asyncio.sleep(1.0)
+    applied = ml_feedback.feedback_queue.applied
+    ml_feedback.shutdown()
+
+    lags = np.array(lags)
+    return {
+        "mode": mode,
+        "ticks": int(len(lags)),
+        "p50_ms": float(np.percentile(lags, 50)),
+        "p99_ms": float(np.percentile(lags, 99)),
+        "max_ms": float(lags.max()),
+        "applied_in_process": int(applied),
+    }
+
+
+def run_child(mode, args):
+    sys.path.insert(0, str(BACKEND_DIR))
+    print(json.dumps(asyncio.run(measure(mode, args))))
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        # benchmark uci model na slucajnim primjerima - radi na kopiji, ne na pravom modelu
+        for name in ("model.pkl", "scaler.pkl", "model_params.npy"):
+            shutil.copy(MODEL_OUTPUT / name, Path(tmp) / name)
+
+        env = {
+            **os.environ,
+            "MODEL_DIR": tmp,
+            "FEEDBACK_BATCH_SIZE": str(args.feedback_batch_size),
+            "PYTHONPATH": str(BACKEND_DIR),
+        }
+        for mode in args.modes:
+            out = subprocess.run(
+                [sys.executable, __file__, "--child", mode, *sys.argv[1:]],
+                env=env, cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+            ).stdout
+            r = json.loads(out.strip().splitlines()[-1])
+            print(f"{r['mode']:>8}: loop lag p50 {r['p50_ms']:6.2f} ms  p99 {r['p99_ms']:6.2f} ms  "
+                  f"max {r['max_ms']:7.2f} ms  ({r['ticks']} ticks, learned in-process: {r['applied_in_process']})")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--modes', nargs='+', default=['none', 'inline', 'process'])
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--students', type=int, default=30)
+    parser.add_argument('--burst_every', type=float, default=0.25)
+    parser.add_argument('--feedback_batch_size', type=int, default=1)
+    parser.add_argument('--tick_ms', type=float, default=1.0)
+    parser.add_argument('--warmup', type=float, default=3.0)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--child', type=str, default=None)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args)
+    else:
+        main(args)
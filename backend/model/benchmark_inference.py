@@ -0,0 +1,77 @@
+import argparse
+import sys
+import timeit
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+
+# da se moze pokrenuti iz model/ direktorija (kao i ostale skripte)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services.model_format import load_params  # noqa: E402
+from app.services.model_state import (  # noqa: E402
+    MODEL_PARAMS_PATH, MODEL_PATH, SCALER_PATH, ModelSnapshot, load_learner,
+)
+
+model, scaler = load_learner()
+
+FEATURES = ['accuracy', 'avg_time', 'hints_used']
+
+
+def sample_features(n, rng):
+    return np.column_stack([
+        rng.beta(2.0, 2.0, n),
+        np.clip(np.abs(rng.normal(10.0, 5.0, n)), 1.0, 120.0),
+        np.minimum(rng.poisson(1.5, n), 10),
+    ]).astype(np.float64)
+
+
+def sklearn_path(X):
+    # originalni put iz predict_function: DataFrame -> transform -> predict + predict_proba
+    X_scaled = scaler.transform(pd.DataFrame(X, columns=FEATURES))
+    return model.predict(X_scaled), model.predict_proba(X_scaled)
+
+
+def check_parity(kernel, X):
+    labels, proba = kernel.predict(X)
+    ref_labels, ref_proba = sklearn_path(X)
+
+    assert np.array_equal(labels, ref_labels), "labels differ from sklearn predict"
+    assert np.allclose(proba, ref_proba, rtol=1e-10, atol=1e-12), "probabilities differ from predict_proba"
+    return float(np.max(np.abs(proba - ref_proba)))
+
+
+def main(args):
+    rng = np.random.default_rng(args.seed)
+    kernel = ModelSnapshot.from_sklearn(scaler, model, version=0)
+
+    max_diff = check_parity(kernel, sample_features(args.parity_rows, rng))
+    print(f"Parity OK on {args.parity_rows} rows (max |dp| = {max_diff:.2e})")
+
+    if MODEL_PARAMS_PATH.exists():
+        t_pkl = min(timeit.repeat(lambda: (joblib.load(MODEL_PATH), joblib.load(SCALER_PATH)), number=20, repeat=3)) / 20
+        t_npy = min(timeit.repeat(lambda: load_params(MODEL_PARAMS_PATH), number=20, repeat=3)) / 20
+        print(f"Load  pickles: {t_pkl * 1e6:9.1f} us  model_params.npy (mmap): {t_npy * 1e6:8.1f} us")
+
+        params_snapshot = ModelSnapshot.from_params(load_params(MODEL_PARAMS_PATH))
+        if params_snapshot.version == 0:
+            check_parity(params_snapshot, sample_features(args.parity_rows, rng))
+            print("Parity OK for model_params.npy snapshot")
+
+    for n in args.batch_sizes:
+        X = sample_features(n, rng)
+        t_sk = min(timeit.repeat(lambda: sklearn_path(X), number=args.number, repeat=5)) / args.number
+        t_np = min(timeit.repeat(lambda: kernel.predict(X), number=args.number, repeat=5)) / args.number
+        print(f"N={n:>5}  sklearn+pandas: {t_sk * 1e6:9.1f} us  numpy kernel: {t_np * 1e6:8.1f} us  speedup: {t_sk / t_np:6.1f}x")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--batch_sizes', type=int, nargs='+', default=[1, 30, 1000])
+    parser.add_argument('--number', type=int, default=200)
+    parser.add_argument('--parity_rows', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,132 @@
+"""
+Odziv event loopa dok vise igara istovremeno salje socket evente koji idu u bazu.
+
+sync  - kao stari handleri: SessionLocal() i blokirajuci upiti izravno na loopu
+async - AsyncSessionLocal (app/db.py), upiti se awaitaju
+
+Svaki ucenik svakih ~think_ms posalje event (odgovor na pitanje), a handler
+napravi --queries upita. Trajanje upita na serveru se simulira s pg_sleep
+(na SQLiteu s registriranom sleep funkcijom), pa benchmark ne pise nista u bazu.
+Mjeri se kasnjenje ticka event loopa (ono sto osjete svi spojeni ucenici) i
+latencija eventa.
+
+    python benchmark_socket_db.py --games 20 --students 30 --query_ms 5
+    python benchmark_socket_db.py --db_url sqlite:////tmp/bench.db
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+# backend/ na path da se koristi isti async URL i pool kao na serveru
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from app.config import settings  # noqa: E402
+from app.db import async_database_url  # noqa: E402
+
+SLEEP_SQL = {
+    "postgresql": "SELECT pg_sleep(:s)",
+    "sqlite": "SELECT sleep(:s)",
+}
+
+
+def _register_sqlite_sleep(dbapi_connection, _):
+    dbapi_connection.create_function("sleep", 1, lambda s: time.sleep(s) or 0)
+
+
+def make_engines(url):
+    sync_engine = create_engine(url, future=True)
+    async_engine = create_async_engine(
+        async_database_url(url),
+        pool_size=settings.ASYNC_DB_POOL_SIZE,
+        max_overflow=settings.ASYNC_DB_MAX_OVERFLOW,
+    )
+    if sync_engine.dialect.name == "sqlite":
+        event.listen(sync_engine, "connect", _register_sqlite_sleep)
+        event.listen(async_engine.sync_engine, "connect", _register_sqlite_sleep)
+    return sync_engine, async_engine
+
+
+async def measure(mode, sync_engine, async_engine, args):
+    stmt = text(SLEEP_SQL[sync_engine.dialect.name])
+    params = {"s": args.query_ms / 1000.0}
+
+    async def handle_sync():
+        with sync_engine.connect() as conn:
+            for _ in range(args.queries):
+                conn.execute(stmt, params)
+
+    async def handle_async():
+        async with async_engine.connect() as conn:
+            for _ in range(args.queries):
+                await conn.execute(stmt, params)
+
+    handler = handle_sync if mode == "sync" else handle_async
+    rng = np.random.default_rng(args.seed)
+    loop = asyncio.get_running_loop()
+    lags, latencies = [], []
+    end = loop.time() + args.duration
+
+    async def ticker():
+        while loop.time() < end:
+            expected = loop.time() + args.tick_ms / 1000.0
+            await asyncio.sleep(args.tick_ms / 1000.0)
+            lags.append(1000.0 * (loop.time() - expected))
+
+    async def student(think):
+        # ucenici ne krecu u istom trenutku
+        await asyncio.sleep(float(rng.uniform(0, think)))
+        while loop.time() < end:
+            t0 = loop.time()
+            await handler()
+            latencies.append(1000.0 * (loop.time() - t0))
+            await asyncio.sleep(float(rng.exponential(think)))
+
+    think = args.think_ms / 1000.0
+    await asyncio.gather(ticker(), *(student(think) for _ in range(args.games * args.students)))
+
+    lags, latencies = np.array(lags), np.array(latencies)
+    return {
+        "mode": mode,
+        "ticks": int(len(lags)),
+        "lag_p50_ms": float(np.percentile(lags, 50)),
+        "lag_p99_ms": float(np.percentile(lags, 99)),
+        "lag_max_ms": float(lags.max()),
+        "events": int(len(latencies)),
+        "events_per_s": len(latencies) / args.duration,
+        "event_p50_ms": float(np.percentile(latencies, 50)) if len(latencies) else None,
+        "event_p99_ms": float(np.percentile(latencies, 99)) if len(latencies) else None,
+    }
+
+
+async def run(args):
+    sync_engine, async_engine = make_engines(args.db_url)
+    try:
+        for mode in args.modes:
+            r = await measure(mode, sync_engine, async_engine, args)
+            print(f"{r['mode']:>6}: loop lag p50 {r['lag_p50_ms']:7.2f} ms  p99 {r['lag_p99_ms']:7.2f} ms  "
+                  f"max {r['lag_max_ms']:8.2f} ms  | {r['events_per_s']:7.1f} events/s  "
+                  f"event p50 {r['event_p50_ms']:7.2f} ms  p99 {r['event_p99_ms']:8.2f} ms")
+    finally:
+        sync_engine.dispose()
+        await async_engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--db_url', type=str, default=settings.DATABASE_URL)
+    parser.add_argument('--modes', nargs='+', default=['sync', 'async'])
+    parser.add_argument('--games', type=int, default=20)
+    parser.add_argument('--students', type=int, default=30, help='ucenika po igri')
+    parser.add_argument('--think_ms', type=float, default=2000.0, help='prosjecni razmak izmedu evenata jednog ucenika')
+    parser.add_argument('--queries', type=int, default=3, help='upita po eventu')
+    parser.add_argument('--query_ms', type=float, default=5.0, help='trajanje jednog upita na serveru')
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--tick_ms', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    asyncio.run(run(args))
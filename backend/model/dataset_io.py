@@ -0,0 +1,113 @@
+"""
+Stupcani binarni format za datasetove i artefakte treniranja ("npy bundle").
+
+Bundle je direktorij s jednom .npy datotekom po stupcu i meta.json:
+
+    train_dataset_npy/
+        accuracy.npy  avg_time.npy  hints_used.npy  label.npy  meta.json
+
+Stupci su tipizirani (nema parsiranja teksta), citaju se memory-mapped i samo
+oni koji trebaju (projekcija). meta.json se pise zadnji pa bundle bez njega
+nije dovrsen.
+"""
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+FORMAT = "npy-bundle"
+FORMAT_VERSION = 1
+
+DATASET_DTYPES = {
+    'accuracy': np.float64,
+    'avg_time': np.float64,
+    'hints_used': np.int64,
+    'label': np.int64,
+}
+
+
+def is_bundle(path):
+    return (Path(path) / "meta.json").is_file()
+
+
+def read_meta(path):
+    with open(Path(path) / "meta.json") as f:
+        meta = json.load(f)
+    if meta.get("format") != FORMAT or meta.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"{path} is not a {FORMAT} v{FORMAT_VERSION}")
+    return meta
+
+
+class NpyBundleWriter:
+    """
+    Pise bundle od n redaka chunk po chunk (stupci su open_memmap unaprijed
+    zadane duljine, pa memorija ne ovisi o n).
+    """
+
+    def __init__(self, path, n, dtypes):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        meta = self.path / "meta.json"
+        if meta.exists():
+            meta.unlink()
+
+        self.n = n
+        self.pos = 0
+        self.dtypes = dict(dtypes)
+        self.columns = {
+            name: np.lib.format.open_memmap(self.path / f"{name}.npy", mode="w+", dtype=dtype, shape=(n,))
+            for name, dtype in self.dtypes.items()
+        }
+
+    def write(self, chunk):
+        """chunk je DataFrame ili dict stupac -> polje."""
+        values = {name: np.asarray(chunk[name]) for name in self.columns}
+        k = len(next(iter(values.values()))) if values else 0
+        if self.pos + k > self.n:
+            raise ValueError(f"Bundle {self.path} overflow: {self.pos + k} > {self.n} rows")
+        for name, arr in self.columns.items():
+            arr[self.pos:self.pos + k] = values[name]
+        self.pos += k
+
+    def close(self):
+        if self.pos != self.n:
+            raise ValueError(f"Bundle {self.path} incomplete: {self.pos} of {self.n} rows")
+        for arr in self.columns.values():
+            arr.flush()
+        self.columns = {}
+
+        with open(self.path / "meta.json", "w") as f:
+            json.dump({
+                "format": FORMAT,
+                "format_version": FORMAT_VERSION,
+                "rows": self.n,
+                "columns": {name: np.dtype(dtype).str for name, dtype in self.dtypes.items()},
+            }, f, indent=2)
+
+
+def write_bundle(df, path, dtypes=None):
+    writer = NpyBundleWriter(path, len(df), dtypes or {c: df[c].dtype for c in df.columns})
+    writer.write(df)
+    writer.close()
+
+
+def read_bundle(path, columns=None, mmap=True):
+    """Dict stupac -> ndarray (read-only mmap ako je mmap=True); columns je projekcija."""
+    path = Path(path)
+    meta = read_meta(path)
+    columns = list(meta["columns"]) if columns is None else list(columns)
+
+    missing = [c for c in columns if c not in meta["columns"]]
+    if missing:
+        raise KeyError(f"Columns {missing} not in {path}")
+
+    return {c: np.load(path / f"{c}.npy", mmap_mode="r" if mmap else None) for c in columns}
+
+
+def iter_bundle_chunks(path, chunksize, columns=None):
+    """DataFrame chunkovi iz bundlea; citaju se samo trazeni stupci i samo tekuci raspon."""
+    arrays = read_bundle(path, columns)
+    n = len(next(iter(arrays.values()))) if arrays else 0
+    for start in range(0, n, chunksize):
+        yield pd.DataFrame({c: np.array(a[start:start + chunksize]) for c, a in arrays.items()})
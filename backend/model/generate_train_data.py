@@ -1,7 +1,18 @@
 import numpy as np
 import pandas as pd
 import argparse
-import random
+import json
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from dataset_io import DATASET_DTYPES, NpyBundleWriter, is_bundle, read_bundle, write_bundle
+
+COLUMNS = ['accuracy', 'avg_time', 'hints_used', 'label']
+
+# Broj kandidata koji se izvlace odjednom. Fiksan je (ne ovisi o n ni o velicini chunka)
+# da isti seed uvijek daje isti niz primjera.
+CANDIDATE_BLOCK = 1 << 18
 
 def heuristic(acc, avg_time, hints):
     if acc >= 0.9 and avg_time <= 5 and hints <= 1: return 2
@@ -10,62 +21,246 @@ def heuristic(acc, avg_time, hints):
     elif acc < 0.4 and avg_time < 6 and hints <= 1: return 1
     else: return None
 
-def generate(n=5000, seed=42, balance=False):
-    np.random.seed(seed)
-    random.seed(seed)
+def heuristic_vec(acc, avg_time, hints):
+    """Isto sto i heuristic(), ali za cijela polja odjednom; -1 znaci da primjer nema labelu."""
+    label = np.full(acc.shape, -1, dtype=np.int64)
+    rules = [
+        ((acc >= 0.9) & (avg_time <= 5) & (hints <= 1), 2),
+        ((acc >= 0.6) & (acc <= 0.75) & (avg_time >= 7) & (avg_time <= 10) & (hints >= 2) & (hints <= 3), 1),
+        ((acc <= 0.4) & (avg_time >= 13) & (hints >= 4), 0),
+        ((acc < 0.4) & (avg_time < 6) & (hints <= 1), 1),
+    ]
+    # pravila se primjenjuju redom kao if/elif - vrijedi prvo koje odgovara
+    for mask, value in rules:
+        label[mask & (label < 0)] = value
+    return label
 
-    rows = []
-    while len(rows) < n:
+def generate_chunks(n=5000, seed=42):
+    """
+    Generira n labeliranih primjera u chunkovima (DataFrame po bloku kandidata).
+    seed moze biti int ili np.random.SeedSequence (vidi generate_parallel).
+    """
+    rng = np.random.default_rng(seed)
+
+    produced = 0
+    while produced < n:
         # Tocnost sampleana iz beta distribucije
-        acc = np.clip(np.random.beta(a=2.0, b=2.0), 0.0, 1.0)
+        acc = np.clip(rng.beta(a=2.0, b=2.0, size=CANDIDATE_BLOCK), 0.0, 1.0)
 
         # Avg time sampleano iz normalne distribucije s tim da acc utjece na mean (veci acc korelira s kracim vremenom odgovaranja)
-        avg_time = np.abs(np.random.normal(loc=10.0 + (0.5 - acc) * 10.0, scale=5.0))
-        avg_time = float(np.clip(avg_time, 1.0, 120.0))
+        avg_time = np.abs(rng.normal(loc=10.0 + (0.5 - acc) * 10.0, scale=5.0))
+        avg_time = np.clip(avg_time, 1.0, 120.0)
 
         # Hintovi sampleani iz Poissonove distribucije (najcesce manje vrijednosti) s tim da acc utjece na mean (veci acc korelira s manjim brojem hintova)
-        hints = np.random.poisson(lam=max(0.1, 1.5 + (0.5 - acc) * 3.0))
-        hints = int(min(hints, 10)) # cappano na 10 da nema velikih outliera
+        hints = rng.poisson(lam=np.maximum(0.1, 1.5 + (0.5 - acc) * 3.0))
+        hints = np.minimum(hints, 10) # cappano na 10 da nema velikih outliera
 
-        label = heuristic(acc, avg_time, hints)
+        label = heuristic_vec(acc, avg_time, hints)
 
-        if label is None: continue
+        keep = np.flatnonzero(label >= 0)[: n - produced]
+        produced += len(keep)
 
-        rows.append({
-            'accuracy': float(acc),
-            'avg_time': float(avg_time),
-            'hints_used': int(hints),
-            'label': int(label)
-        })
+        yield pd.DataFrame({
+            'accuracy': acc[keep],
+            'avg_time': avg_time[keep],
+            'hints_used': hints[keep].astype(np.int64),
+            'label': label[keep],
+        }, columns=COLUMNS)
 
-    df = pd.DataFrame(rows)
+def balance_df(df, seed=42):
     # Ako zelimo balansirati primjere po klasama oversamplamo klase s manjim brojem primjera da se izjednace sa onom koja ima najvise
-    if balance:
-        classes = df['label'].unique().tolist()
-        max_count = df['label'].value_counts().max()
-        samples = []
+    classes = df['label'].unique().tolist()
+    max_count = df['label'].value_counts().max()
+    samples = []
 
-        for c in classes:
-            dfc = df[df['label'] == c]
-            if len(dfc) < max_count:
-                dfc_up = dfc.sample(max_count, replace=True, random_state=seed)
-                samples.append(dfc_up)
-            else:
-                samples.append(dfc)
+    for c in classes:
+        dfc = df[df['label'] == c]
+        if len(dfc) < max_count:
+            dfc_up = dfc.sample(max_count, replace=True, random_state=seed)
+            samples.append(dfc_up)
+        else:
+            samples.append(dfc)
 
-        df = pd.concat(samples).sample(frac=1, random_state=seed).reset_index(drop=True)
+    return pd.concat(samples).sample(frac=1, random_state=seed).reset_index(drop=True)
 
+def generate(n=5000, seed=42, balance=False):
+    df = pd.concat(generate_chunks(n=n, seed=seed), ignore_index=True)
+    if balance:
+        df = balance_df(df, seed=seed)
     return df
 
+def write_csv_stream(chunks, path):
+    """Zapisuje chunkove redom u CSV bez drzanja svega u memoriji; vraca broj primjera po klasi."""
+    counts = pd.Series(dtype=np.int64)
+    for i, chunk in enumerate(chunks):
+        chunk.to_csv(path, index=False, mode='w' if i == 0 else 'a', header=(i == 0))
+        counts = counts.add(chunk['label'].value_counts(), fill_value=0)
+    return counts.astype(np.int64).sort_index()
+
+def write_npy_stream(chunks, path, n):
+    """Isto kao write_csv_stream, ali u stupcani npy bundle (vidi dataset_io) od tocno n redaka."""
+    writer = NpyBundleWriter(path, n, DATASET_DTYPES)
+    counts = pd.Series(dtype=np.int64)
+    for chunk in chunks:
+        writer.write(chunk)
+        counts = counts.add(chunk['label'].value_counts(), fill_value=0)
+    writer.close()
+    return counts.astype(np.int64).sort_index()
+
+def write_stream(chunks, path, n, fmt):
+    if fmt == 'npy':
+        return write_npy_stream(chunks, path, n)
+    return write_csv_stream(chunks, path)
+
+def read_dataset(path):
+    if is_bundle(path):
+        return pd.DataFrame({c: np.array(a) for c, a in read_bundle(path).items()})
+    return pd.read_csv(path)
+
+def write_dataset(df, path, fmt):
+    if fmt == 'npy':
+        write_bundle(df, path, DATASET_DTYPES)
+    else:
+        df.to_csv(path, index=False)
+
+
+def _generate_shard(path, n, seed_seq, fmt):
+    counts = write_stream(generate_chunks(n=n, seed=seed_seq), path, n, fmt)
+    return {int(k): int(v) for k, v in counts.items()}
+
+def _balance_shard(path, draws, seed_seq, fmt):
+    """
+    Prepise shard tako da za svaku klasu iz draws uzme zadani broj primjera s
+    ponavljanjem (klase koje nisu u draws ostaju kakve jesu) i promijesa ga.
+    """
+    rng = np.random.default_rng(seed_seq)
+    df = read_dataset(path)
+    label = df['label'].to_numpy()
+
+    parts = []
+    for c in np.unique(label):
+        idx = np.flatnonzero(label == c)
+        if int(c) in draws:
+            idx = rng.choice(idx, size=draws[int(c)], replace=True)
+        parts.append(idx)
+    idx = np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+    rng.shuffle(idx)
+
+    df = df.iloc[idx]
+    write_dataset(df, path, fmt)
+    return {int(k): int(v) for k, v in df['label'].value_counts().items()}
+
+def merge_shards(paths, out):
+    """Spaja CSV shardove u jednu datoteku (header samo jednom), bez ucitavanja u pandas."""
+    if paths and is_bundle(paths[0]):
+        return merge_bundles(paths, out)
+    with open(out, 'wb') as dst:
+        for i, path in enumerate(paths):
+            with open(path, 'rb') as src:
+                header = src.readline()
+                if i == 0:
+                    dst.write(header)
+                shutil.copyfileobj(src, dst)
+
+def merge_bundles(paths, out):
+    """Spaja npy bundle shardove stupac po stupac (mmap -> mmap)."""
+    shards = [read_bundle(path) for path in paths]
+    writer = NpyBundleWriter(out, sum(len(shard['label']) for shard in shards), DATASET_DTYPES)
+    for shard in shards:
+        writer.write(shard)
+    writer.close()
+
+def generate_parallel(n, seed, workers, shard_dir, balance=False, fmt='csv'):
+    """
+    Generira n primjera u workers procesa, svaki u svoj shard (part-XXXXX.csv).
+    Svaki proces dobiva svoj SeedSequence child pa je rezultat isti za isti
+    (seed, workers). Vraca index (dict) koji se sprema i u shard_dir/index.json.
+
+    Balansiranje radi kao balance_df (manjinske klase se sampleaju s ponavljanjem
+    do broja primjera najvece klase), ali bez spajanja u jedan DataFrame: ukupan
+    broj primjera klase po shardovima se rasporedi multinomijalno pa svaki
+    proces samplea samo iz svog sharda. Mijesa se unutar sharda.
+    """
+    shard_dir = Path(shard_dir)
+    shard_dir.mkdir(parents=True, exist_ok=True)
+
+    # shard bez redaka ne bi imao datoteku (ni CSV header) pa ga merge_shards ne bi nasao
+    workers = max(1, min(workers, n))
+
+    root = np.random.SeedSequence(seed)
+    gen_seqs, bal_seqs = zip(*(child.spawn(2) for child in root.spawn(workers)))
+    suffix = '.csv' if fmt == 'csv' else ''
+    paths = [shard_dir / f'part-{i:05d}{suffix}' for i in range(workers)]
+    fmts = [fmt] * workers
+    sizes = [n // workers + (1 if i < n % workers else 0) for i in range(workers)]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        counts = list(pool.map(_generate_shard, paths, sizes, gen_seqs, fmts))
+
+        if balance:
+            classes = sorted({c for shard in counts for c in shard})
+            totals = {c: sum(shard.get(c, 0) for shard in counts) for c in classes}
+            max_count = max(totals.values())
+
+            rng = np.random.default_rng(root.spawn(1)[0])
+            draws = [{} for _ in range(workers)]
+            for c in classes:
+                if totals[c] == max_count:
+                    continue
+                share = np.array([shard.get(c, 0) for shard in counts], dtype=np.float64) / totals[c]
+                for i, k in enumerate(rng.multinomial(max_count, share)):
+                    draws[i][c] = int(k)
+
+            counts = list(pool.map(_balance_shard, paths, draws, bal_seqs, fmts))
+
+    index = {
+        'seed': seed,
+        'workers': workers,
+        'balance': balance,
+        'format': fmt,
+        'rows': sum(sum(shard.values()) for shard in counts),
+        'shards': [
+            {'path': path.name, 'rows': sum(shard.values()), 'counts': {str(c): k for c, k in sorted(shard.items())}}
+            for path, shard in zip(paths, counts)
+        ],
+    }
+    with open(shard_dir / 'index.json', 'w') as f:
+        json.dump(index, f, indent=2)
+    return index
+
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     parser.add_argument('--n', type=int, default=5000)
     parser.add_argument('--seed', type=int, default=42)
     parser.add_argument('--balance', action='store_true')
+    parser.add_argument('--out', type=str, default=None, help='default train_dataset.csv (csv) / train_dataset_npy (npy)')
+    parser.add_argument('--format', choices=['csv', 'npy'], default='csv', help='npy: stupcani binarni bundle (dataset_io.py), brze ucitavanje od CSV-a')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--keep-shards', action='store_true', help='uz --workers > 1: ostavi shardove i index.json umjesto spajanja u --out')
     args = parser.parse_args()
+    if args.out is None:
+        args.out = 'train_dataset.csv' if args.format == 'csv' else 'train_dataset_npy'
 
-    df = generate(n=args.n, seed=args.seed, balance=args.balance)
-    df.to_csv('train_dataset.csv', index=False)
-
-    print(df['label'].value_counts(normalize=False))
\ No newline at end of file
+    if args.workers > 1:
+        out = Path(args.out)
+        shard_dir = out.with_name(out.stem + '_shards')
+        index = generate_parallel(args.n, args.seed, args.workers, shard_dir, balance=args.balance, fmt=args.format)
+        if args.keep_shards:
+            print(f"Shards: {shard_dir / 'index.json'}")
+        else:
+            merge_shards([shard_dir / s['path'] for s in index['shards']], out)
+            shutil.rmtree(shard_dir)
+        totals = {}
+        for shard in index['shards']:
+            for c, k in shard['counts'].items():
+                totals[int(c)] = totals.get(int(c), 0) + k
+        print(pd.Series(totals, name='count').sort_index())
+    elif args.balance:
+        # balansiranje treba sve primjere odjednom
+        df = generate(n=args.n, seed=args.seed, balance=True)
+        write_dataset(df, args.out, args.format)
+        print(df['label'].value_counts(normalize=False))
+    else:
+        counts = write_stream(generate_chunks(n=args.n, seed=args.seed), args.out, args.n, args.format)
+        print(counts)
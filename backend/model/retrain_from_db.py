@@ -0,0 +1,212 @@
+"""
+Offline retrening iz produkcijske povijesti preporuka.
+
+Online model uci labelirane preporuke jednu po jednu (finalize_round ->
+feedback_function). Ova skripta iste primjere (recommendations.true_label +
+znacajke runde na koju se preporuka odnosi) izvuce iz baze server-side
+cursorom u chunkovima, spremi ih kao npy bundle (vidi dataset_io.py), trenira
+svjez model kroz vise epoha i usporedi ga s live modelom na holdoutu.
+
+Rezultat je kandidat u istom layoutu kao model_output (model.pkl, scaler.pkl,
+model_params.npy, ...) + comparison.json; u produkciju se ne deploya automatski.
+
+    python retrain_from_db.py --epochs 5
+    python retrain_from_db.py --data candidates/<prethodni>/dataset_npy   # bez ponovnog exporta
+"""
+import argparse
+import datetime
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from sklearn.preprocessing import StandardScaler
+from sqlalchemy import Float, cast, create_engine, func, select
+
+# backend/ na path da se mogu koristiti modeli baze i format modela iz app/
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from app.config import settings  # noqa: E402
+from app.models import Recommendation, Round  # noqa: E402
+from app.services.model_format import PARAMS_FILE, ModelSnapshot, load_params  # noqa: E402
+
+from dataset_io import NpyBundleWriter, iter_bundle_chunks, read_meta  # noqa: E402
+from train_model import (  # noqa: E402
+    CLASSES, FEATURES, holdout_mask, make_model, metrics_from_confusion, peak_memory_mb, save_model,
+)
+
+EXPORT_DTYPES = {
+    'accuracy': np.float64,
+    'avg_time': np.float64,
+    'hints_used': np.float64,
+    'label': np.int64,
+    'sample_weight': np.float64,
+}
+
+# isti direktorij kao na serveru (MODEL_DIR), bez importa model_state koji ucitava learnera
+MODEL_DIR = Path(settings.MODEL_DIR) if settings.MODEL_DIR else Path(__file__).resolve().parent / "model_output"
+
+
+def labeled_query(ordered=True):
+    """
+    Labelirane preporuke sa znacajkama runde, iste vrijednosti i tezine kao
+    FeedbackRequest u finalize_round. Redoslijed po UUID-u preporuke je
+    stabilan, a prakticki nasumican (dobro za SGD).
+    """
+    q = (
+        select(
+            cast(Round.accuracy, Float),
+            cast(func.coalesce(Round.avg_time_secs, 0), Float),
+            cast(func.coalesce(Round.hints, 0), Float),
+            Recommendation.true_label,
+            5.0 * cast(Recommendation.confidence, Float),
+        )
+        .join(Round, Recommendation.round_id == Round.id)
+        .where(
+            Recommendation.true_label.is_not(None),
+            Recommendation.confidence.is_not(None),
+            Round.accuracy.is_not(None),
+        )
+    )
+    return q.order_by(Recommendation.id) if ordered else q
+
+
+def export_labeled(engine, path, chunksize):
+    """
+    Stream labeliranih primjera iz baze u npy bundle; u memoriji je uvijek samo
+    jedan chunk. Count i export su u istoj (REPEATABLE READ) transakciji pa
+    vide isti snapshot baze.
+    """
+    with engine.connect() as conn:
+        if engine.dialect.name == "postgresql":
+            conn = conn.execution_options(isolation_level="REPEATABLE READ")
+        with conn.begin():
+            n = conn.execute(select(func.count()).select_from(labeled_query(ordered=False).subquery())).scalar_one()
+            writer = NpyBundleWriter(path, n, EXPORT_DTYPES)
+
+            # stream_results -> server-side (named) cursor, yield_per rows po fetchu
+            result = conn.execution_options(stream_results=True, yield_per=chunksize).execute(labeled_query())
+            for rows in result.partitions():
+                arr = np.array(rows, dtype=np.float64).reshape(-1, len(EXPORT_DTYPES))
+                writer.write({name: arr[:, i] for i, name in enumerate(EXPORT_DTYPES)})
+            writer.close()
+    return n
+
+
+def load_live(path):
+    return ModelSnapshot.from_params(load_params(path, mmap=False))
+
+
+def train(data, args):
+    rng = np.random.default_rng(args.seed)
+    columns = FEATURES + ['label', 'sample_weight']
+
+    # 1) scaler na train dijelu
+    scaler = StandardScaler()
+    n_train = n_test = 0
+    for chunk in iter_bundle_chunks(data, args.chunksize, columns):
+        test = holdout_mask(chunk, args.test_size, args.seed)
+        if (~test).any():
+            scaler.partial_fit(chunk.loc[~test, FEATURES])
+        n_train += int((~test).sum())
+        n_test += int(test.sum())
+    if n_train == 0:
+        raise SystemExit("No labeled training rows")
+
+    # 2) epohe partial_fit s istim tezinama kao online ucenje
+    model = make_model(args.seed)
+    t0 = time.perf_counter()
+    for epoch in range(args.epochs):
+        for chunk in iter_bundle_chunks(data, args.chunksize, columns):
+            train_rows = chunk[~holdout_mask(chunk, args.test_size, args.seed)]
+            if train_rows.empty:
+                continue
+            order = rng.permutation(len(train_rows))
+            X = scaler.transform(train_rows[FEATURES].iloc[order])
+            y = train_rows['label'].to_numpy()[order]
+            w = train_rows['sample_weight'].to_numpy()[order]
+            model.partial_fit(X, y, classes=CLASSES, sample_weight=w)
+    train_time = time.perf_counter() - t0
+
+    return scaler, model, {
+        "n_train": n_train,
+        "n_test": n_test,
+        "epochs": args.epochs,
+        "train_s": train_time,
+        "train_rows_per_s": n_train * args.epochs / train_time if train_time > 0 else None,
+    }
+
+
+def compare(data, snapshots, args):
+    """Matrice konfuzije svih modela na istom holdoutu (jedan prolaz kroz podatke)."""
+    confs = {name: np.zeros((len(CLASSES), len(CLASSES)), dtype=np.int64) for name in snapshots}
+    agree = 0
+    for chunk in iter_bundle_chunks(data, args.chunksize, FEATURES + ['label']):
+        test = chunk[holdout_mask(chunk, args.test_size, args.seed)]
+        if test.empty:
+            continue
+        X = test[FEATURES].to_numpy(dtype=np.float64)
+        y = test['label'].to_numpy()
+        preds = {}
+        for name, snap in snapshots.items():
+            preds[name], _ = snap.predict(X)
+            np.add.at(confs[name], (np.searchsorted(CLASSES, y), np.searchsorted(CLASSES, preds[name])), 1)
+        agree += int((preds["fresh"] == preds["live"]).sum())
+
+    n = int(confs["fresh"].sum())
+    return {name: metrics_from_confusion(conf) for name, conf in confs.items()}, (agree / n if n else None)
+
+
+def main(args):
+    out_dir = Path(args.out or Path(__file__).resolve().parent / "candidates" / datetime.datetime.now().strftime("candidate-%Y%m%d-%H%M%S"))
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    if args.data:
+        data = Path(args.data)
+        n = read_meta(data)["rows"]
+    else:
+        data = out_dir / "dataset_npy"
+        engine = create_engine(args.db_url, future=True)
+        t0 = time.perf_counter()
+        n = export_labeled(engine, data, args.chunksize)
+        print(f"Exported {n} labeled recommendations in {time.perf_counter() - t0:.1f} s")
+
+    scaler, model, train_stats = train(data, args)
+
+    live = load_live(args.live_params)
+    fresh = ModelSnapshot.from_sklearn(scaler, model, version=0)
+    metrics, agreement = compare(data, {"fresh": fresh, "live": live}, args)
+
+    save_model(out_dir, model, scaler)
+
+    summary = {
+        "created_at": datetime.datetime.now().isoformat(),
+        "data": str(data),
+        "rows": n,
+        "live_params": str(args.live_params),
+        "live_version": live.version,
+        "fresh": metrics["fresh"],
+        "live": metrics["live"],
+        "agreement": agreement,
+        "fresh_better": metrics["fresh"]["macro_f1"] > metrics["live"]["macro_f1"],
+        "training": {**train_stats, "chunksize": args.chunksize, "peak_memory_mb": peak_memory_mb()},
+    }
+    with open(out_dir / "comparison.json", "w") as f:
+        json.dump(summary, f, indent=2)
+
+    print(f"Holdout macro-F1  fresh {metrics['fresh']['macro_f1']:.4f}  live(v{live.version}) {metrics['live']['macro_f1']:.4f}")
+    print("Candidate saved to", out_dir)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db_url", type=str, default=settings.DATABASE_URL)
+    parser.add_argument("--data", type=str, default=None, help="postojeci export (npy bundle) umjesto citanja iz baze")
+    parser.add_argument("--out", type=str, default=None, help="default model/candidates/candidate-<vrijeme>")
+    parser.add_argument("--live_params", type=str, default=str(MODEL_DIR / PARAMS_FILE))
+    parser.add_argument("--chunksize", type=int, default=50000)
+    parser.add_argument("--epochs", type=int, default=5)
+    parser.add_argument("--test_size", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    main(args)
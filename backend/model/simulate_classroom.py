@@ -0,0 +1,256 @@
+"""
+Simulacija adaptivne petlje (razina -> pitanja -> runda -> model -> preporuka
+-> feedback) za tisuce sintetickih ucenika odjednom, bez baze i servera.
+
+Svaki ucenik ima latentnu vjestinu (u jedinicama tezine pitanja 1-5). U
+rundi dobiva pitanja po DIFFICULTY_DISTRIBUTION za svoju razinu, iz vjestine i
+tezina se generiraju znacajke runde (accuracy, avg_time, hints_used), model
+predvidi labelu, razina se mijenja kao u finalize_round (next_difficulty), a
+labela prethodne preporuke (derive_true_label) ide u online ucenje kopije
+modela istim putem kao feedback (scaler.partial_fit + model.partial_fit,
+tezina 5 * confidence, mini-batchevi FEEDBACK_BATCH_SIZE).
+
+Metrike:
+  - konvergencija: za koliko rundi ucenik prvi put dode na "ciljnu" razinu
+    (onu na kojoj mu je ocekivana tocnost najbliza --target_accuracy)
+  - oscilacija: promjene smjera (gore pa dolje i obrnuto) po uceniku
+  - drift: koliko se online model udaljio od pocetnog (koeficijenti i
+    promijenjene predikcije na fiksnom probe skupu) i tocnost modela po rundama
+
+    python simulate_classroom.py --students 5000 --rounds 30
+    python simulate_classroom.py --sweep learn_rate=0,0.02,0.05 --sweep feedback_batch=16,256
+"""
+import argparse
+import copy
+import itertools
+import json
+import sys
+import time
+import warnings
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+
+# backend/ na path da se koriste ista pravila i isti inference kernel kao na serveru
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from app.config import settings  # noqa: E402
+from app.services.difficulty import DIFFICULTY_DISTRIBUTION, MAX_DIFFICULTY, MIN_DIFFICULTY  # noqa: E402
+from app.services.model_format import ModelSnapshot  # noqa: E402
+
+LEVELS = np.arange(MIN_DIFFICULTY, MAX_DIFFICULTY + 1)
+
+# [razina ucenika, tezina pitanja] -> broj pitanja u rundi
+QUESTION_COUNTS = np.array(
+    [[DIFFICULTY_DISTRIBUTION[d].get(q, 0) for q in LEVELS] for d in LEVELS],
+    dtype=np.int64,
+)
+
+DEFAULTS = {
+    'students': 2000,
+    'rounds': 30,
+    'seed': 42,
+    'start_difficulty': 3,       # User.current_difficulty default
+    'skill_mean': 3.0,
+    'skill_std': 1.0,
+    'learn_rate': 0.02,          # rast vjestine po rundi
+    'discrimination': 1.7,       # nagib P(tocno) u ovisnosti o (vjestina - tezina)
+    'time_base': 9.0,            # s po pitanju kad je tezina == vjestina
+    'time_slope': 3.0,
+    'time_noise': 4.0,
+    'hint_rate': 0.15,           # hintova po pitanju kad je tezina == vjestina
+    'hint_slope': 0.8,
+    'eps': 0.1,                  # derive_true_label
+    'target_accuracy': 0.7,
+    'feedback_batch': settings.FEEDBACK_BATCH_SIZE,
+    'learning': True,
+}
+
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+def expected_accuracy(skill, cfg):
+    """(S, 5) ocekivana tocnost ucenika na svakoj razini."""
+    p = _sigmoid(cfg['discrimination'] * (skill[:, None] - LEVELS[None, :]))      # (S, tezina)
+    return (p @ QUESTION_COUNTS.T) / QUESTION_COUNTS.sum(axis=1)                  # (S, razina)
+
+
+def play_round(skill, level, cfg, rng):
+    """Znacajke runde za sve ucenike odjednom (isti oblik kao Round u bazi)."""
+    counts = QUESTION_COUNTS[level - MIN_DIFFICULTY]                              # (S, tezina)
+    n_questions = counts.sum(axis=1)
+    gap = LEVELS[None, :] - skill[:, None]                                        # tezina - vjestina
+
+    correct = rng.binomial(counts, _sigmoid(-cfg['discrimination'] * gap))
+    accuracy = correct.sum(axis=1) / n_questions
+
+    # prosjek n pitanja -> sum se smanjuje s sqrt(n)
+    mean_time = (counts * (cfg['time_base'] + cfg['time_slope'] * gap)).sum(axis=1) / n_questions
+    avg_time = np.clip(mean_time + rng.normal(0.0, cfg['time_noise'], len(skill)) / np.sqrt(n_questions), 1.0, 120.0)
+
+    hints = rng.poisson((counts * cfg['hint_rate'] * np.exp(cfg['hint_slope'] * gap)).sum(axis=1))
+
+    return np.column_stack([accuracy, avg_time, hints.astype(np.float64)])
+
+
+def derive_labels(acc_prev, acc_next, eps):
+    delta = np.round(acc_next - acc_prev, 9)
+    return np.where(delta > eps, 2, np.where(delta < -eps, 0, 1))
+
+
+def learn(model, scaler, X, y, w, batch_size, rng):
+    """
+    Isto kao ml_feedback.learn_batch, za vise mini-batcheva redom. Ovo je
+    najskuplji dio simulacije (sklearn poziv po mini-batchu); za brze sweepove
+    --feedback_batch moze biti veci ili --learning false.
+    """
+    order = rng.permutation(len(y))
+    with warnings.catch_warnings():
+        # scaler je fitan na DataFrameu; ndarray daje iste brojeve bez pandas overheada
+        warnings.filterwarnings('ignore', message='X does not have valid feature names')
+        for start in range(0, len(order), batch_size):
+            idx = order[start:start + batch_size]
+            scaler.partial_fit(X[idx])
+            model.partial_fit(scaler.transform(X[idx]), y[idx], sample_weight=w[idx])
+
+
+def simulate(model, scaler, cfg):
+    """Vraca (summary, per_round) za jednu konfiguraciju; model/scaler se ne mijenjaju."""
+    rng = np.random.default_rng(cfg['seed'])
+    model, scaler = copy.deepcopy(model), copy.deepcopy(scaler)
+    S, R = cfg['students'], cfg['rounds']
+
+    skill = rng.normal(cfg['skill_mean'], cfg['skill_std'], S)
+    level = np.full(S, cfg['start_difficulty'], dtype=np.int64)
+
+    initial = ModelSnapshot.from_sklearn(scaler, model, version=0)
+    snapshot = initial
+    probe = play_round(skill, np.full(S, cfg['start_difficulty']), cfg, np.random.default_rng(cfg['seed'] + 1))
+
+    first_hit = np.full(S, -1)
+    last_dir = np.zeros(S, dtype=np.int64)
+    reversals = np.zeros(S, dtype=np.int64)
+    moves = np.zeros(S, dtype=np.int64)
+    prev_X = prev_label = prev_conf = None
+
+    per_round = []
+    t0 = time.perf_counter()
+    for r in range(R):
+        target = LEVELS[np.argmin(np.abs(expected_accuracy(skill, cfg) - cfg['target_accuracy']), axis=1)]
+        first_hit[(first_hit < 0) & (level == target)] = r
+
+        X = play_round(skill, level, cfg, rng)
+        labels, proba = snapshot.predict(X)
+        conf = proba[np.arange(S), np.searchsorted(snapshot.classes, labels)]
+
+        row = {
+            'round': r,
+            'gap': float(np.abs(level - target).mean()),
+            'at_target': float((level == target).mean()),
+            'mean_level': float(level.mean()),
+            'mean_accuracy': float(X[:, 0].mean()),
+        }
+
+        if prev_X is not None:
+            # labela prethodne preporuke, kao derive_true_label u finalize_round
+            true = derive_labels(prev_X[:, 0], X[:, 0], cfg['eps'])
+            row['online_accuracy'] = float((prev_label == true).mean())
+            if cfg['learning']:
+                learn(model, scaler, prev_X, true, 5.0 * prev_conf, cfg['feedback_batch'], rng)
+                snapshot = ModelSnapshot.from_sklearn(scaler, model, version=snapshot.version + 1)
+
+        # next_difficulty za sve ucenike: 0 dolje, 1 isto, 2 gore
+        new_level = np.clip(level + (labels - 1), MIN_DIFFICULTY, MAX_DIFFICULTY)
+        direction = np.sign(new_level - level)
+        moved = direction != 0
+        reversed_now = moved & (direction == -last_dir)
+        reversals += reversed_now
+        moves += moved
+        last_dir = np.where(moved, direction, last_dir)
+        row['moved'] = float(moved.mean())
+        row['reversed'] = float(reversed_now.mean())
+
+        per_round.append(row)
+        prev_X, prev_label, prev_conf = X, labels, conf
+        level = new_level
+        skill = skill + cfg['learn_rate']
+    elapsed = time.perf_counter() - t0
+
+    hit = first_hit >= 0
+    tail = per_round[-min(5, R):]
+    online = [p['online_accuracy'] for p in per_round if 'online_accuracy' in p]
+    probe_before, _ = initial.predict(probe)
+    probe_after, _ = snapshot.predict(probe)
+
+    summary = {
+        'convergence_frac': float(hit.mean()),
+        'convergence_round_median': float(np.median(first_hit[hit])) if hit.any() else None,
+        'convergence_round_mean': float(first_hit[hit].mean()) if hit.any() else None,
+        'final_at_target': float(np.mean([p['at_target'] for p in tail])),
+        'final_gap': float(np.mean([p['gap'] for p in tail])),
+        'oscillation_per_student': float(reversals.mean()),
+        'oscillation_share_of_moves': float(reversals.sum() / moves.sum()) if moves.sum() else 0.0,
+        'moves_per_round': float(moves.mean() / R),
+        'online_accuracy_first': float(np.mean(online[:5])) if online else None,
+        'online_accuracy_last': float(np.mean(online[-5:])) if online else None,
+        'coef_drift': float(np.linalg.norm(snapshot.coef_t - initial.coef_t) / np.linalg.norm(initial.coef_t)),
+        'probe_label_change': float((probe_before != probe_after).mean()),
+        'model_updates': snapshot.version,
+        'seconds': elapsed,
+    }
+    return summary, per_round
+
+
+def _parse_sweep(values):
+    grid = {}
+    for item in values:
+        key, _, raw = item.partition('=')
+        if key not in DEFAULTS:
+            raise SystemExit(f"Unknown sweep parameter {key!r}; one of {sorted(DEFAULTS)}")
+        kind = type(DEFAULTS[key])
+        grid[key] = [(v.lower() in ('1', 'true', 'yes')) if kind is bool else kind(v) for v in raw.split(',')]
+    return grid
+
+
+def main(args):
+    model_dir = Path(args.model_dir)
+    model = joblib.load(model_dir / 'model.pkl')
+    scaler = joblib.load(model_dir / 'scaler.pkl')
+
+    base = {key: getattr(args, key) for key in DEFAULTS}
+    grid = _parse_sweep(args.sweep)
+    runs = [dict(base, **dict(zip(grid, combo))) for combo in itertools.product(*grid.values())] if grid else [base]
+
+    results = []
+    for cfg in runs:
+        summary, per_round = simulate(model, scaler, cfg)
+        results.append({'config': cfg, 'summary': summary, **({'per_round': per_round} if args.curves else {})})
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if grid:
+        table = pd.DataFrame([{**{k: r['config'][k] for k in grid}, **r['summary']} for r in results])
+        with pd.option_context('display.width', 200, 'display.max_columns', None):
+            print(table.to_string(index=False, float_format=lambda v: f'{v:.3f}'))
+    else:
+        print(json.dumps(results[0], indent=2))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    for key, value in DEFAULTS.items():
+        if isinstance(value, bool):
+            parser.add_argument(f'--{key}', type=lambda v: v.lower() in ('1', 'true', 'yes'), default=value)
+        else:
+            parser.add_argument(f'--{key}', type=type(value), default=value)
+    parser.add_argument('--model_dir', type=str, default=str(Path(__file__).resolve().parent / 'model_output'))
+    parser.add_argument('--sweep', action='append', default=[], help='parametar=v1,v2,... (moze vise puta, kartezijev produkt)')
+    parser.add_argument('--curves', action='store_true', help='ukljuci metrike po rundama u izvjestaj')
+    parser.add_argument('--report', type=str, default=None, help='spremi rezultate kao JSON')
+    args = parser.parse_args()
+    main(args)
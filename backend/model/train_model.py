@@ -1,13 +1,32 @@
 import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
 import pandas as pd
 import joblib
 import json
 from pathlib import Path
 
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# backend/ na path da se moze koristiti zajednicki format modela iz app/services
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from app.services.model_format import (  # noqa: E402
+    BASE_FILE, PARAMS_FILE, artifact_fingerprint, next_version, save_params, write_base,
+)
+
+from dataset_io import NpyBundleWriter, is_bundle, iter_bundle_chunks, read_bundle, write_bundle  # noqa: E402
+
 from sklearn.model_selection import train_test_split, StratifiedKFold, GridSearchCV
 from sklearn.preprocessing import StandardScaler
 from sklearn.pipeline import Pipeline
 from sklearn.linear_model import SGDClassifier
+from sklearn.utils.class_weight import compute_class_weight
 from sklearn.metrics import (
     classification_report,
     confusion_matrix,
@@ -19,13 +38,85 @@ from sklearn.metrics import (
 FEATURES = ['accuracy', 'avg_time', 'hints_used']
 CLASSES = [0, 1, 2]
 
+# hiperparametri modela koji se koristi kad nema --search
+DEFAULT_PARAMS = {
+    'alpha': 0.0001,
+    'eta0': 0.01,
+    'power_t': 0.25,
+    'class_weight': None,
+}
+
+SEARCH_GRID = {
+    'alpha': [0.00001, 0.0001, 0.001],
+    'eta0': [0.001, 0.01, 0.1],
+    'power_t': [0.25, 0.5],
+    'class_weight': [None, 'balanced'],
+}
+
 def load_data(csv_path):
-    df = pd.read_csv(csv_path)
+    if is_bundle(csv_path):
+        # npy bundle: citaju se samo potrebni stupci, bez parsiranja teksta
+        df = pd.DataFrame({c: np.array(a) for c, a in read_bundle(csv_path, FEATURES + ['label']).items()})
+    else:
+        df = pd.read_csv(csv_path)
     X = df[FEATURES].copy()
     y = df['label'].astype(int)
     return X, y, df
 
-def main(args):
+def make_model(seed, params=None, y=None):
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    class_weight = params['class_weight']
+    if class_weight == 'balanced':
+        # partial_fit ne podrzava 'balanced' pa se tezine racunaju iz y unaprijed
+        weights = compute_class_weight('balanced', classes=np.array(CLASSES), y=np.asarray(y))
+        class_weight = dict(zip(CLASSES, weights.tolist()))
+
+    return SGDClassifier(
+        loss='log_loss',
+        penalty='l2',
+        alpha=params['alpha'],
+        learning_rate='invscaling',
+        eta0=params['eta0'],
+        power_t=params['power_t'],
+        class_weight=class_weight,
+        max_iter=1,
+        tol=None,
+        random_state=seed
+    )
+
+def fit_model(X_train, y_train, seed, params=None):
+    """Scaler + jedan partial_fit prolaz, isto kao u main()."""
+    scaler = StandardScaler()
+    scaler.partial_fit(X_train)
+    model = make_model(seed, params, y_train)
+    model.partial_fit(scaler.transform(X_train), y_train, classes=CLASSES)
+    return scaler, model
+
+def save_model(out_dir, model, scaler):
+    # verzija iznad svih dosadasnjih (checkpointi, feedback log, objavljeni parametri)
+    # pa workeri preuzmu novi model, a learner ne nastavlja na starom checkpointu
+    version = next_version(out_dir)
+
+    joblib.dump(model, out_dir / "model.pkl")
+    joblib.dump(scaler, out_dir / "scaler.pkl")
+
+    # kompaktni format za inference (mmap, bez picklea i scikit-learna)
+    save_params(
+        out_dir / PARAMS_FILE,
+        version=version,
+        mean=scaler.mean_,
+        scale=scaler.scale_,
+        coef=model.coef_,
+        intercept=model.intercept_,
+        classes=model.classes_,
+    )
+    write_base(out_dir / BASE_FILE, version, artifact_fingerprint(out_dir / "model.pkl", out_dir / "scaler.pkl"))
+
+    coef_df = pd.DataFrame(model.coef_, columns=FEATURES)
+    coef_df['class'] = CLASSES
+    coef_df.to_csv(out_dir / "model_coefficients.csv", index=False)
+
+def main(args, params=None):
     out_dir = Path(args.output_dir)
     out_dir.mkdir(parents=True, exist_ok=True)
 
@@ -47,27 +138,10 @@ def main(args):
         X, y, test_size=args.test_size, random_state=args.seed, stratify=y
     )
 
-    # 3) Scaling
-    scaler = StandardScaler()
-    scaler.partial_fit(X_train)
-    X_train_scaled = scaler.transform(X_train)
+    # 3) Scaling + 4) mlr with SGD
+    scaler, model = fit_model(X_train, y_train, args.seed, params)
     X_test_scaled = scaler.transform(X_test)
 
-    # 4) mlr with SGD
-    model = SGDClassifier(
-        loss='log_loss',
-        penalty='l2',
-        alpha=0.0001,
-        learning_rate='invscaling',
-        eta0=0.01,
-        power_t=0.25,
-        max_iter=1,
-        tol=None,
-        random_state=args.seed
-    )
-
-    model.partial_fit(X_train_scaled, y_train, classes=CLASSES)
-
     # 5) Evaluation
     y_pred = model.predict(X_test_scaled)
     y_proba = model.predict_proba(X_test_scaled)
@@ -84,7 +158,8 @@ def main(args):
         "macro_f1": macro_f1,
         "balanced_accuracy": bal_acc,
         "confusion_matrix": conf,
-        "classification_report": report
+        "classification_report": report,
+        "hyperparameters": {**DEFAULT_PARAMS, **(params or {})}
     }
     with open(out_dir / "evaluation.json", "w") as f:
         json.dump(eval_summary, f, indent=2)
@@ -96,23 +171,330 @@ def main(args):
     # append predicted probs per class
     for i in range(y_proba.shape[1]):
         test_out[f'prob_class_{i}'] = y_proba[:, i]
-    test_out.to_csv(out_dir / "test_predictions.csv", index=False)
+    if args.format == "npy":
+        write_bundle(test_out, out_dir / "test_predictions_npy")
+    else:
+        test_out.to_csv(out_dir / "test_predictions.csv", index=False)
 
     # 6) Save model + scaler
-    joblib.dump(model, out_dir / "model.pkl")
-    joblib.dump(scaler, out_dir / "scaler.pkl")
+    save_model(out_dir, model, scaler)
 
-    coef_df = pd.DataFrame(model.coef_, columns=FEATURES)
-    coef_df['class'] = CLASSES
-    coef_df.to_csv(out_dir / "model_coefficients.csv", index=False)
+    print("Training complete. Metrics saved to", out_dir)
+
+def iter_chunks(path, chunksize):
+    """
+    Cita dataset u chunkovima: CSV datoteku, npy bundle ili direktorij sa
+    shardovima (index.json iz generate_train_data.py --workers --keep-shards).
+    """
+    path = Path(path)
+    if path.is_dir() and not is_bundle(path):
+        with open(path / "index.json") as f:
+            files = [path / shard['path'] for shard in json.load(f)['shards']]
+    else:
+        files = [path]
+
+    dtype = {'accuracy': np.float64, 'avg_time': np.float64, 'hints_used': np.float64, 'label': np.int64}
+    for file in files:
+        if is_bundle(file):
+            yield from iter_bundle_chunks(file, chunksize, FEATURES + ['label'])
+        else:
+            yield from pd.read_csv(file, usecols=FEATURES + ['label'], dtype=dtype, chunksize=chunksize)
+
+def holdout_mask(chunk, test_size, seed):
+    """
+    Deterministicki split po hashu znacajki retka: isti redak je uvijek u istom
+    skupu (neovisno o chunku/epohi), pa se test skup ne mora drzati u memoriji.
+    """
+    # float64 da split ne ovisi o dtype stupca (hints_used je int u bundleu, float iz CSV chunkova)
+    h = pd.util.hash_pandas_object(chunk[FEATURES].astype(np.float64), index=False, hash_key=f"{seed:016d}"[-16:])
+    return (h.to_numpy() % 10000) < int(round(test_size * 10000))
+
+def metrics_from_confusion(conf):
+    """Iste metrike kao u main(), ali iz matrice konfuzije (bez y_test/y_pred u memoriji)."""
+    conf = np.asarray(conf, dtype=np.float64)
+    tp = np.diag(conf)
+    support = conf.sum(axis=1)
+    predicted = conf.sum(axis=0)
+    total = conf.sum()
+
+    precision = np.divide(tp, predicted, out=np.zeros_like(tp), where=predicted > 0)
+    recall = np.divide(tp, support, out=np.zeros_like(tp), where=support > 0)
+    f1 = np.divide(2 * precision * recall, precision + recall, out=np.zeros_like(tp), where=(precision + recall) > 0)
+
+    report = {
+        str(c): {"precision": precision[i], "recall": recall[i], "f1-score": f1[i], "support": support[i]}
+        for i, c in enumerate(CLASSES)
+    }
+    report["accuracy"] = tp.sum() / total
+    report["macro avg"] = {
+        "precision": precision.mean(), "recall": recall.mean(), "f1-score": f1.mean(), "support": total
+    }
+    report["weighted avg"] = {
+        "precision": (precision * support).sum() / total,
+        "recall": (recall * support).sum() / total,
+        "f1-score": (f1 * support).sum() / total,
+        "support": total,
+    }
+    report = json.loads(json.dumps(report, default=float))
+
+    return {
+        "accuracy": report["accuracy"],
+        "macro_f1": report["macro avg"]["f1-score"],
+        "balanced_accuracy": float(recall[support > 0].mean()),
+        "confusion_matrix": conf.astype(int).tolist(),
+        "classification_report": report,
+    }
+
+def peak_memory_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux vraca KB, macOS bajtove
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def main_stream(args):
+    """
+    Out-of-core treniranje: dataset se cita u chunkovima pa memorija ne ovisi o
+    velicini dataseta. Prvi prolaz racuna EDA i scaler (samo train dio), zatim
+    --epochs prolaza model.partial_fit, a zadnji prolaz evaluaciju na holdoutu.
+    """
+    out_dir = Path(args.output_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(args.seed)
+
+    # 1) EDA + scaler (StandardScaler.partial_fit je running mean/var pa radi i za EDA)
+    t0 = time.perf_counter()
+    scaler = StandardScaler()
+    eda_stats = StandardScaler()
+    class_counts = {}
+    n_rows = n_train = 0
+    for chunk in iter_chunks(args.csv, args.chunksize):
+        test = holdout_mask(chunk, args.test_size, args.seed)
+        eda_stats.partial_fit(chunk[FEATURES])
+        if (~test).any():
+            scaler.partial_fit(chunk.loc[~test, FEATURES])
+        for c, k in chunk['label'].value_counts().items():
+            class_counts[int(c)] = class_counts.get(int(c), 0) + int(k)
+        n_rows += len(chunk)
+        n_train += int((~test).sum())
+    stats_time = time.perf_counter() - t0
+
+    std = np.sqrt(eda_stats.var_ * n_rows / max(n_rows - 1, 1))
+    eda = {
+        "n_samples": n_rows,
+        "class_counts": class_counts,
+        "feature_means": dict(zip(FEATURES, eda_stats.mean_.tolist())),
+        "feature_std": dict(zip(FEATURES, std.tolist())),
+    }
+    with open(out_dir / "eda.json", "w") as f:
+        json.dump(eda, f, indent=2)
+
+    # 2) epohe SGD-a po chunkovima (redoslijed unutar chunka se mijesa svaku epohu)
+    model = make_model(args.seed)
+    t0 = time.perf_counter()
+    for epoch in range(args.epochs):
+        for chunk in iter_chunks(args.csv, args.chunksize):
+            train = chunk[~holdout_mask(chunk, args.test_size, args.seed)]
+            if train.empty:
+                continue
+            order = rng.permutation(len(train))
+            X = scaler.transform(train[FEATURES].iloc[order])
+            y = train['label'].to_numpy()[order]
+            model.partial_fit(X, y, classes=CLASSES)
+    train_time = time.perf_counter() - t0
+
+    # 3) evaluacija na holdoutu, predikcije se zapisuju u chunkovima
+    conf = np.zeros((len(CLASSES), len(CLASSES)), dtype=np.int64)
+    pred_path = out_dir / "test_predictions.csv"
+    pred_writer = None
+    first = True
+    for chunk in iter_chunks(args.csv, args.chunksize):
+        test = chunk[holdout_mask(chunk, args.test_size, args.seed)]
+        if test.empty:
+            continue
+        X = scaler.transform(test[FEATURES])
+        y_true = test['label'].to_numpy()
+        y_pred = model.predict(X)
+        y_proba = model.predict_proba(X)
+        conf += confusion_matrix(y_true, y_pred, labels=CLASSES)
+
+        test_out = test[FEATURES].copy()
+        test_out['y_true'] = y_true
+        test_out['y_pred'] = y_pred
+        for i in range(y_proba.shape[1]):
+            test_out[f'prob_class_{i}'] = y_proba[:, i]
+        if args.format == "npy":
+            if pred_writer is None:
+                pred_writer = NpyBundleWriter(
+                    out_dir / "test_predictions_npy", n_rows - n_train, {c: test_out[c].dtype for c in test_out.columns}
+                )
+            pred_writer.write(test_out)
+        else:
+            test_out.to_csv(pred_path, index=False, mode='w' if first else 'a', header=first)
+        first = False
+    if pred_writer is not None:
+        pred_writer.close()
+
+    eval_summary = metrics_from_confusion(conf)
+    eval_summary["streaming"] = {
+        "epochs": args.epochs,
+        "chunksize": args.chunksize,
+        "n_train": n_train,
+        "n_test": int(conf.sum()),
+        "stats_pass_s": stats_time,
+        "train_s": train_time,
+        "train_rows_per_s": n_train * args.epochs / train_time if train_time > 0 else None,
+        "peak_memory_mb": peak_memory_mb(),
+    }
+    with open(out_dir / "evaluation.json", "w") as f:
+        json.dump(eval_summary, f, indent=2)
+
+    save_model(out_dir, model, scaler)
 
     print("Training complete. Metrics saved to", out_dir)
+    print(f"{eval_summary['streaming']['train_rows_per_s']:.0f} rows/s, peak memory {eval_summary['streaming']['peak_memory_mb']} MB")
+
+def search_configs(kind, n_iter, seed):
+    """Konfiguracije za --search: cijeli SEARCH_GRID ili n_iter nasumicnih (deterministicki za seed)."""
+    if kind == 'grid':
+        keys = list(SEARCH_GRID)
+        configs = [{}]
+        for key in keys:
+            configs = [{**c, key: v} for c in configs for v in SEARCH_GRID[key]]
+        return configs
+
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            'alpha': float(f"{10 ** rng.uniform(-6, -2):.3g}"),
+            'eta0': float(f"{10 ** rng.uniform(-4, 0):.3g}"),
+            'power_t': float(f"{rng.uniform(0.1, 0.9):.3g}"),
+            'class_weight': [None, 'balanced'][int(rng.integers(2))],
+        }
+        for _ in range(n_iter)
+    ]
+
+def config_key(params):
+    return json.dumps(params, sort_keys=True)
+
+# podaci i foldovi u worker procesu (postavlja ih _init_search_worker jednom po procesu)
+_search_data = None
+
+def _init_search_worker(X, y, folds, seed):
+    global _search_data
+    splits = list(StratifiedKFold(n_splits=folds, shuffle=True, random_state=seed).split(X, y))
+    _search_data = (X, y, splits, seed)
+
+def _run_fold(params, fold):
+    X, y, splits, seed = _search_data
+    train_idx, test_idx = splits[fold]
+
+    t0 = time.perf_counter()
+    scaler, model = fit_model(X.iloc[train_idx], y.iloc[train_idx], seed, params)
+    fit_time = time.perf_counter() - t0
+
+    y_pred = model.predict(scaler.transform(X.iloc[test_idx]))
+    return {
+        "config": params,
+        "fold": fold,
+        "macro_f1": f1_score(y.iloc[test_idx], y_pred, average='macro'),
+        "fit_time_s": fit_time,
+    }
+
+def load_search_results(path, cv):
+    """Rezultati prethodnog (prekinutog) pokretanja s istim postavkama CV-a."""
+    done = {}
+    if not path.exists():
+        return done
+    with open(path) as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue  # nedovrsen zadnji redak nakon prekida
+            if rec.get("cv") == cv:
+                done[(config_key(rec["config"]), rec["fold"])] = rec
+    return done
+
+def run_search(args):
+    """
+    Stratified CV za svaku konfiguraciju na train dijelu (test dio ostaje za
+    zavrsnu evaluaciju u main), foldovi paralelno u process poolu. Svaki fold
+    se odmah dopisuje u search_results.jsonl pa se prekinuti search nastavlja
+    tamo gdje je stao. Najbolja konfiguracija (macro-F1) se trenira i sprema
+    kao i inace.
+    """
+    out_dir = Path(args.output_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    X, y, _ = load_data(args.csv)
+    X_train, _, y_train, _ = train_test_split(
+        X, y, test_size=args.test_size, random_state=args.seed, stratify=y
+    )
+
+    configs = search_configs(args.search, args.n_iter, args.seed)
+    cv = {"data": str(args.csv), "folds": args.folds, "seed": args.seed, "test_size": args.test_size}
+    results_path = out_dir / "search_results.jsonl"
+    done = load_search_results(results_path, cv)
+
+    todo = [(c, k) for c in configs for k in range(args.folds) if (config_key(c), k) not in done]
+    print(f"Search: {len(configs)} configs x {args.folds} folds, {len(todo)} fits to run ({len(done)} already done)")
+
+    workers = args.workers or os.cpu_count() or 1
+    if todo:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_search_worker,
+            initargs=(X_train.reset_index(drop=True), y_train.reset_index(drop=True), args.folds, args.seed),
+        ) as pool, open(results_path, "a+b") as results_file:
+            # zadnji redak moze biti nedovrsen ako je prethodno pokretanje prekinuto
+            if results_file.tell() > 0:
+                results_file.seek(-1, os.SEEK_END)
+                if results_file.read(1) != b"\n":
+                    results_file.write(b"\n")
+            futures = [pool.submit(_run_fold, c, k) for c, k in todo]
+            for future in as_completed(futures):
+                rec = {**future.result(), "cv": cv}
+                done[(config_key(rec["config"]), rec["fold"])] = rec
+                results_file.write((json.dumps(rec) + "\n").encode())
+                results_file.flush()
+
+    summary = []
+    for c in configs:
+        folds = [done[(config_key(c), k)] for k in range(args.folds)]
+        f1s = [r["macro_f1"] for r in folds]
+        summary.append({
+            "config": c,
+            "macro_f1_mean": float(np.mean(f1s)),
+            "macro_f1_std": float(np.std(f1s)),
+            "fit_time_s_mean": float(np.mean([r["fit_time_s"] for r in folds])),
+        })
+    summary.sort(key=lambda r: r["macro_f1_mean"], reverse=True)
+    with open(out_dir / "search_summary.json", "w") as f:
+        json.dump({"cv": cv, "search": args.search, "results": summary}, f, indent=2)
+
+    best = summary[0]
+    print(f"Best config: {best['config']} (macro-F1 {best['macro_f1_mean']:.4f} +- {best['macro_f1_std']:.4f})")
+    main(args, params=best["config"])
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
-    parser.add_argument("--csv", type=str, default="train_dataset.csv")
+    parser.add_argument("--csv", "--data", dest="csv", type=str, default="train_dataset.csv", help="CSV, npy bundle ili direktorij sa shardovima")
     parser.add_argument("--output_dir", type=str, default="model_output")
     parser.add_argument("--test_size", type=float, default=0.2)
     parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--format", choices=["csv", "npy"], default="csv", help="format test_predictions artefakta")
+    parser.add_argument("--stream", action="store_true", help="out-of-core treniranje u chunkovima (za datasetove vece od RAM-a)")
+    parser.add_argument("--chunksize", type=int, default=100000)
+    parser.add_argument("--epochs", type=int, default=3)
+    parser.add_argument("--search", choices=["grid", "random"], default=None, help="pretraga hiperparametara (alpha, eta0, power_t, class_weight) sa stratified CV")
+    parser.add_argument("--n_iter", type=int, default=20, help="broj konfiguracija za --search random")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=0, help="procesi za --search (0 = sve jezgre)")
     args = parser.parse_args()
-    main(args)
+    if args.search:
+        run_search(args)
+    elif args.stream:
+        main_stream(args)
+    else:
+        main(args)
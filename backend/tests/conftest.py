@@ -0,0 +1,11 @@
+import os
+import sys
+from pathlib import Path
+
+# backend/ (app) i backend/model/ (skripte) na path
+BACKEND = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND))
+sys.path.insert(0, str(BACKEND / "model"))
+
+# engine se kreira pri importu app.db, ali testovi se nikad ne spajaju na bazu
+os.environ.setdefault("DATABASE_URL", "postgresql+psycopg://localhost/smartmath_test")
@@ -0,0 +1,47 @@
+import uuid
+
+import numpy as np
+
+from backfill_labels import ID_DTYPE, NO_ID, derive_true_labels, latest_recommendations
+
+
+def _id(n):
+    return np.void(uuid.UUID(int=n).bytes) if n else NO_ID
+
+
+def _history(rows):
+    """rows: (user, game, round_index, accuracy, rec_id); 0 = NULL id."""
+    user, game, idx, acc, rec = zip(*rows)
+    return {
+        "user_id": np.array([_id(u) for u in user], dtype=ID_DTYPE),
+        "game_id": np.array([_id(g) for g in game], dtype=ID_DTYPE),
+        "round_index": np.array(idx, dtype=np.int64),
+        "accuracy": np.array(acc, dtype=np.float64),
+        "rec_id": np.array([_id(r) for r in rec], dtype=ID_DTYPE),
+    }
+
+
+def test_rounds_without_game_are_labeled():
+    # kao online upit: Round.game_id == None je IS NULL, pa su to runde iste "igre"
+    history = _history([
+        (1, 0, 0, 0.5, 101),
+        (1, 0, 1, 0.9, 102),
+        (1, 0, 2, 0.3, 103),
+    ])
+    assert derive_true_labels(history).tolist() == [2, 0, -1]
+
+
+def test_duplicate_recommendations_keep_latest_per_round():
+    history = _history([
+        (1, 7, 0, 0.5, 201),
+        (1, 7, 0, 0.5, 202),  # druga preporuka iste runde (zadnja po id-u)
+        (1, 7, 1, 0.5, 203),
+        (1, 7, 2, 0.9, 204),
+        (2, 7, 0, 0.8, 0),    # runda bez preporuke
+        (2, 7, 1, 0.5, 205),
+    ])
+    history = latest_recommendations(history)
+
+    assert [uuid.UUID(bytes=r.tobytes()).int for r in history["rec_id"]] == [202, 203, 204, 0, 205]
+    # bez deduplikacije bi runda 0 bila uparena sama sa sobom, a runda 1 s rundom 0
+    assert derive_true_labels(history).tolist() == [1, 2, -1, 0, -1]
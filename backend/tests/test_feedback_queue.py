@@ -0,0 +1,43 @@
+import threading
+import time
+
+from app.services.feedback_queue import FeedbackQueue
+
+
+def test_partial_batch_applied_after_max_age():
+    applied = []
+    done = threading.Event()
+
+    def apply_fn(batch):
+        applied.extend(batch)
+        done.set()
+
+    queue = FeedbackQueue(apply_fn, batch_size=16, max_age_ms=100.0)
+    try:
+        # prvi batch: dretva nakon njega ceka na praznom redu
+        queue.submit(0)
+        assert done.wait(timeout=2.0)
+        done.clear()
+        time.sleep(0.05)
+
+        t0 = time.monotonic()
+        for i in range(1, 4):
+            queue.submit(i)
+
+        assert done.wait(timeout=2.0)
+        assert applied == [0, 1, 2, 3]
+        assert time.monotonic() - t0 >= 0.1
+        assert queue.stats()["batches"] == 2
+    finally:
+        queue.stop()
+
+
+def test_full_batch_applied_immediately():
+    done = threading.Event()
+    queue = FeedbackQueue(lambda batch: done.set(), batch_size=4, max_age_ms=60_000.0)
+    try:
+        for i in range(4):
+            queue.submit(i)
+        assert done.wait(timeout=2.0)
+    finally:
+        queue.stop()
@@ -0,0 +1,102 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from train_model import CLASSES, FEATURES, fit_model, save_model
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# learner uci batcheve pa "padne" (os._exit, bez shutdowna i zadnjeg checkpointa)
+LEARN = textwrap.dedent("""
+    import os, sys, time
+    import numpy as np
+    from app.routers import ml_feedback
+    from app.routers.ml_feedback import FeedbackRequest
+    from app.services import model_state
+
+    checkpoint_after = int(sys.argv[2])
+    ml_feedback.start_learning("inline")
+    rng = np.random.default_rng(0)
+    for i in range(48):
+        ml_feedback.feedback_queue.submit(FeedbackRequest(
+            accuracy=float(rng.random()),
+            avg_time=float(rng.uniform(1, 30)),
+            hints_used=int(rng.integers(0, 5)),
+            true_label=int(rng.integers(0, 3)),
+            sample_weight=float(rng.uniform(0.5, 5)),
+        ))
+        if i + 1 == checkpoint_after:
+            while ml_feedback.feedback_queue.applied < checkpoint_after:
+                time.sleep(0.01)
+            model_state.checkpoints.write_now()
+    while ml_feedback.feedback_queue.applied < 48:
+        time.sleep(0.01)
+    with model_state.lock:
+        np.savez(sys.argv[1], coef=model_state.model.coef_, intercept=model_state.model.intercept_,
+                 mean=model_state.scaler.mean_, var=model_state.scaler.var_,
+                 version=model_state.snapshot.version)
+    os._exit(0)
+""")
+
+# novi proces: _recover ucita checkpoint (ili model iz train_model.py) i replaya feedback log
+RECOVER = textwrap.dedent("""
+    import os, sys
+    import numpy as np
+    from app.routers import ml_feedback
+    from app.services import model_state
+
+    ml_feedback._recover()
+    np.savez(sys.argv[1], coef=model_state.model.coef_, intercept=model_state.model.intercept_,
+             mean=model_state.scaler.mean_, var=model_state.scaler.var_,
+             version=model_state.snapshot.version)
+    os._exit(0)
+""")
+
+
+def _run(code, env, *args):
+    subprocess.run([sys.executable, "-c", code, *map(str, args)], cwd=BACKEND, env=env, check=True, timeout=120)
+
+
+@pytest.fixture
+def model_env(tmp_path):
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame({
+        "accuracy": rng.random(300),
+        "avg_time": rng.uniform(1, 30, 300),
+        "hints_used": rng.integers(0, 5, 300).astype(float),
+    })[FEATURES]
+    y = np.asarray(CLASSES)[np.digitize(X["accuracy"], [0.4, 0.7])]
+    scaler, model = fit_model(X, y, seed=0)
+    model_dir = tmp_path / "model_output"
+    model_dir.mkdir()
+    save_model(model_dir, model, scaler)
+
+    return {
+        **os.environ,
+        "PYTHONPATH": BACKEND,
+        "MODEL_DIR": str(model_dir),
+        "FEEDBACK_BATCH_SIZE": "8",
+        "FEEDBACK_BATCH_MAX_AGE_MS": "60000",
+        "CHECKPOINT_EVERY_UPDATES": "1000",
+        "CHECKPOINT_INTERVAL_S": "3600",
+    }, model_dir
+
+
+@pytest.mark.parametrize("checkpoint_after", [0, 24], ids=["without_checkpoint", "with_checkpoint"])
+def test_recover_replays_feedback_log(model_env, tmp_path, checkpoint_after):
+    env, model_dir = model_env
+    _run(LEARN, env, tmp_path / "before.npz", checkpoint_after)
+    checkpoints = sorted(p.name for p in (model_dir / "checkpoints").glob("*.pkl")) if checkpoint_after else []
+    assert len(checkpoints) == (1 if checkpoint_after else 0)
+
+    _run(RECOVER, env, tmp_path / "after.npz")
+
+    before, after = np.load(tmp_path / "before.npz"), np.load(tmp_path / "after.npz")
+    assert int(after["version"]) == int(before["version"]) == 6
+    for key in ("coef", "intercept", "mean", "var"):
+        np.testing.assert_allclose(after[key], before[key], rtol=1e-12, atol=0)
@@ -0,0 +1,49 @@
+import asyncio
+
+from app.services.game_state import GameStateStore
+
+GAME = "6f1c0e9a-0000-4000-8000-000000000001"
+
+
+def _db_players():
+    # GamePlayers.is_active redci igre: (user_id, socket_id)
+    return [("u1", "sid-old-1"), ("u2", "sid-2"), ("u3", "sid-3")]
+
+
+def test_rejoin_after_restart_hydrates_room_from_db():
+    store = GameStateStore()  # novi proces: soba ne postoji
+    loads = []
+
+    async def load_players():
+        loads.append(1)
+        return _db_players()
+
+    # prvi ucenik koji se vrati stvori sobu samo sa sobom
+    store.join(GAME, "u1", "sid-new-1")
+    assert not store.room(GAME).hydrated
+
+    room = asyncio.run(store.ensure_hydrated(GAME, load_players))
+    active = {p.user_id: p.sid for p in room.active_players()}
+    # ostali aktivni igraci dolaze iz baze, a novi socket u1 se ne pregazi starim
+    assert active == {"u1": "sid-new-1", "u2": "sid-2", "u3": "sid-3"}
+
+    # napunjena soba se vise ne puni iz baze
+    asyncio.run(store.ensure_hydrated(GAME, load_players))
+    assert loads == [1]
+
+
+def test_room_recreated_after_ttl_is_hydrated_again():
+    store = GameStateStore(ttl_s=0.0)
+
+    async def load_players():
+        return _db_players()
+
+    asyncio.run(store.ensure_hydrated(GAME, load_players))
+    store.evict_idle(now=store.room(GAME).last_seen + 1.0)
+    assert store.room(GAME) is None
+
+    store.join(GAME, "u2", "sid-2b")
+    room = asyncio.run(store.ensure_hydrated(GAME, load_players))
+    assert sorted(p.user_id for p in room.active_players()) == ["u1", "u2", "u3"]
+    assert store.player(GAME, "u2").sid == "sid-2b"
+    assert store.evicted == 1 and store.hydrations == 2
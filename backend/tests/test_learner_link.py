@@ -0,0 +1,39 @@
+import threading
+import time
+from multiprocessing.connection import Client
+
+from app.services.learner_link import LearnerServer
+
+AUTHKEY = b"test"
+
+
+def test_bad_samples_do_not_close_connection(tmp_path):
+    received = []
+    done = threading.Event()
+
+    def on_sample(values):
+        if values == ["reject"]:
+            raise ValueError("invalid sample")
+        received.append(values)
+        if len(received) == 2:
+            done.set()
+
+    address = str(tmp_path / "learner.sock")
+    server = LearnerServer(address, AUTHKEY, on_sample)
+    server.start()
+    try:
+        conn = Client(address, authkey=AUTHKEY)
+        conn.send_bytes(b"[0.5, 3.0")       # neispravan JSON
+        conn.send_bytes(b'["reject"]')      # on_sample baci iznimku
+        conn.send_bytes(b"[0.5, 3.0, 1, 2, 1.0]")
+        conn.send_bytes(b"[0.9, 2.0, 0, 2, 1.0]")
+
+        assert done.wait(timeout=2.0)
+        assert received == [[0.5, 3.0, 1, 2, 1.0], [0.9, 2.0, 0, 2, 1.0]]
+        deadline = time.monotonic() + 2.0
+        while server.stats()["errors"] < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert server.stats() == {"connections": 1, "received": 4, "errors": 2}
+        conn.close()
+    finally:
+        server.stop()
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.pipeline import Pipeline
+
+from app.services.model_format import ModelSnapshot, load_params, save_params
+from train_model import CLASSES, FEATURES, fit_model
+
+
+def _random_X(n, seed):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([
+        rng.uniform(-0.5, 1.5, n),
+        rng.uniform(0, 60, n),
+        rng.integers(0, 10, n),
+    ]).astype(np.float64)
+
+
+@pytest.fixture(scope="module")
+def pipe():
+    X = pd.DataFrame(_random_X(300, seed=0), columns=FEATURES)
+    y = np.asarray(CLASSES)[np.digitize(X["accuracy"], [0.4, 0.7])]
+    scaler, model = fit_model(X, y, seed=0)
+    return Pipeline([("scaler", scaler), ("model", model)])
+
+
+def test_snapshot_matches_sklearn_pipeline(pipe):
+    snapshot = ModelSnapshot.from_sklearn(pipe["scaler"], pipe["model"], version=0)
+
+    X = _random_X(1000, seed=1)
+    labels, proba = snapshot.predict(X)
+    X_df = pd.DataFrame(X, columns=FEATURES)
+
+    np.testing.assert_allclose(proba, pipe.predict_proba(X_df), rtol=1e-9, atol=1e-12)
+    np.testing.assert_array_equal(labels, pipe.predict(X_df))
+
+
+def test_params_snapshot_matches_sklearn_pipeline(pipe, tmp_path):
+    # model_params.npy (mmap) koji citaju workeri daje iste predikcije
+    scaler, model = pipe["scaler"], pipe["model"]
+    path = tmp_path / "model_params.npy"
+    save_params(path, 0, scaler.mean_, scaler.scale_, model.coef_, model.intercept_, model.classes_)
+    snapshot = ModelSnapshot.from_params(load_params(path))
+
+    X = _random_X(1000, seed=2)
+    _, proba = snapshot.predict(X)
+
+    np.testing.assert_allclose(proba, pipe.predict_proba(pd.DataFrame(X, columns=FEATURES)), rtol=1e-9, atol=1e-12)
@@ -0,0 +1,38 @@
+import numpy as np
+
+from app.services.prediction_cache import PredictionCache
+
+X = np.array([[0.704, 12.34, 1.0], [0.5, 3.0, 0.0]])
+LABELS = np.array([2, 1])
+PROBA = np.array([[0.1, 0.2, 0.7], [0.2, 0.6, 0.2]])
+
+
+def _cache():
+    return PredictionCache(maxsize=16, acc_step=0.01, time_step=0.1)
+
+
+def test_disabled_without_quantization():
+    assert not PredictionCache(maxsize=4096).enabled
+    assert _cache().enabled
+
+
+def test_version_bump_invalidates_entries():
+    cache = _cache()
+    keys = cache.keys(X)
+    cache.store(keys, LABELS, PROBA, version=1)
+
+    assert all(c is not None for c in cache.lookup(keys, version=1))
+    # bliski redak pada u isti kljuc
+    assert cache.lookup(cache.keys(X[:1] + [0.001, 0.01, 0.0]), version=1)[0][0] == 2
+
+    # novi snapshot: zapisi verzije 1 se vise ne posluzuju
+    assert cache.lookup(keys, version=2) == [None, None]
+    assert cache.stats()["stale"] == 2
+
+    cache.store(keys[:1], np.array([0]), PROBA[:1], version=2)
+    label, _ = cache.lookup(keys[:1], version=2)[0]
+    assert label == 0
+
+    # zakasnjeli store starije verzije ne pregazi noviji zapis
+    cache.store(keys[:1], LABELS[:1], PROBA[:1], version=1)
+    assert cache.lookup(keys[:1], version=2)[0][0] == 0
@@ -0,0 +1,111 @@
+import random
+
+from app.services.roster import RosterTracker
+
+ROOM = "game-1"
+
+
+def _entries(players):
+    """playersDetailed kao u _load_roster: rank po xp (silazno)."""
+    ranked = sorted(players.values(), key=lambda p: p["xp"], reverse=True)
+    rank = {p["user_id"]: i + 1 for i, p in enumerate(ranked)}
+    return [{**p, "rank": rank[p["user_id"]]} for p in players.values()]
+
+
+def _update(tracker, players):
+    detailed = _entries(players)
+    return tracker.update(ROOM, [p["username"] for p in detailed], detailed), detailed
+
+
+class Client:
+    """Isto kao playersSnapshot / playersDelta handleri na teacher stranici."""
+
+    def __init__(self, snapshot):
+        self.seq = snapshot["seq"]
+        self.entries = {p["user_id"]: p for p in snapshot["playersDetailed"]}
+        self.gaps = 0
+
+    def apply(self, delta):
+        if delta["seq"] <= self.seq:
+            return
+        if delta["seq"] != self.seq + 1:
+            self.gaps += 1
+            return
+        for user_id in delta["removed"]:
+            self.entries.pop(user_id, None)
+        for p in delta["changed"]:
+            self.entries[p["user_id"]] = p
+        for user_id, rank in delta["ranks"].items():
+            if user_id in self.entries:
+                self.entries[user_id] = {**self.entries[user_id], "rank": rank}
+        self.seq = delta["seq"]
+
+
+def _player(i, rng):
+    return {"user_id": f"u{i}", "username": f"student{i}", "level": rng.randint(1, 5), "xp": rng.randint(0, 500)}
+
+
+def test_deltas_applied_to_snapshot_equal_full_roster():
+    rng = random.Random(0)
+    tracker = RosterTracker()
+    players = {p["user_id"]: p for p in (_player(i, rng) for i in range(10))}
+    _update(tracker, players)
+
+    client = Client(tracker.snapshot(ROOM))
+    late_client = None
+    next_id = 10
+
+    for step in range(200):
+        op = rng.random()
+        if op < 0.15:
+            p = _player(next_id, rng)
+            players[p["user_id"]] = p
+            next_id += 1
+        elif op < 0.3 and len(players) > 1:
+            players.pop(rng.choice(sorted(players)))
+        elif op < 0.8:
+            user_id = rng.choice(sorted(players))
+            players[user_id] = {**players[user_id], "xp": players[user_id]["xp"] + rng.randint(1, 100)}
+        elif op < 0.9:
+            user_id = rng.choice(sorted(players))
+            players[user_id] = {**players[user_id], "level": rng.randint(1, 5)}
+        # inace roster ostaje isti
+
+        seq_before = tracker.snapshot(ROOM)["seq"]
+        delta, detailed = _update(tracker, players)
+        if delta is None:
+            assert tracker.snapshot(ROOM)["seq"] == seq_before
+        else:
+            assert delta["seq"] == seq_before + 1
+            client.apply(delta)
+            if late_client is not None:
+                late_client.apply(delta)
+                late_client.apply(delta)  # duplikat se ignorira
+
+        expected = {p["user_id"]: p for p in detailed}
+        assert client.entries == expected
+        assert client.seq == tracker.snapshot(ROOM)["seq"]
+        if step == 50:
+            # klijent koji se pretplati kasnije krece od snapshota
+            late_client = Client(tracker.snapshot(ROOM))
+        if late_client is not None:
+            assert late_client.entries == expected
+
+    assert client.gaps == 0
+    assert tracker.stats()["rank_only"] > 0
+
+
+def test_gap_is_detected():
+    rng = random.Random(1)
+    tracker = RosterTracker()
+    players = {p["user_id"]: p for p in (_player(i, rng) for i in range(3))}
+    _update(tracker, players)
+    client = Client(tracker.snapshot(ROOM))
+
+    players["u0"] = {**players["u0"], "level": 9}
+    _update(tracker, players)  # ova delta se izgubi
+    players["u1"] = {**players["u1"], "level": 9}
+    delta, _ = _update(tracker, players)
+
+    client.apply(delta)
+    assert client.gaps == 1 and client.seq == delta["seq"] - 2
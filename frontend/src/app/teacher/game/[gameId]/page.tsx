@@ -29,6 +29,8 @@ export default function TeacherGamePage() {
     const [overrideEligible, setOverrideEligible] = useState<Record<string, boolean>>({});
     const [classroomName, setClassroomName] = useState<string>('');
     const socketRef = useRef<Socket | null>(null);
+    // playersDelta protocol: last applied seq and roster by user_id (null = waiting for playersSnapshot)
+    const rosterRef = useRef<{ seq: number; entries: Map<string, any> } | null>(null);
     const lastOverrideRefreshAtRef = useRef<number>(0);
     const overrideRefreshTimerRef = useRef<number | null>(null);
 
@@ -113,7 +115,9 @@ export default function TeacherGamePage() {
         socket.on('connect', () => {
             setIsConnecting(false);
             setError(null);
-            socket.emit('teacherJoin', { game_id: gameId, mode: 'game' });
+            // roster: 'delta' -> playersSnapshot, then playersDelta instead of full updatePlayers
+            rosterRef.current = null;
+            socket.emit('teacherJoin', { game_id: gameId, mode: 'game', roster: 'delta' });
         });
 
         socket.on('connect_error', () => {
@@ -121,8 +125,8 @@ export default function TeacherGamePage() {
             setIsConnecting(false);
         });
 
-        socket.on('updatePlayers', (data: { players?: string[]; playersDetailed?: any[] }) => {
-            dlog('updatePlayers', { players: data?.players?.length, detailed: data?.playersDetailed?.length, classroomName });
+        const applyRoster = (data: { players?: string[]; playersDetailed?: any[] }) => {
+            dlog('roster', { players: data?.players?.length, detailed: data?.playersDetailed?.length, classroomName });
             setPlayers(data?.players ?? []);
             if (Array.isArray(data?.playersDetailed)) {
                 const mapped = data.playersDetailed
@@ -159,8 +163,47 @@ export default function TeacherGamePage() {
             }
 
             if (classroomName) void refreshOverrideEligible(token, classroomName);
+        };
+
+        const applyEntries = (entries: Map<string, any>) => {
+            const detailed = Array.from(entries.values());
+            applyRoster({ players: detailed.map((p) => String(p?.username ?? '')), playersDetailed: detailed });
+        };
+
+        socket.on('updatePlayers', applyRoster);
+
+        socket.on('playersSnapshot', (data: { seq: number; playersDetailed?: any[] }) => {
+            const entries = new Map<string, any>();
+            for (const p of data?.playersDetailed ?? []) entries.set(String(p?.user_id ?? ''), p);
+            rosterRef.current = { seq: Number(data?.seq ?? 0), entries };
+            dlog('playersSnapshot', { seq: rosterRef.current.seq, players: entries.size });
+            applyEntries(entries);
         });
 
+        socket.on(
+            'playersDelta',
+            (data: { seq: number; changed?: any[]; removed?: string[]; ranks?: Record<string, number> }) => {
+                const roster = rosterRef.current;
+                const seq = Number(data?.seq ?? 0);
+                if (!roster || seq <= roster.seq) return;
+                if (seq !== roster.seq + 1) {
+                    // missed a delta - request a fresh snapshot and ignore deltas until it arrives
+                    dlog('playersDelta gap', { have: roster.seq, got: seq });
+                    rosterRef.current = null;
+                    socket.emit('rosterResync');
+                    return;
+                }
+                for (const id of data?.removed ?? []) roster.entries.delete(String(id));
+                for (const p of data?.changed ?? []) roster.entries.set(String(p?.user_id ?? ''), p);
+                for (const [id, rank] of Object.entries(data?.ranks ?? {})) {
+                    const p = roster.entries.get(id);
+                    if (p) roster.entries.set(id, { ...p, rank });
+                }
+                roster.seq = seq;
+                applyEntries(roster.entries);
+            },
+        );
+
         socket.on('gameClosed', () => {
             setError('Igra je zatvorena');
         });